@@ -0,0 +1,119 @@
+import os
+from datetime import datetime
+
+import codec
+import config
+from fileio import atomic_write_json
+from locks import FileLock
+from streamreader import iter_jsonl
+
+class PatientArchive:
+    # Discharged patients moved out of patients.json. Records (with their billing and
+    # medication lists) are appended to one JSON Lines file per discharge month,
+    # e.g. archive/patients-2024-05.jsonl, and index.json maps each patient id to
+    # (partition, byte offset, length) so a lookup reads exactly one line.
+    def __init__(self, directory=None):
+        self.directory = directory or config.ARCHIVE_DIR
+        self.index_file = os.path.join(self.directory, "index.json")
+        self._index = None
+        self._index_stamp = None
+
+    def partition_for(self, record):
+        when = record.get("dischargedAt") or datetime.now().isoformat(timespec='seconds')
+        return f"patients-{when[:7]}.jsonl"
+
+    def add(self, records, archived_at=None):
+        # Appends the records and indexes them; returns how many were archived. Patients
+        # already in the index are skipped, so a retried (or re-run, after its commit to
+        # patients.json failed) archive operation does not store them twice. A standby
+        # passes the primary's archivedAt (see replication.py).
+        os.makedirs(self.directory, exist_ok=True)
+        with FileLock(self.index_file):
+            index = dict(self._load_index())
+            by_partition = {}
+            for record in records:
+                if record["id"] not in index:
+                    by_partition.setdefault(self.partition_for(record), []).append(record)
+            if not by_partition:
+                return 0
+            archived_at = archived_at or datetime.now().isoformat(timespec='seconds')
+            for partition, group in sorted(by_partition.items()):
+                path = os.path.join(self.directory, partition)
+                with open(path, 'ab') as f:
+                    offset = f.tell()
+                    for record in group:
+                        line = codec.dumps({"archivedAt": archived_at, "patient": record}, compact=True) + b"\n"
+                        f.write(line)
+                        index[record["id"]] = [partition, offset, len(line)]
+                        offset += len(line)
+                    f.flush()
+                    os.fsync(f.fileno())  # the rows are about to leave patients.json
+            atomic_write_json(self.index_file, index, fsync=True, compact=True)
+            self._index = index
+            self._index_stamp = self._stamp()
+        return sum(len(group) for group in by_partition.values())
+
+    def get(self, patient_id):
+        # {"archivedAt": ..., "patient": {...}} or None
+        where = self._load_index().get(patient_id)
+        if where is None:
+            return None
+        partition, offset, length = where
+        with open(os.path.join(self.directory, partition), 'rb') as f:
+            f.seek(offset)
+            return codec.loads(f.read(length))
+
+    def entries(self):
+        # every archived {"archivedAt", "patient"}, partition by partition
+        for partition in self.partitions():
+            for entry in iter_jsonl(os.path.join(self.directory, partition)):
+                yield entry
+
+    def __contains__(self, patient_id):
+        return patient_id in self._load_index()
+
+    def ids(self):
+        return list(self._load_index())
+
+    def __len__(self):
+        return len(self._load_index())
+
+    def partitions(self):
+        try:
+            return sorted(n for n in os.listdir(self.directory) if n.startswith("patients-") and n.endswith(".jsonl"))
+        except FileNotFoundError:
+            return []
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.index_file)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _load_index(self):
+        # cached until another process rewrites index.json
+        stamp = self._stamp()
+        if self._index is None or stamp != self._index_stamp:
+            try:
+                self._index = codec.load_file(self.index_file) if stamp else {}
+            except ValueError:
+                self._index = self.rebuild_index()
+            self._index_stamp = stamp
+        return self._index
+
+    def rebuild_index(self):
+        # recreate index.json from the partitions, e.g. after it was damaged
+        index = {}
+        for partition in self.partitions():
+            offset = 0
+            with open(os.path.join(self.directory, partition), 'rb') as f:
+                for line in f:
+                    try:
+                        index[codec.loads(line)["patient"]["id"]] = [partition, offset, len(line)]
+                    except (ValueError, KeyError, TypeError):
+                        pass  # torn line
+                    offset += len(line)
+        with FileLock(self.index_file):
+            atomic_write_json(self.index_file, index, fsync=True, compact=True)
+        return index
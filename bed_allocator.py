@@ -0,0 +1,60 @@
+# Picks vacant beds without scanning beds.json. The beds collection keeps a "vacant"
+# index whose buckets are the free lists, one per (ward, bed_type); a bed moves in or
+# out of its bucket whenever it is assigned, changed or freed.
+
+# Bed types tried in order when the caller does not ask for one. ICU beds are kept
+# for red patients first; green patients never take an ICU bed automatically.
+BED_PREFERENCE = {
+    "red": ("ICU", "SPECIAL", "GENERAL"),
+    "yellow": ("GENERAL", "SPECIAL", "ICU"),
+    "green": ("GENERAL", "SPECIAL"),
+}
+
+# Canonical status values. Older records hold "occupied"/"vacant" in lower case, so
+# reads compare case-insensitively and writes always use these.
+OCCUPIED = "Occupied"
+VACANT = "Vacant"
+
+def normalize_status(status):
+    return (status or "").strip().capitalize()
+
+def normalize_ward(ward):
+    # "a" and " A" are ward A, wherever beds are grouped or filtered by ward
+    return str(ward or "").strip().upper()
+
+def is_vacant(bed):
+    return not bed.get("isDeleted", False) and normalize_status(bed.get("status")) == VACANT
+
+def vacant_key(bed):
+    if not is_vacant(bed):
+        return None
+    return (normalize_ward(bed.get("ward")), (bed.get("bed_type") or "").upper())
+
+class BedAllocator:
+    def __init__(self, beds):
+        self.beds = beds
+
+    def pick(self, priority=None, bed_type=None, ward=None):
+        # Returns a vacant bed record, or None. Cost depends on the number of
+        # (ward, bed_type) free lists, not on the number of beds.
+        free_lists = self.beds.index("vacant")
+        if bed_type:
+            types = (bed_type.upper(),)
+        else:
+            types = BED_PREFERENCE.get((priority or "").lower(), BED_PREFERENCE["yellow"])
+
+        for wanted in types:
+            if ward:
+                keys = [(normalize_ward(ward), wanted)]
+            else:
+                keys = sorted(k for k in free_lists.keys() if k[1] == wanted)
+            for key in keys:
+                bed_id = free_lists.first(key)
+                if bed_id is not None:
+                    return self.beds.get(bed_id)
+        return None
+
+    def free_count(self, bed_type=None, ward=None):
+        free_lists = self.beds.index("vacant")
+        return sum(free_lists.count(k) for k in free_lists.keys()
+                   if (not ward or k[0] == normalize_ward(ward)) and (not bed_type or k[1] == bed_type.upper()))
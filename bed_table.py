@@ -0,0 +1,132 @@
+from array import array
+from collections import Counter
+from itertools import compress
+
+from bed_allocator import OCCUPIED, normalize_status, normalize_ward
+from entities import Bed
+from occupancy import BED_TYPES
+
+try:
+    import numpy as np
+except ImportError:  # optional, the array/Counter path gives the same answers
+    np = None
+
+PRIORITIES = (None, "Red", "Yellow", "Green")
+DELETED = -1
+
+class BedTable:
+    # Columnar copy of beds.json for ward-wide analytics: one row per bed, one typed
+    # array per column. Wards, bed types and priorities are stored as small integer
+    # codes, and ward/type/occupied are also packed into one `cell` code so that a
+    # whole-campus summary is a single counting pass (np.bincount, or Counter over the
+    # array, both in C). Like an Index it has reset/update/remove, so the beds
+    # collection can keep it current once it has been attached.
+    def __init__(self):
+        self.reset({})
+
+    def reset(self, records):
+        self.ids = []
+        self._rows = {}            # bed id -> row number
+        self.wards = []            # ward code -> ward name, first-seen order
+        self._ward_codes = {}
+        self.cell = array('i')     # (ward * len(types) + type) * 2 + occupied, DELETED for gone beds
+        self.priority = array('b')  # index into PRIORITIES
+        for record in records.values():
+            self.update(record)
+
+    def _ward_code(self, ward):
+        ward = normalize_ward(ward) or "UNKNOWN"  # as occupancy_key
+        code = self._ward_codes.get(ward)
+        if code is None:
+            code = self._ward_codes[ward] = len(self.wards)
+            self.wards.append(ward)
+        return code
+
+    def update(self, record):
+        bed = Bed.from_dict(record)
+        bed_type = (bed.bed_type or "").upper()
+        if bed.is_deleted or bed_type not in BED_TYPES:
+            self.remove(bed.id)
+            return
+        occupied = normalize_status(bed.status) == OCCUPIED
+        cell = (self._ward_code(bed.ward) * len(BED_TYPES) + BED_TYPES.index(bed_type)) * 2 + occupied
+        priority = PRIORITIES.index(bed.priority.capitalize()) if occupied and bed.priority and \
+            bed.priority.capitalize() in PRIORITIES else 0
+        row = self._rows.get(bed.id)
+        if row is None:
+            self._rows[bed.id] = len(self.ids)
+            self.ids.append(bed.id)
+            self.cell.append(cell)
+            self.priority.append(priority)
+        else:
+            self.cell[row] = cell
+            self.priority[row] = priority
+
+    def remove(self, record_id):
+        row = self._rows.get(record_id)
+        if row is not None:
+            self.cell[row] = DELETED
+            self.priority[row] = 0
+
+    @classmethod
+    def from_beds(cls, beds):
+        table = cls()
+        table.reset({b["id"]: b for b in beds})
+        return table
+
+    def _ward_filter(self, ward):
+        if not ward:
+            return range(len(self.wards))
+        code = self._ward_codes.get(normalize_ward(ward))
+        return [] if code is None else [code]
+
+    def _cell_counts(self):
+        # {cell code: number of beds}
+        if np is not None and len(self.cell):
+            cells = np.frombuffer(self.cell, dtype=np.int32)
+            counts = np.bincount(cells[cells >= 0])
+            return {int(code): int(counts[code]) for code in np.flatnonzero(counts)}
+        counts = Counter(self.cell)
+        counts.pop(DELETED, None)
+        return counts
+
+    def occupancy_by_ward(self):
+        # same shape as HospitalManager.get_occupancy()
+        summary = {ward: {t: {"total": 0, "occupied": 0, "vacant": 0} for t in BED_TYPES} for ward in self.wards}
+        for code, n in self._cell_counts().items():
+            place, occupied = divmod(code, 2)
+            ward, bed_type = divmod(place, len(BED_TYPES))
+            counts = summary[self.wards[ward]][BED_TYPES[bed_type]]
+            counts["total"] += n
+            counts["occupied" if occupied else "vacant"] += n
+        return {ward: counts for ward, counts in summary.items() if any(c["total"] for c in counts.values())}
+
+    def available(self, bed_type="ICU", ward=None):
+        bed_type = BED_TYPES.index(bed_type.upper())
+        wards = self._ward_filter(ward)
+        counts = self._cell_counts() if wards else {}
+        return sum(counts.get((w * len(BED_TYPES) + bed_type) * 2, 0) for w in wards)
+
+    def priority_mix(self):
+        # occupied beds per patient priority across the campus
+        if np is not None and len(self.priority):
+            counts = np.bincount(np.frombuffer(self.priority, dtype=np.int8), minlength=len(PRIORITIES))
+            counts = dict(enumerate(int(n) for n in counts))
+        else:
+            counts = Counter(self.priority)
+        return {PRIORITIES[code]: counts.get(code, 0) for code in range(1, len(PRIORITIES))}
+
+    def select(self, ward=None, bed_type=None, occupied=None):
+        # ids of the beds matching every given filter
+        wanted = set()
+        wards = self._ward_filter(ward)
+        types = [BED_TYPES.index(bed_type.upper())] if bed_type else range(len(BED_TYPES))
+        flags = [int(occupied)] if occupied is not None else (0, 1)
+        for w in wards:
+            for t in types:
+                for flag in flags:
+                    wanted.add((w * len(BED_TYPES) + t) * 2 + flag)
+        if np is not None and len(self.cell):
+            mask = np.isin(np.frombuffer(self.cell, dtype=np.int32), list(wanted))
+            return [self.ids[row] for row in np.flatnonzero(mask)]
+        return list(compress(self.ids, map(wanted.__contains__, self.cell)))
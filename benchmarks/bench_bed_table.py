@@ -0,0 +1,102 @@
+import argparse
+import os
+import random
+import sys
+import timeit
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bed_table import BedTable, np
+from entities import Bed
+from occupancy import OccupancyCounter
+
+# Dashboard queries over a large campus: the dict scan show_bed_status used to do on
+# every call, against the columnar BedTable and the running occupancy counters.
+#
+#   python benchmarks/bench_bed_table.py --beds 5000
+
+def make_beds(count, wards=20, seed=1):
+    rng = random.Random(seed)
+    beds = []
+    for i in range(count):
+        bed = Bed(f"B{i + 1}", bed_type=rng.choice(["GENERAL", "GENERAL", "ICU", "SPECIAL"]),
+                  ward=chr(ord("A") + i % wards))
+        if rng.random() < 0.7:
+            bed.assign(f"P{i + 1}", rng.choice(["Red", "Yellow", "Green"]))
+        beds.append(bed.to_dict())
+    return beds
+
+def scan_summary(beds):
+    # the per-call scan from the old show_bed_status
+    ward_summary = defaultdict(lambda: {
+        "GENERAL_total": 0, "GENERAL_occupied": 0,
+        "ICU_total": 0, "ICU_occupied": 0,
+        "SPECIAL_total": 0, "SPECIAL_occupied": 0
+    })
+    for bed in beds:
+        if bed.get("isDeleted", False):
+            continue
+        ward = bed.get("ward", "UNKNOWN")
+        bed_type = bed.get("bed_type", "").upper()
+        status = bed.get("status", "").lower()
+        key_total = f"{bed_type}_total"
+        key_occupied = f"{bed_type}_occupied"
+        if key_total in ward_summary[ward]:
+            ward_summary[ward][key_total] += 1
+            if status == "occupied":
+                ward_summary[ward][key_occupied] += 1
+    return ward_summary
+
+def scan_icu_available(beds):
+    return sum(1 for b in beds if not b["isDeleted"] and b["bed_type"].upper() == "ICU"
+               and b["status"].lower() == "vacant")
+
+def scan_priority_mix(beds):
+    mix = {"Red": 0, "Yellow": 0, "Green": 0}
+    for b in beds:
+        if not b["isDeleted"] and b["status"].lower() == "occupied" and b["priority"] in mix:
+            mix[b["priority"]] += 1
+    return mix
+
+def best_of(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--beds", type=int, default=5000)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    beds = make_beds(args.beds)
+    records = {b["id"]: b for b in beds}
+    table = BedTable.from_beds(beds)
+    counter = OccupancyCounter()
+    counter.reset(records)
+
+    # all three must agree before timing anything
+    old = scan_summary(beds)
+    assert {w: {t: c["occupied"] for t, c in v.items()} for w, v in table.occupancy_by_ward().items()} == \
+        {w: {t: v[f"{t}_occupied"] for t in ("GENERAL", "ICU", "SPECIAL")} for w, v in old.items()}
+    assert table.occupancy_by_ward() == counter.summary()
+    assert table.available("ICU") == scan_icu_available(beds)
+    assert table.priority_mix() == scan_priority_mix(beds)
+
+    print(f"{args.beds} beds, numpy={'yes' if np is not None else 'no (array fallback)'}")
+    print(f"{'query':<20} {'dict scan':>12} {'bed table':>12} {'counters':>12}   (us per call)")
+    rows = (
+        ("occupancy by ward", lambda: scan_summary(beds), table.occupancy_by_ward, counter.summary),
+        ("ICU available", lambda: scan_icu_available(beds), lambda: table.available("ICU"), None),
+        ("priority mix", lambda: scan_priority_mix(beds), table.priority_mix, None),
+    )
+    for label, scan, columnar, counters in rows:
+        line = f"{label:<20} {best_of(scan, args.number):>12.1f} {best_of(columnar, args.number):>12.1f}"
+        line += f" {best_of(counters, args.number):>12.1f}" if counters else f" {'-':>12}"
+        print(line)
+    started = timeit.default_timer()
+    BedTable.from_beds(beds)
+    print(f"building the table from {args.beds} records: {(timeit.default_timer() - started) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
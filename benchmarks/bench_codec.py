@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from codec import get_codec
+
+# Encode/decode time and size of the data files and the audit log with each JSON
+# codec available here, pretty-printed (indent 2) and compact.
+#
+#   python benchmarks/bench_codec.py --sizes 1000 10000 100000
+
+def patients(n):
+    return [{"id": f"P{i}", "name": f"patient {i}", "age": 20 + i % 60, "gender": "Female", "isDeleted": False,
+             "priority": ("Red", "Yellow", "Green")[i % 3], "present_medication": ["paracetamol", "ibuprofen"],
+             "past_medication": [], "doctorId": f"D{i % 40}", "bedId": f"B{i}",
+             "admittedAt": "2024-05-01T08:30:00.000000", "billing": ["X-Ray"]} for i in range(n)]
+
+def beds(n):
+    return [{"id": f"B{i}", "ward": chr(65 + i % 20), "bed_type": ("GENERAL", "ICU", "SPECIAL")[i % 3],
+             "patientId": f"P{i}" if i % 3 else None, "priority": "Red" if i % 3 else None,
+             "status": "Occupied" if i % 3 else "Vacant", "isDeleted": False} for i in range(n)]
+
+def logs(n):
+    return [{"timestamp": "2024-05-01T08:30:00", "action": ("read", "write")[i % 2], "file": "patients.json",
+             "status": "atomic write"} for i in range(n)]
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    codecs = {c.name: c for c in (get_codec("json"), get_codec("ujson"), get_codec("orjson"))}
+    print(f"codecs: {', '.join(codecs)}")
+    print(f"{'file':<9} {'records':>8} {'codec':<7} {'mode':<8} {'encode ms':>10} {'decode ms':>10} {'size KiB':>10}")
+    for n in args.sizes:
+        for label, make in (("patients", patients), ("beds", beds), ("logs", logs)):
+            data = make(n)
+            for c in codecs.values():
+                for compact in (False, True):
+                    raw, encode = timed(lambda: c.dumps(data, compact), args.repeat)
+                    _, decode = timed(lambda: c.loads(raw), args.repeat)
+                    print(f"{label:<9} {n:>8} {c.name:<7} {'compact' if compact else 'indent':<8} "
+                          f"{encode:>10.1f} {decode:>10.1f} {len(raw) / 1024:>10.0f}")
+
+if __name__ == "__main__":
+    main()
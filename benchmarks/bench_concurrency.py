@@ -0,0 +1,101 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Stress test: N worker processes share one data directory and hammer it with
+# admissions, bed changes and priority updates at the same time. At the end the
+# data is checked for lost updates and double-booked beds.
+#
+#   python benchmarks/bench_concurrency.py --workers 8 --ops 50 [--backend sqlite|events]
+
+def worker(args):
+    data_dir, worker_no, ops, beds = args
+    os.chdir(data_dir)
+    from hospital_management import HospitalManager
+    rng = random.Random(worker_no)
+    h = HospitalManager()
+    started = time.perf_counter()
+    output = io.StringIO()
+    admitted = 0
+    with contextlib.redirect_stdout(output):
+        for i in range(ops):
+            before = set(h.repo.patients.records)
+            h.add_patient(f"w{worker_no}-{i}", 30, "male", "green")
+            pid = next(iter(set(h.repo.patients.records) - before), None)
+            if pid is None:
+                continue  # gave up after too many conflicts, and said so
+            admitted += 1
+            h.change_bed_for_patient(pid, f"B{rng.randint(1, beds)}")
+            h.update_patient_priority(pid, rng.choice(["red", "yellow", "green"]))
+    gave_up = output.getvalue().count("Could not save")
+    return ops * 3, h.conflict_retries, gave_up, admitted, time.perf_counter() - started
+
+def check(h, expected_patients):
+    patients = h.repo.patients.all()
+    beds = {b["id"]: b for b in h.repo.beds.all()}
+    problems = []
+    if len(patients) != expected_patients:
+        problems.append(f"{expected_patients} admissions succeeded but {len(patients)} patients stored (lost updates)")
+    holders = {}
+    for p in patients:
+        if p.get("bedId") and beds.get(p["bedId"], {}).get("patientId") == p["id"]:
+            holders.setdefault(p["bedId"], []).append(p["id"])
+    for bed_id, bed in beds.items():
+        if bed.get("patientId") and bed["patientId"] not in {p["id"] for p in patients}:
+            problems.append(f"{bed_id} points at unknown patient {bed['patientId']}")
+    problems += [f"{b} double-booked by {ids}" for b, ids in holders.items() if len(ids) > 1]
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=25, help="admissions per worker")
+    parser.add_argument("--beds", type=int, default=20)
+    parser.add_argument("--backend", choices=["json", "sqlite", "events"], default="json")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="hms-stress-")
+    os.environ["HMS_STORAGE"] = args.backend
+    os.environ["HMS_LOG_FILE"] = os.path.join(data_dir, "logs.jsonl")
+    os.chdir(data_dir)
+    for name in ("patients.json", "doctors.json", "beds.json"):
+        with open(name, "w") as f:
+            json.dump([], f)
+
+    from hospital_management import HospitalManager
+    with contextlib.redirect_stdout(io.StringIO()):
+        HospitalManager().bulk_add_beds([{"bed_type": "GENERAL", "ward": "A"}] * args.beds)
+
+    started = time.perf_counter()
+    with Pool(args.workers) as pool:
+        results = pool.map(worker, [(data_dir, n, args.ops, args.beds) for n in range(args.workers)])
+    elapsed = time.perf_counter() - started
+
+    total_ops = sum(r[0] for r in results)
+    conflicts = sum(r[1] for r in results)
+    gave_up = sum(r[2] for r in results)
+    admitted = sum(r[3] for r in results)
+    print(f"backend={args.backend} workers={args.workers} operations={total_ops}")
+    print(f"elapsed={elapsed:.2f}s throughput={total_ops / elapsed:.0f} ops/s "
+          f"conflict retries={conflicts} gave up={gave_up}")
+
+    problems = check(HospitalManager(), admitted)
+    if problems:
+        print("FAILED:")
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("OK: no lost updates, no double-booked beds")
+
+if __name__ == "__main__":
+    main()
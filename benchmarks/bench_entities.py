@@ -0,0 +1,89 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from entities import Patient
+
+# Memory and speed of N standalone patient objects: the slotted entities against the
+# previous __dict__-based classes (copied below) and against raw record dicts. The
+# manager's collections hold the raw dicts, so that line is what HospitalManager uses
+# for N patients; the entity lines are what building or typing them as objects costs.
+#
+#   python benchmarks/bench_entities.py --count 100000
+
+class PlainPerson:
+    def __init__(self, id, name, age, gender):
+        self._id = str(id)
+        self._is_deleted = False
+        self.name = name
+        self.age = int(age)
+        self.gender = gender.capitalize()
+
+    def to_dict(self):
+        return {"id": self._id, "name": self.name, "age": self.age, "gender": self.gender,
+                "isDeleted": self._is_deleted}
+
+class PlainPatient(PlainPerson):
+    def __init__(self, id, name, age, gender, priority="yellow"):
+        super().__init__(id, name, age, gender)
+        self.priority = priority.capitalize()
+        self.present_medication = []
+        self.past_medication = []
+        self.doctor_id = None
+        self.bed_id = None
+        self.admitted_at = "2024-01-01T00:00:00.000000"
+
+    def to_dict(self):
+        base_dict = super().to_dict()
+        base_dict.update({
+            "priority": self.priority,
+            "present_medication": self.present_medication,
+            "past_medication": self.past_medication,
+            "doctorId": self.doctor_id,
+            "bedId": self.bed_id,
+            "admittedAt": self.admitted_at
+        })
+        return base_dict
+
+def measure(label, build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    objects = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {current / 1024 / 1024:>8.1f} MiB {elapsed:>8.2f}s")
+    return objects, current
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+    n = args.count
+
+    records = [Patient(f"P{i}", f"patient {i}", 30 + i % 50, "female", "red").to_dict() for i in range(n)]
+    print(f"{n} patients")
+    print(f"{'representation':<22} {'memory':>12} {'build':>9}")
+    plain, plain_bytes = measure("plain classes", lambda: [
+        PlainPatient(r["id"], r["name"], r["age"], r["gender"], r["priority"]) for r in records])
+    slotted, slotted_bytes = measure("slotted from_dict", lambda: [Patient.from_dict(r) for r in records])
+    measure("raw dicts (manager)", lambda: [dict(r) for r in records])
+
+    for label, objects in (("plain to_dict", plain), ("slotted to_dict", slotted)):
+        started = time.perf_counter()
+        for obj in objects:
+            obj.to_dict()
+        print(f"{label:<22} {time.perf_counter() - started:>21.2f}s")
+
+    assert slotted[-1].to_dict() == records[-1]
+    print(f"slotted entities use {100 * (1 - slotted_bytes / plain_bytes):.0f}% less memory than plain classes")
+
+if __name__ == "__main__":
+    main()
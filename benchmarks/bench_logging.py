@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from logstore import AuditLog, AsyncAuditLog, read_logs
+
+# Cost of one log call on the caller's thread, writing straight to the file (flushed
+# every entry, as before batching), in synchronous batches, and through the
+# background writer.
+#
+#   python benchmarks/bench_logging.py --entries 20000
+
+def run(log, entries):
+    entry = {"timestamp": datetime.now().isoformat(timespec='seconds'), "action": "read",
+             "file": "patients.json", "status": "read operation"}
+    started = time.perf_counter()
+    for _ in range(entries):
+        log.append(entry)
+    per_call = (time.perf_counter() - started) / entries * 1e6
+    started = time.perf_counter()
+    log.flush()
+    return per_call, (time.perf_counter() - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{args.entries} entries")
+        print(f"{'mode':<26} {'us per call':>12} {'final flush ms':>15}")
+        for label, make in (("sync, every entry", lambda p: AuditLog(p, batch_size=1)),
+                            ("sync, batches of 20", lambda p: AuditLog(p, batch_size=20)),
+                            ("background thread", lambda p: AsyncAuditLog(p, batch_size=500,
+                                                                          queue_size=args.entries))):
+            path = os.path.join(tmp, label.replace(" ", "_").replace(",", "") + ".jsonl")
+            per_call, flush_ms = run(make(path), args.entries)
+            assert sum(1 for _ in read_logs(path)) == args.entries
+            print(f"{label:<26} {per_call:>12.1f} {flush_ms:>15.1f}")
+
+if __name__ == "__main__":
+    main()
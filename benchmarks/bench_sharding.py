@@ -0,0 +1,78 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Cost of ward-local changes with and without HMS_SHARD_BY_WARD. Every bed is occupied;
+# the timed operations change patient priorities (patient + bed rewrite) in one ward.
+#
+#   python benchmarks/bench_sharding.py --wards 20 --beds-per-ward 500 --ops 200
+
+def build(data_dir, wards, beds_per_ward):
+    beds, patients = [], []
+    for w in range(wards):
+        ward = chr(ord("A") + w) if w < 26 else f"W{w}"
+        for n in range(beds_per_ward):
+            i = len(beds) + 1
+            beds.append({"id": f"B{i}", "ward": ward, "bed_type": "GENERAL", "patientId": f"P{i}",
+                         "priority": "Yellow", "status": "Occupied", "isDeleted": False, "doctorId": None})
+            patients.append({"id": f"P{i}", "name": f"Patient {i}", "age": 40, "gender": "Female",
+                             "isDeleted": False, "priority": "Yellow", "present_medication": [],
+                             "past_medication": [], "doctorId": "D1", "bedId": f"B{i}"})
+    for name, records in (("patients.json", patients), ("doctors.json", []), ("beds.json", beds)):
+        with open(os.path.join(data_dir, name), "w") as f:
+            json.dump(records, f)
+
+def run(args):
+    # one mode, in a fresh process so the HMS_* settings apply
+    os.chdir(args.data_dir)
+    from hospital_management import HospitalManager
+    h = HospitalManager()
+    if args.sharded:
+        from sharding import split
+        split()
+    h.repo.beds.all()
+    h.repo.patients.all()
+    ward_a = [b["patientId"] for b in h.repo.beds.find("ward", "A")]
+    rng = random.Random(1)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.ops):
+            h.update_patient_priority(rng.choice(ward_a), rng.choice(["red", "yellow", "green"]))
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"ms_per_op": elapsed / args.ops * 1000}))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wards", type=int, default=20)
+    parser.add_argument("--beds-per-ward", type=int, default=500)
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--sharded", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.data_dir:
+        return run(args)
+
+    print(f"{args.wards} wards x {args.beds_per_ward} beds, {args.ops} priority changes in ward A")
+    for sharded in (False, True):
+        data_dir = tempfile.mkdtemp(prefix="hms-shard-")
+        build(data_dir, args.wards, args.beds_per_ward)
+        env = dict(os.environ, HMS_SHARD_BY_WARD="1" if sharded else "0", HMS_SNAPSHOTS="0",
+                   HMS_LOG_FILE=os.path.join(data_dir, "logs.jsonl"))
+        command = [sys.executable, os.path.abspath(__file__), "--data-dir", data_dir, "--ops", str(args.ops)]
+        out = subprocess.run(command + (["--sharded"] if sharded else []), env=env,
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"  {'sharded by ward' if sharded else 'single files':<16} {result['ms_per_op']:7.2f} ms/op")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fileio import atomic_write_json
+from journal import Journal
+from repository import Repository
+from storage import JsonStorage
+
+# Cold-start lookup of one patient: parsing patients.json in full against reading it
+# from the memory-mapped snapshot, and from the snapshot again after a commit changed
+# that patient (the commit appends to the snapshot, nothing is rebuilt on the lookup).
+#
+#   python benchmarks/bench_snapshot.py --patients 100000
+
+def cold_lookup(files, journal, snapshots, patient_id):
+    started = time.perf_counter()
+    repo = Repository(*files, storage=JsonStorage(journal, snapshots=snapshots))
+    patient = repo.patients.get(patient_id)
+    return patient, (time.perf_counter() - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [os.path.join(tmp, f) for f in ("patients.json", "doctors.json", "beds.json")]
+        patients = [{"id": f"P{i}", "name": f"patient {i}", "age": 40, "gender": "Male", "isDeleted": False,
+                     "priority": "Red", "present_medication": [], "past_medication": [], "doctorId": "D1",
+                     "bedId": None} for i in range(1, args.patients + 1)]
+        for f, records in zip(files, (patients, [], [])):
+            atomic_write_json(f, records)
+        journal = Journal(os.path.join(tmp, "journal"))
+
+        JsonStorage(journal, snapshots=True).load(files[0])  # builds patients.json.snap
+        wanted = f"P{args.patients // 2}"
+        full, full_ms = cold_lookup(files, journal, False, wanted)
+        snap, snap_ms = cold_lookup(files, journal, True, wanted)
+        assert full == snap
+
+        writer = Repository(*files, storage=JsonStorage(journal, snapshots=True))
+        writer.patients.all()  # loaded before timing the commit
+        started = time.perf_counter()
+        with writer.batch():
+            writer.patients.update(wanted, priority="Green")
+        commit_ms = (time.perf_counter() - started) * 1000
+        changed, changed_ms = cold_lookup(files, journal, True, wanted)
+        assert changed["priority"] == "Green"
+
+        print(f"{args.patients} patients, cold lookup of {wanted}")
+        print(f"  full JSON parse : {full_ms:8.1f} ms")
+        print(f"  mmap snapshot   : {snap_ms:8.1f} ms")
+        print(f"  after a commit  : {changed_ms:8.1f} ms  (commit {commit_ms:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Load test of service.py. Each mix runs against a fresh server in its own temp data
+# directory (or against --url, which must already have beds and doctors), with
+# --clients concurrent keep-alive connections; every client repeats the mix's cycle.
+#
+#   admission   admit
+#   assignment  admit, take any free bed
+#   discharge   admit, take any free bed, discharge
+#
+# --read-share of the cycles also read the occupancy summary and a doctor's triage list,
+# so reads run alongside the queued writes. Reported per mix: requests/sec over the whole
+# run and p50/p99 latency per request type.
+#
+#   python benchmarks/loadtest_service.py --clients 32 --cycles 50 [--storage events]
+
+MIXES = {
+    "admission": ("admit",),
+    "assignment": ("admit", "assign"),
+    "discharge": ("admit", "assign", "discharge"),
+}
+
+def build(data_dir, beds, doctors):
+    wards = "ABCDEFGH"
+    bed_records = [{"id": f"B{i}", "ward": wards[i % len(wards)], "bed_type": "GENERAL", "patientId": None,
+                    "priority": None, "status": "Vacant", "isDeleted": False, "doctorId": None}
+                   for i in range(1, beds + 1)]
+    doctor_records = [{"id": f"D{i}", "name": f"Doctor {i}", "age": 45, "gender": "Female",
+                       "isDeleted": False, "specialization": "general"} for i in range(1, doctors + 1)]
+    for name, records in (("patients.json", []), ("doctors.json", doctor_records), ("beds.json", bed_records)):
+        with open(os.path.join(data_dir, name), "w") as f:
+            json.dump(records, f)
+
+class Client:
+    # one keep-alive HTTP/1.1 connection
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        payload = json.loads(await self.reader.readexactly(length)) if length else None
+        return status, payload
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+async def run_mix(host, port, steps, args):
+    latencies = {}
+    errors = {}
+    rng = random.Random(1)
+
+    async def timed(client, name, method, path, body=None):
+        started = time.perf_counter()
+        status, payload = await client.request(method, path, body)
+        latencies.setdefault(name, []).append(time.perf_counter() - started)
+        if status >= 400:
+            errors[name] = errors.get(name, 0) + 1
+        return status, payload
+
+    async def worker(n):
+        client = Client(host, port)
+        try:
+            for cycle in range(args.cycles):
+                status, payload = await timed(client, "admit", "POST", "/patients", {
+                    "name": f"Load {n}-{cycle}", "age": rng.randint(1, 90), "gender": "Female",
+                    "priority": rng.choice(["red", "yellow", "green"])})
+                pid = payload.get("id") if status == 201 else None
+                if pid and "assign" in steps:
+                    await timed(client, "assign", "POST", f"/patients/{pid}/bed", {})
+                if pid and "discharge" in steps:
+                    await timed(client, "discharge", "POST", f"/patients/{pid}/discharge")
+                if rng.random() < args.read_share:
+                    await timed(client, "occupancy", "GET", "/beds/occupancy")
+                    await timed(client, "triage", "GET", f"/doctors/D{rng.randint(1, args.doctors)}/patients")
+        finally:
+            await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(args.clients)))
+    return time.perf_counter() - started, latencies, errors
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+def report(mix, elapsed, latencies, errors):
+    total = sum(len(v) for v in latencies.values())
+    print(f"{mix:<11} {total:6d} requests in {elapsed:5.2f}s  {total / elapsed:7.0f} req/s")
+    for name, values in latencies.items():
+        values.sort()
+        failed = f"  ({errors[name]} errors)" if errors.get(name) else ""
+        print(f"  {name:<10} {len(values):6d}  p50={percentile(values, 0.5) * 1000:6.1f} ms  "
+              f"p99={percentile(values, 0.99) * 1000:6.1f} ms{failed}")
+
+def start_server(data_dir, port, args):
+    env = dict(os.environ, HMS_STORAGE=args.storage, HMS_LOG_FILE=os.path.join(data_dir, "logs.jsonl"),
+               PYTHONPATH=ROOT)
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "service.py"), "--listen", f"127.0.0.1:{port}"],
+                              cwd=data_dir, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(Client("127.0.0.1", port).request("GET", "/beds/occupancy"))
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise SystemExit("FAILED: the service did not start")
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("FAILED: the service did not answer")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--cycles", type=int, default=50, help="cycles per client")
+    parser.add_argument("--mix", choices=sorted(MIXES), action="append", help="default: all three")
+    parser.add_argument("--read-share", type=float, default=0.2)
+    parser.add_argument("--doctors", type=int, default=10)
+    parser.add_argument("--storage", default="json", choices=["json", "sqlite", "events"])
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--url", help="test a running service instead, e.g. http://127.0.0.1:8080")
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients x {args.cycles} cycles, storage={args.storage if not args.url else args.url}")
+    for mix in args.mix or ["admission", "assignment", "discharge"]:
+        server = data_dir = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            data_dir = tempfile.mkdtemp(prefix="hms-service-")
+            build(data_dir, beds=args.clients * args.cycles, doctors=args.doctors)
+            host, port = "127.0.0.1", args.port
+            server = start_server(data_dir, port, args)
+        try:
+            report(mix, *asyncio.run(run_mix(host, port, MIXES[mix], args)))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+                shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Two-process check of warm-standby replication. This process is the primary: it runs
+# the change feed and makes changes through HospitalManager. A second process follows
+# it into its own directory. Reported: how long each commit took to reach the standby,
+# and whether a read-only HospitalManager on the standby shows the same data.
+#
+#   python benchmarks/replication_harness.py --ops 200 [--snapshot-every 50]
+
+QUERIES = "h.show_bed_status(); h.show_patients(); h.show_doctors(); h.fetch_patients_by_doctor('D1')"
+
+def show(directory, read_only):
+    env = dict(os.environ, HMS_STORAGE="events", HMS_READ_ONLY="1" if read_only else "0",
+               HMS_LOG_FILE=os.path.join(directory, "logs.jsonl"), PYTHONPATH=ROOT)
+    code = f"from hospital_management import HospitalManager; h = HospitalManager(); {QUERIES}"
+    return subprocess.run([sys.executable, "-c", code], cwd=directory, env=env,
+                          capture_output=True, text=True, check=True).stdout
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--port", type=int, default=7791)
+    parser.add_argument("--snapshot-every", type=int, default=50)
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp(prefix="hms-replication-")
+    primary_dir, standby_dir = os.path.join(base, "primary"), os.path.join(base, "standby")
+    os.makedirs(primary_dir)
+    os.makedirs(standby_dir)
+    for name in ("patients.json", "doctors.json", "beds.json"):
+        shutil.copy(os.path.join(ROOT, name), os.path.join(primary_dir, name))
+
+    address = f"127.0.0.1:{args.port}"
+    os.environ.update(HMS_STORAGE="events", HMS_EVENT_SNAPSHOT_EVERY=str(args.snapshot_every),
+                      HMS_LOG_FILE=os.path.join(primary_dir, "logs.jsonl"))
+    os.chdir(primary_dir)
+    from events import EventLog
+    from hospital_management import HospitalManager
+    from replication import ReplicationServer
+    from storage import EventStorage
+
+    server = ReplicationServer(address=address)
+    server.start()
+    follower = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "replication.py"), "follow", "--primary", address],
+        cwd=standby_dir, stdout=subprocess.DEVNULL,
+        env=dict(os.environ, HMS_LOG_FILE=os.path.join(standby_dir, "logs.jsonl"), PYTHONPATH=ROOT))
+    standby = EventStorage(EventLog(os.path.join(standby_dir, "events.jsonl")))
+
+    def wait_for(seq, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while standby.last_seq() < seq:
+            if time.monotonic() > deadline:
+                raise SystemExit(f"FAILED: standby stuck at seq {standby.last_seq()}, primary at {seq}")
+            time.sleep(0.005)
+
+    try:
+        h = HospitalManager()
+        rng = random.Random(7)
+        lags = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            wait_for(h.repo.storage.last_seq(), timeout=30.0)  # initial copy
+            beds = [b["id"] for b in h.repo.beds.all()]
+            for n in range(args.ops):
+                op = rng.random()
+                if op < 0.4:
+                    h.add_patient(f"Patient {n}", rng.randint(1, 90), "female", rng.choice(["red", "yellow", "green"]))
+                    pid = f"P{h.max_id_in_use(h.patient_file, 'P')}"
+                    h.assign_doctor_to_patient(pid, "D1")
+                elif op < 0.7:
+                    patients = [p["id"] for p in h.repo.patients.all() if not p.get("isDeleted")]
+                    h.assign_bed_to_patient(rng.choice(patients), rng.choice(beds))
+                elif op < 0.85:
+                    patients = [p["id"] for p in h.repo.patients.all() if not p.get("isDeleted")]
+                    h.update_patient_priority(rng.choice(patients), rng.choice(["red", "yellow", "green"]))
+                else:
+                    patients = [p["id"] for p in h.repo.patients.all() if not p.get("isDeleted")]
+                    h.discharge_patient(rng.choice(patients))
+                committed = time.perf_counter()
+                wait_for(h.repo.storage.last_seq())
+                lags.append(time.perf_counter() - committed)
+
+        lags.sort()
+        print(f"commits={len(lags)} at seq {h.repo.storage.last_seq()}, "
+              f"{len(h.repo.storage.log.segments())} rotated segments")
+        print(f"replication lag: p50={lags[len(lags) // 2] * 1000:.1f} ms  "
+              f"p99={lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000:.1f} ms  max={lags[-1] * 1000:.1f} ms")
+
+        if show(primary_dir, False) != show(standby_dir, True):
+            raise SystemExit("FAILED: the standby shows different data than the primary")
+        print("OK: the read-only standby serves the same data as the primary")
+    finally:
+        follower.terminate()
+        follower.wait()
+        server.stop()
+        shutil.rmtree(base, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import json
+
+import config
+
+# JSON encode/decode used for the data files, backups, journal and audit log.
+# orjson (or ujson) is used when installed and the stdlib json module otherwise;
+# all of them read each other's output. dumps() returns UTF-8 bytes.
+
+class StdlibCodec:
+    name = "json"
+
+    def dumps(self, data, compact=False):
+        if compact:
+            return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def loads(self, raw):
+        return json.loads(raw)
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def __init__(self, orjson):
+        self._orjson = orjson
+
+    def dumps(self, data, compact=False):
+        return self._orjson.dumps(data, option=0 if compact else self._orjson.OPT_INDENT_2)
+
+    def loads(self, raw):
+        return self._orjson.loads(raw)
+
+class UjsonCodec:
+    name = "ujson"
+
+    def __init__(self, ujson):
+        self._ujson = ujson
+
+    def dumps(self, data, compact=False):
+        return self._ujson.dumps(data, ensure_ascii=False, indent=0 if compact else 2).encode("utf-8")
+
+    def loads(self, raw):
+        return self._ujson.loads(raw)
+
+def get_codec(name=None):
+    # "auto" picks the fastest one installed; naming a missing library falls back to stdlib
+    name = (name or config.JSON_CODEC).lower()
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+            return OrjsonCodec(orjson)
+        except ImportError:
+            pass
+    if name in ("auto", "ujson"):
+        try:
+            import ujson
+            return UjsonCodec(ujson)
+        except ImportError:
+            pass
+    return StdlibCodec()
+
+codec = get_codec()
+
+def dumps(data, compact=None):
+    # compact=None follows config.JSON_COMPACT (the on-disk format)
+    return codec.dumps(data, config.JSON_COMPACT if compact is None else compact)
+
+def dumps_line(data):
+    # one JSON Lines record, always compact
+    return codec.dumps(data, True).decode("utf-8")
+
+def loads(raw):
+    return codec.loads(raw)
+
+def load_file(file):
+    with open(file, 'rb') as f:
+        return codec.loads(f.read())
@@ -0,0 +1,52 @@
+import os
+
+# Runtime settings. Each one can be overridden with an HMS_* environment variable
+# so the same code runs on the ward stations and in tests without edits.
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+LOG_FILE = os.environ.get("HMS_LOG_FILE", "logs.jsonl")        # append-only audit log (one JSON object per line)
+LEGACY_LOG_FILE = os.environ.get("HMS_LEGACY_LOG_FILE", "logs.json")  # old array format, migrated on startup
+LOG_BATCH_SIZE = _env_int("HMS_LOG_BATCH_SIZE", 20)           # entries buffered before they hit the disk
+LOG_ASYNC = os.environ.get("HMS_LOG_ASYNC", "1") == "1"           # write the audit log from a background thread
+LOG_QUEUE_SIZE = _env_int("HMS_LOG_QUEUE_SIZE", 10000)          # entries waiting for the writer thread at most
+LOG_QUEUE_POLICY = os.environ.get("HMS_LOG_QUEUE_POLICY", "drop")  # queue full: "drop" the entry or "block" the caller
+LOG_LINGER_SECONDS = float(os.environ.get("HMS_LOG_LINGER_SECONDS", "0.2"))  # wait this long for a batch to fill
+LOG_LEVEL = os.environ.get("HMS_LOG_LEVEL", "INFO")               # DEBUG, INFO, WARNING or ERROR
+LOG_SAMPLING = os.environ.get("HMS_LOG_SAMPLING", "read=0.01")     # per-action share kept of entries below LOG_LEVEL
+LOG_SUMMARY_SECONDS = _env_int("HMS_LOG_SUMMARY_SECONDS", 60)   # how often counts of unlogged entries are written
+LOG_MAX_BYTES = _env_int("HMS_LOG_MAX_BYTES", 5 * 1024 * 1024)  # rotate the audit log once it is this big...
+LOG_MAX_AGE_HOURS = _env_int("HMS_LOG_MAX_AGE_HOURS", 24)       # ...or once its oldest entry is this old
+LOG_ARCHIVE_DIR = os.environ.get("HMS_LOG_ARCHIVE_DIR", "log_archive")  # gzip-compressed rotated segments
+LOG_RETENTION_DAYS = _env_int("HMS_LOG_RETENTION_DAYS", 90)     # segments older than this are deleted
+LOG_KEEP_SEGMENTS = _env_int("HMS_LOG_KEEP_SEGMENTS", 200)      # and never more than this many are kept
+SEQUENCE_FILE = os.environ.get("HMS_SEQUENCE_FILE", "sequences.json")  # last id handed out per prefix
+WRITE_FSYNC = os.environ.get("HMS_WRITE_FSYNC", "0") == "1"          # fsync data files before the atomic rename
+BACKUP_EVERY_N_WRITES = _env_int("HMS_BACKUP_EVERY_N_WRITES", 20)     # snapshot a data file after this many writes...
+BACKUP_INTERVAL_SECONDS = _env_int("HMS_BACKUP_INTERVAL_SECONDS", 300)  # ...or once its newest snapshot is this old
+BACKUP_KEEP = _env_int("HMS_BACKUP_KEEP", 3)                          # rotated snapshots kept per data file
+STORAGE_BACKEND = os.environ.get("HMS_STORAGE", "json")              # "json" (one file per collection), "sqlite" or "events"
+SHARD_BY_WARD = os.environ.get("HMS_SHARD_BY_WARD", "0") == "1"      # json backend: beds and active patients in one file per ward
+SHARD_WORKERS = _env_int("HMS_SHARD_WORKERS", 8)                    # threads reading ward files in parallel
+SQLITE_FILE = os.environ.get("HMS_SQLITE_FILE", "hospital.db")
+CONFLICT_RETRIES = _env_int("HMS_CONFLICT_RETRIES", 10)             # re-runs of an operation that lost a write race
+CONFLICT_BACKOFF_SECONDS = float(os.environ.get("HMS_CONFLICT_BACKOFF_SECONDS", "0.02"))
+EVENT_LOG = os.environ.get("HMS_EVENT_LOG", "events.jsonl")          # "events" backend: append-only log of typed changes
+EVENT_SNAPSHOT_EVERY = _env_int("HMS_EVENT_SNAPSHOT_EVERY", 500)    # rewrite the JSON snapshots after this many events
+REPLICATION_ADDRESS = os.environ.get("HMS_REPLICATION_ADDRESS", "127.0.0.1:7700")  # primary's change feed
+REPLICATION_POLL_SECONDS = float(os.environ.get("HMS_REPLICATION_POLL_SECONDS", "0.2"))  # how often the feed checks the log
+REPLICATION_HEARTBEAT_SECONDS = float(os.environ.get("HMS_REPLICATION_HEARTBEAT_SECONDS", "1"))  # idle feed keep-alive
+READ_ONLY = os.environ.get("HMS_READ_ONLY", "0") == "1"              # standby: serve queries, refuse changes
+JOURNAL_DIR = os.environ.get("HMS_JOURNAL_DIR", "journal")          # write-ahead journal for multi-file commits
+ARCHIVE_DIR = os.environ.get("HMS_ARCHIVE_DIR", "archive")          # discharged patients, one file per month
+ARCHIVE_AFTER_DAYS = _env_int("HMS_ARCHIVE_AFTER_DAYS", 0)      # archive patients discharged at least this long ago
+JSON_CODEC = os.environ.get("HMS_JSON_CODEC", "auto")               # "auto" (orjson > ujson > json), or one of those
+JSON_COMPACT = os.environ.get("HMS_JSON_COMPACT", "0") == "1"        # no indentation in data files (production)
+SNAPSHOTS = os.environ.get("HMS_SNAPSHOTS", "1") == "1"              # keep <file>.snap binary snapshots for lazy lookups
+SERVICE_ADDRESS = os.environ.get("HMS_SERVICE_ADDRESS", "127.0.0.1:8080")  # python service.py listens here
+SERVICE_WRITE_BATCH = _env_int("HMS_SERVICE_WRITE_BATCH", 64)      # queued writes saved in one transaction at most
+SERVICE_QUEUE_SIZE = _env_int("HMS_SERVICE_QUEUE_SIZE", 1000)      # writes waiting for the writer before a 503
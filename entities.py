@@ -1,10 +1,35 @@
-class Person:
-    def __init__(self, id, name, age, gender):
-        self._id = str(id)
-        self._is_deleted = False
-        self.name = name
-        self.age = int(age)
-        self.gender = gender.capitalize()
+from datetime import datetime
+
+class Entity:
+    # Base for the stored entities. Subclasses use __slots__ (no per-instance __dict__)
+    # and list their JSON key -> attribute pairs in FIELDS, which to_dict/from_dict walk.
+    # Keys a class does not know (e.g. "billing" on patients) are kept in `extra`.
+    # The collections in repository.py hold plain record dicts, since those are what
+    # the storage backends, the indexes and in-place updates work on; entities build
+    # new records (add_*, bulk imports) and give typed rows to BedTable.
+    __slots__ = ("extra",)
+    FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.KEYS = frozenset(key for key, _ in cls.FIELDS)
+
+    def to_dict(self):
+        data = {key: getattr(self, attr) for key, attr in self.FIELDS}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        # trusts stored records as they are, no re-validation like __init__ does
+        obj = cls.__new__(cls)
+        for key, attr in cls.FIELDS:
+            setattr(obj, attr, data.get(key))
+        obj._is_deleted = bool(obj._is_deleted)
+        keys = cls.KEYS
+        obj.extra = {k: v for k, v in data.items() if k not in keys} or None
+        return obj
 
     @property
     def id(self):
@@ -17,16 +42,25 @@ class Person:
     def mark_deleted(self):
         self._is_deleted = True
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "age": self.age,
-            "gender": self.gender,
-            "isDeleted": self.is_deleted
-        }
+class Person(Entity):
+    __slots__ = ("_id", "_is_deleted", "name", "age", "gender")
+    FIELDS = (("id", "_id"), ("name", "name"), ("age", "age"), ("gender", "gender"),
+              ("isDeleted", "_is_deleted"))
+
+    def __init__(self, id, name, age, gender):
+        self._id = str(id)
+        self._is_deleted = False
+        self.name = name
+        self.age = int(age)
+        self.gender = gender.capitalize()
+        self.extra = None
 
 class Patient(Person):
+    __slots__ = ("priority", "present_medication", "past_medication", "doctor_id", "bed_id", "admitted_at")
+    FIELDS = Person.FIELDS + (("priority", "priority"), ("present_medication", "present_medication"),
+                              ("past_medication", "past_medication"), ("doctorId", "doctor_id"),
+                              ("bedId", "bed_id"), ("admittedAt", "admitted_at"))
+
     def __init__(self, id, name, age, gender, priority="yellow"):
         super().__init__(id, name, age, gender)
         self.priority = priority.capitalize()
@@ -34,31 +68,30 @@ class Patient(Person):
         self.past_medication = []
         self.doctor_id = None
         self.bed_id = None
+        self.admitted_at = datetime.now().isoformat(timespec='microseconds')
 
-    def to_dict(self):
-        base_dict = super().to_dict()
-        base_dict.update({
-            "priority": self.priority,
-            "present_medication": self.present_medication,
-            "past_medication": self.past_medication,
-            "doctorId": self.doctor_id,
-            "bedId": self.bed_id
-        })
-        return base_dict
+    @classmethod
+    def from_dict(cls, data):
+        obj = super().from_dict(data)
+        if obj.present_medication is None:
+            obj.present_medication = []
+        if obj.past_medication is None:
+            obj.past_medication = []
+        return obj
 
 class Doctor(Person):
+    __slots__ = ("specialization",)
+    FIELDS = Person.FIELDS + (("specialization", "specialization"),)
+
     def __init__(self, id, name, age, gender, specialization):
         super().__init__(id, name, age, gender)
         self.specialization = specialization
 
-    def to_dict(self):
-        base_dict = super().to_dict()
-        base_dict.update({
-            "specialization": self.specialization
-        })
-        return base_dict
+class Bed(Entity):
+    __slots__ = ("_id", "_is_deleted", "bed_type", "ward", "patient_id", "priority", "status")
+    FIELDS = (("id", "_id"), ("ward", "ward"), ("bed_type", "bed_type"), ("patientId", "patient_id"),
+              ("priority", "priority"), ("status", "status"), ("isDeleted", "_is_deleted"))
 
-class Bed:
     def __init__(self, id, bed_type="General", ward="A"):
         self._id = str(id)
         self._is_deleted = False
@@ -67,17 +100,7 @@ class Bed:
         self.patient_id = None
         self.priority = None
         self.status = "Vacant"
-
-    @property
-    def id(self):
-        return self._id
-
-    @property
-    def is_deleted(self):
-        return self._is_deleted
-
-    def mark_deleted(self):
-        self._is_deleted = True
+        self.extra = None
 
     def assign(self, patient_id, priority):
         self.patient_id = patient_id
@@ -88,14 +111,3 @@ class Bed:
         self.patient_id = None
         self.priority = None
         self.status = "Vacant"
-
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "ward": self.ward,
-            "bed_type": self.bed_type,
-            "patientId": self.patient_id,
-            "priority": self.priority,
-            "status": self.status,
-            "isDeleted": self.is_deleted
-        }
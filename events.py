@@ -0,0 +1,150 @@
+import os
+import tempfile
+
+import codec
+import config
+from streamreader import iter_jsonl
+
+# Typed change events for the "events" storage backend (storage.EventStorage).
+# Each commit is one line of the event log:
+#
+#   {"seq": 12, "at": "2024-05-02T10:00:00",
+#    "events": [{"type": "bed_assigned", "patientId": "P3", "bedId": "B5", "previousBedId": "B2"}],
+#    "changes": {"beds.json": {"B2": {...}, "B5": {...}}, "patients.json": {"P3": {...}}}}
+#
+# "events" says what happened; "changes" holds the records as the operation left them
+# (null for a removed one), so replaying a line twice does no harm. A log that was
+# started by a checkpoint opens with {"checkpoint": 11}: everything up to seq 11 is in
+# the JSON snapshots, and the lines before it were moved to events-000001-000011.jsonl.
+
+EVENT_TYPES = {
+    "patient_added": ("patientId",),
+    "doctor_added": ("doctorId",),
+    "bed_added": ("bedId",),
+    "records_imported": ("file", "count"),
+    "bed_assigned": ("patientId", "bedId", "previousBedId"),
+    "doctor_assigned": ("patientId", "doctorId", "previousDoctorId"),
+    "priority_changed": ("patientId", "priority"),
+    "medication_changed": ("patientId", "stopped", "started"),
+    "billing_item_added": ("patientId", "item", "price"),
+    "patient_discharged": ("patientId", "total"),
+    "patients_archived": ("patientIds",),
+}
+
+def make_event(event_type, **data):
+    fields = EVENT_TYPES.get(event_type)
+    if fields is None:
+        raise ValueError(f"Unknown event type: {event_type}")
+    if set(data) != set(fields):
+        raise ValueError(f"{event_type} takes {', '.join(fields)}, got {', '.join(sorted(data)) or 'nothing'}")
+    return {"type": event_type, **data}
+
+class EventLog:
+    # The append-only log file. Reads are incremental: read_new() returns only the
+    # lines added since the previous call, so following another process costs the size
+    # of its events. Writers must hold the storage's lock on the log.
+    def __init__(self, path=None):
+        self.path = path or config.EVENT_LOG
+        self._file_id = None
+        self._offset = 0
+
+    def read_new(self):
+        # (reset, entries): reset is True when the file was replaced (rotated by a
+        # checkpoint, or removed) and reading started over from its first line
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            reset = self._file_id is not None
+            self._file_id, self._offset = None, 0
+            return reset, []
+        with f:
+            st = os.fstat(f.fileno())
+            file_id = (st.st_dev, st.st_ino)
+            reset = file_id != self._file_id or st.st_size < self._offset
+            offset = 0 if reset else self._offset
+            if st.st_size == offset:
+                self._file_id, self._offset = file_id, offset
+                return reset, []
+            f.seek(offset)
+            data = f.read()
+        # complete lines only; a torn last line is cut off by the next writer
+        end = data.rfind(b"\n") + 1
+        entries = []
+        for line in data[:end].splitlines():
+            if line.strip():
+                try:
+                    entries.append(codec.loads(line))
+                except ValueError:
+                    continue
+        self._file_id, self._offset = file_id, offset + end
+        return reset, entries
+
+    def append(self, line, fsync=False):
+        # Called right after read_new() under the log lock, so anything past the read
+        # offset is the torn line of a writer that crashed mid-append.
+        with open(self.path, 'ab') as f:
+            if f.tell() > self._offset:
+                f.truncate(self._offset)
+            f.write(line)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+            st = os.fstat(f.fileno())
+        self._file_id = (st.st_dev, st.st_ino)
+        self._offset += len(line)
+
+    def segment_name(self, first, last):
+        root, ext = os.path.splitext(self.path)
+        return f"{root}-{first:06d}-{last:06d}{ext}"
+
+    def rotate(self, first, last):
+        # Moves the lines first..last aside, kept as history, and starts a new log that
+        # opens with a checkpoint line. Called under the log lock.
+        line = codec.dumps_line({"checkpoint": last}).encode("utf-8") + b"\n"
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp",
+                                   dir=os.path.dirname(os.path.abspath(self.path)))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(line)
+        if os.path.exists(self.path):
+            os.replace(self.path, self.segment_name(first, last))
+        os.replace(tmp, self.path)
+        st = os.stat(self.path)
+        self._file_id = (st.st_dev, st.st_ino)
+        self._offset = len(line)
+
+    def restart(self, checkpoint):
+        # Drops the log and its segments and starts over after `checkpoint`; used when a
+        # standby installs a fresh copy of the primary's data (see replication.py)
+        for path in self.segments():
+            os.remove(path)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.rotate(checkpoint + 1, checkpoint)
+
+    def segments(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        root, ext = os.path.splitext(os.path.basename(self.path))
+        return sorted(os.path.join(directory, n) for n in os.listdir(directory)
+                      if n.startswith(root + "-") and n.endswith(ext))
+
+    def _segment_range(self, path):
+        # events-000001-000500.jsonl -> (1, 500)
+        first, last = os.path.splitext(os.path.basename(path))[0].rsplit("-", 2)[1:]
+        return int(first), int(last)
+
+    def first_seq(self):
+        # lowest seq still on disk, or None for an empty log; anything older only lives in
+        # the JSON snapshots
+        segments = self.segments()
+        if segments:
+            return self._segment_range(segments[0])[0]
+        for entry in iter_jsonl(self.path) if os.path.exists(self.path) else ():
+            return entry["checkpoint"] + 1 if "checkpoint" in entry else entry["seq"]
+        return None
+
+    def entries(self, after=0):
+        # the history after seq `after`, rotated segments first; checkpoint lines are skipped
+        paths = [p for p in self.segments() if self._segment_range(p)[1] > after] + [self.path]
+        for path in paths:
+            if os.path.exists(path):
+                yield from (e for e in iter_jsonl(path) if "checkpoint" not in e and e["seq"] > after)
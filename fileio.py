@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import time
+
+import codec
+import config
+
+# Low-level file helpers shared by utils.write_json and the storage backends.
+# They raise on failure, so callers can react to it.
+
+def backup_filename(file):
+    # E.g., patients.json → patients_backup.json
+    if file.endswith('.json'):
+        return file.replace('.json', '_backup.json')
+    else:
+        return file + '_backup'
+
+def rotated_backup_filename(file, n):
+    # patients_backup.json is the newest snapshot, patients_backup.1.json the one before it...
+    base = backup_filename(file)
+    if n == 0:
+        return base
+    root, ext = os.path.splitext(base)
+    return f"{root}.{n}{ext}"
+
+def atomic_write_json(file, data, fsync=None, compact=None):
+    # Write to a temp file next to the target and rename it over the target, so readers
+    # see either the old or the new file, never a truncated one.
+    if fsync is None:
+        fsync = config.WRITE_FSYNC
+    directory = os.path.dirname(os.path.abspath(file))
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(file) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(codec.dumps(data, compact))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, file)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    if fsync and hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)  # make the rename itself durable
+        finally:
+            os.close(dir_fd)
+
+_writes_since_backup = {}
+
+def backup_due(file):
+    count = _writes_since_backup.get(file, 0) + 1
+    _writes_since_backup[file] = count
+    if count >= config.BACKUP_EVERY_N_WRITES:
+        return True
+    try:
+        age = time.time() - os.path.getmtime(backup_filename(file))
+    except OSError:
+        return True  # no snapshot yet
+    return age >= config.BACKUP_INTERVAL_SECONDS
+
+def take_backup(file):
+    # Shift the older snapshots down one slot, then copy the current file in as the newest
+    keep = max(1, config.BACKUP_KEEP)
+    for n in range(keep - 1, 0, -1):
+        older = rotated_backup_filename(file, n - 1)
+        if os.path.exists(older):
+            os.replace(older, rotated_backup_filename(file, n))
+    backup_file = backup_filename(file)
+    tmp = backup_file + ".tmp"
+    shutil.copyfile(file, tmp)
+    os.replace(tmp, backup_file)
+    _writes_since_backup[file] = 0
+    return backup_file
+
+def write_with_backup(file, data, fsync=None):
+    # Returns the snapshot file when a rotated backup was taken, else None
+    atomic_write_json(file, data, fsync)
+    if backup_due(file):
+        return take_backup(file)
+    return None
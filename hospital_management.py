@@ -1,13 +1,38 @@
 
-from collections import defaultdict
-from utils import read_json, write_json
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+import config
 from entities import Patient, Doctor, Bed
+from repository import Repository
+from bed_allocator import BedAllocator, is_vacant, normalize_status, OCCUPIED, VACANT
+from bed_table import BedTable
+from storage import VersionConflict
+from locks import LockTimeout
+from sequence import SequenceAllocator
+from importer import read_rows, missing_fields, RowError
+from archive import PatientArchive
+from logstore import query_logs
+from utils import flush_logs, log_action
+
+READ_ONLY_MESSAGE = " This station is a read-only standby; make changes on the primary."
 
 class HospitalManager:
     def __init__(self):
         self.patient_file = "patients.json"
         self.doctor_file = "doctors.json"
         self.bed_file = "beds.json"
+        self.repo = Repository(self.patient_file, self.doctor_file, self.bed_file)
+        self.ids = SequenceAllocator()
+        self.bed_allocator = BedAllocator(self.repo.beds)
+        self.archive = PatientArchive()
+        self.conflict_retries = 0
+        # The operations below print their message (the menus) and return it, or the new
+        # id for add_*; service.py turns echo off and reads last_message instead.
+        self.echo = True
+        self.last_message = None
         self.facilities = {
              "X-Ray": 500,
              "Blood Test": 300,
@@ -20,280 +45,443 @@ class HospitalManager:
     def add_patient(self, name, age, gender, priority="yellow"): #priorities(red being highest,green lowest)
         pid = self.generate_id(self.patient_file, "P")
         patient = Patient(pid, name, age, gender, priority)
-        self.save_entity(self.patient_file, patient)
-        print(f" Patient added: {pid}")
+
+        def apply():
+            self.repo.record("patient_added", patientId=pid)
+            self.save_entity(self.patient_file, patient)
+            return f" Patient added: {pid}"
+        self._report(self._mutate(apply))
+        return pid if pid and self.repo.patients.get(pid) else None
 
     def add_doctor(self, name, age, gender, specialization):
         did = self.generate_id(self.doctor_file, "D")
         doctor = Doctor(did, name, age, gender, specialization)
-        self.save_entity(self.doctor_file, doctor)
-        print(f" Doctor added: {did}")
+
+        def apply():
+            self.repo.record("doctor_added", doctorId=did)
+            self.save_entity(self.doctor_file, doctor)
+            return f" Doctor added: {did}"
+        self._report(self._mutate(apply))
+        return did if did and self.repo.doctors.get(did) else None
 
     def add_bed(self, bed_type="GENERAL", ward="A"):
         bid = self.generate_id(self.bed_file, "B")
         bed = Bed(bid, bed_type=bed_type.upper(), ward=ward.upper())
-        self.save_entity(self.bed_file, bed)
-        print(f" Bed added: {bid} | Type: {bed_type.upper()} | Ward: {ward.upper()}")
+
+        def apply():
+            self.repo.record("bed_added", bedId=bid)
+            self.save_entity(self.bed_file, bed)
+            return f" Bed added: {bid} | Type: {bed_type.upper()} | Ward: {ward.upper()}"
+        self._report(self._mutate(apply))
+        return bid if bid and self.repo.beds.get(bid) else None
+
+    def bulk_add_patients(self, source):
+        return self._bulk_add(self.patient_file, "P", "patients", source, ("name", "age", "gender"),
+                              lambda r: Patient("", r["name"], r["age"], r["gender"], r.get("priority") or "yellow"))
+
+    def bulk_add_doctors(self, source):
+        return self._bulk_add(self.doctor_file, "D", "doctors", source, ("name", "age", "gender", "specialization"),
+                              lambda r: Doctor("", r["name"], r["age"], r["gender"], r["specialization"]))
+
+    def bulk_add_beds(self, source):
+        return self._bulk_add(self.bed_file, "B", "beds", source, (),
+                              lambda r: Bed("", bed_type=(r.get("bed_type") or "GENERAL").upper(),
+                                            ward=(r.get("ward") or "A").upper()))
+
+    def _bulk_add(self, file, prefix, label, source, required, build):
+        # Rows are validated through the entity classes, ids are reserved in one
+        # block and the whole batch is persisted with a single write.
+        started = time.perf_counter()
+        records, errors = [], []
+        for row_no, row in enumerate(read_rows(source), 1):
+            if isinstance(row, RowError):
+                errors.append(f"row {row_no}: {row}")
+                continue
+            missing = missing_fields(row, required)
+            if missing:
+                errors.append(f"row {row_no}: missing {', '.join(missing)}")
+                continue
+            try:
+                records.append(build(row).to_dict())
+            except (TypeError, ValueError, AttributeError) as e:
+                errors.append(f"row {row_no}: {e}")
+
+        if records and self.repo.read_only:
+            print(READ_ONLY_MESSAGE)
+            records = []
+        if records:
+            collection = self.repo.by_file[file]
+            ids = self.ids.reserve(prefix, len(records), seed=lambda: self.max_id_in_use(file, prefix))
+            for record_id, record in zip(ids, records):
+                record["id"] = record_id
+
+            def apply():
+                self.repo.record("records_imported", file=file, count=len(records))
+                for record in records:
+                    collection.add(dict(record))
+            failed = self._mutate(apply)
+            if failed:
+                print(failed)
+                records = []
+
+        elapsed = time.perf_counter() - started
+        rate = len(records) / elapsed if elapsed > 0 else 0.0
+        print(f" Imported {len(records)} {label} in {elapsed:.2f}s ({rate:.0f} rows/s), {len(errors)} rows skipped.")
+        for error in errors[:10]:
+            print(f"  - {error}")
+        return {"imported": len(records), "skipped": len(errors), "errors": errors,
+                "seconds": elapsed, "rows_per_sec": rate}
 
     def assign_bed_to_patient(self, patient_id, bed_id):
-        patients = read_json(self.patient_file)
-        beds = read_json(self.bed_file)
+        def apply():
+            patients = self.repo.patients
+            beds = self.repo.beds
 
-        bed = next((b for b in beds if b["id"] == bed_id), None)
-        if not bed:
-            print(f"Bed with ID {bed_id} not found.")
-            return
+            bed = beds.get(bed_id)
+            if not bed:
+                return f"Bed with ID {bed_id} not found."
 
-        patient = next((p for p in patients if p["id"] == patient_id), None)
-        if not patient:
-            print(f"Patient with ID {patient_id} not found.")
-            return
+            patient = patients.get(patient_id)
+            if not patient:
+                return f"Patient with ID {patient_id} not found."
+
+            holder = bed.get("patientId")
+            if holder != patient_id and (holder or not is_vacant(bed)):
+                return f"Bed {bed_id} is already occupied."
+
+            self._occupy_bed(patient, bed)
+            return f"Assigned Bed {bed_id} to Patient {patient_id} and marked bed as occupied."
+
+        return self._report(self._mutate(apply))
 
-        updated_patient = False
-        updated_bed = False
-
-        for p in patients:
-            if p["id"] == patient_id:
-                p["bedId"] = bed_id
-                updated_patient = True
-                break
-
-        for b in beds:
-            if b["id"] == bed_id:
-                b["patientId"] = patient_id
-                b["priority"] = patient.get("priority", "low")
-                b["status"] = "occupied"  # <-- update bed status here
-                updated_bed = True
-                break
-
-        if updated_patient and updated_bed:
-            write_json(self.patient_file, patients)
-            write_json(self.bed_file, beds)
-            print(f"Assigned Bed {bed_id} to Patient {patient_id} and marked bed as occupied.")
-        else:
-            print("Assignment failed.")
+    def auto_assign_bed(self, patient_id, bed_type=None, ward=None):
+        # Takes the first free bed from the (ward, bed_type) free lists. Without an explicit
+        # bed type the patient's priority decides the order, red patients get ICU beds first.
+        def apply():
+            patient = self.repo.patients.get_active(patient_id)
+            if not patient:
+                return f"Patient with ID {patient_id} not found."
+
+            bed = self.bed_allocator.pick(patient.get("priority"), bed_type, ward)
+            if not bed:
+                wanted = " ".join(filter(None, [bed_type and bed_type.upper(), ward and f"in ward {ward.upper()}"]))
+                return f"No vacant bed available{' (' + wanted + ')' if wanted else ''}."
+
+            old_bed_id = patient.get("bedId")
+            self._occupy_bed(patient, bed)
+            moved = f" (moved from Bed {old_bed_id})" if old_bed_id and old_bed_id != bed["id"] else ""
+            return (f"Assigned Bed {bed['id']} | Type: {bed['bed_type']} | Ward: {bed['ward']} "
+                    f"to Patient {patient_id}{moved}.")
+
+        return self._report(self._mutate(apply))
+
+    def _occupy_bed(self, patient, bed):
+        # frees the patient's previous bed, so it goes back on its free list
+        patients = self.repo.patients
+        beds = self.repo.beds
+        old_bed_id = patient.get("bedId")
+        self.repo.record("bed_assigned", patientId=patient["id"], bedId=bed["id"], previousBedId=old_bed_id)
+        if old_bed_id and old_bed_id != bed["id"] and beds.get(old_bed_id) and \
+                beds.get(old_bed_id).get("patientId") == patient["id"]:
+            beds.update(old_bed_id, patientId=None, priority=None, status=VACANT)
+
+        patients.update(patient["id"], bedId=bed["id"])
+        beds.update(bed["id"], patientId=patient["id"], priority=patient.get("priority", "low"),
+                    status=OCCUPIED)  # <-- update bed status here
 
     def assign_doctor_to_patient(self, patient_id, doctor_id):
-        patients = read_json(self.patient_file)
-        doctors = read_json(self.doctor_file)
+        def apply():
+            patients = self.repo.patients
 
-        doctor_exists = any(doc["id"] == doctor_id for doc in doctors)
-        if not doctor_exists:
-            print(f"Doctor with ID {doctor_id} not found.")
-            return
+            if self.repo.doctors.get(doctor_id) is None:
+                return f"Doctor with ID {doctor_id} not found."
+
+            if patients.get(patient_id) is None:
+                return f"Patient with ID {patient_id} not found."
+
+            self.repo.record("doctor_assigned", patientId=patient_id, doctorId=doctor_id,
+                             previousDoctorId=patients.get(patient_id).get("doctorId"))
+            patients.update(patient_id, doctorId=doctor_id)
+            return f"Assigned Doctor {doctor_id} to Patient {patient_id}"
 
-        updated = False
-        for patient in patients:
-            if patient["id"] == patient_id:
-                patient["doctorId"] = doctor_id
-                updated = True
-                break
+        return self._report(self._mutate(apply))
 
-        if updated:
-            write_json(self.patient_file, patients)
-            print(f"Assigned Doctor {doctor_id} to Patient {patient_id}")
-        else:
-            print(f"Patient with ID {patient_id} not found.")
+    def get_occupancy(self, ward=None):
+        # {ward: {bed_type: {"total", "occupied", "vacant"}}} from the running counters,
+        # O(wards) whatever the number of beds
+        return self.repo.beds.index("occupancy").summary(ward)
+
+    def bed_table(self):
+        # columnar view of the beds for dashboards; attached on first use and then
+        # kept current by the beds collection
+        beds = self.repo.beds
+        if "table" not in beds.indexes:
+            beds.add_index("table", BedTable())
+        return beds.index("table")
 
     def show_bed_status(self):
-        beds = read_json(self.bed_file)
+        beds = self.repo.beds.all()
         if not beds:
             print("No beds available.")
             return
 
-        ward_summary = defaultdict(lambda: {
-            "GENERAL_total": 0, "GENERAL_occupied": 0,
-            "ICU_total": 0, "ICU_occupied": 0,
-            "SPECIAL_total": 0, "SPECIAL_occupied": 0
-        })
-
-        for bed in beds:
-            if bed.get("isDeleted", False):
-                continue
-            ward = bed.get("ward", "UNKNOWN")
-            bed_type = bed.get("bed_type", "").upper()
-            status = bed.get("status", "").lower()
-
-            key_total = f"{bed_type}_total"
-            key_occupied = f"{bed_type}_occupied"
-            if key_total in ward_summary[ward]:
-                ward_summary[ward][key_total] += 1
-                if status == "occupied":
-                    ward_summary[ward][key_occupied] += 1
-
         print("---- Bed Summary by Ward ----")
-        for ward, counts in ward_summary.items():
+        for ward, counts in self.get_occupancy().items():
             print(f"Ward: {ward}")
-            print(f"  General: {counts['GENERAL_occupied']} occupied / {counts['GENERAL_total']} total")
-            print(f"  ICU    : {counts['ICU_occupied']} occupied / {counts['ICU_total']} total")
-            print(f"  Special: {counts['SPECIAL_occupied']} occupied / {counts['SPECIAL_total']} total")
+            print(f"  General: {counts['GENERAL']['occupied']} occupied / {counts['GENERAL']['total']} total")
+            print(f"  ICU    : {counts['ICU']['occupied']} occupied / {counts['ICU']['total']} total")
+            print(f"  Special: {counts['SPECIAL']['occupied']} occupied / {counts['SPECIAL']['total']} total")
         print("-" * 60)
 
         print(f"{'Bed ID':<8} {'Ward':<6} {'Type':<10} {'Status':<10} {'Patient ID':<12} {'Priority':<10}")
         print("-" * 60)
         for bed in beds:
             if not bed.get("isDeleted", False):
-                print(f"{bed['id']:<8} {bed['ward']:<6} {bed['bed_type'].title():<10} {bed['status'].capitalize():<10} "
+                print(f"{bed['id']:<8} {bed['ward']:<6} {bed['bed_type'].title():<10} {normalize_status(bed['status']):<10} "
                       f"{str(bed.get('patientId') or '-'): <12} {str(bed.get('priority') or '-'): <10}")
 
     def show_patients(self):
-        patients = read_json(self.patient_file)
         print("\n Patients List:")
-        for p in patients:
-            if not p["isDeleted"]:
+        for p in self.repo.patients.stream():
+            if not p.get("isDeleted", False):
                 print(f"ID: {p['id']}, Name: {p['name']}, Age: {p['age']}, Gender: {p['gender']}, Priority: {p['priority']}")
 
 
     def get_patients_by_doctor(self, doctor_id):
-        patients = read_json(self.patient_file)
-        doctor_patients = [p for p in patients if p.get("doctorId") == doctor_id and not p.get("isDeleted", False)]
+        # already in triage order (red > yellow > green, then admission time)
+        doctor_patients = self.triage_list(doctor_id)
 
         if not doctor_patients:
             print(f"No patients found for Doctor ID: {doctor_id}")
             return
 
-        # Priority map: higher value = higher priority
-        priority_order = {"red": 3, "yellow": 2, "green": 1}
-        doctor_patients.sort(key=lambda p: -priority_order.get(p.get("priority", "").lower(), 0))
-
         print(f"\nPatients assigned to Doctor ID: {doctor_id} (sorted by priority)")
         for p in doctor_patients:
             print(f"ID: {p['id']}, Name: {p['name']}, Age: {p['age']}, Gender: {p['gender']}, Priority: {p['priority']}")
 
+    def triage_list(self, doctor_id, limit=None):
+        patients = self.repo.patients
+        return [patients.get(pid) for pid in patients.index("triage").ordered(doctor_id, limit)]
+
+    def next_patient_for_doctor(self, doctor_id):
+        # top of the doctor's triage heap, no sorting
+        patients = self.repo.patients
+        patient_id = patients.index("triage").peek(doctor_id)
+        if patient_id is None:
+            print(f"No patients waiting for Doctor ID: {doctor_id}")
+            return None
+        p = patients.get(patient_id)
+        print(f"Next patient for Doctor {doctor_id}: ID: {p['id']}, Name: {p['name']}, Priority: {p['priority']}")
+        return p
+
     def generate_id(self, file, prefix):  # generates Id like P1, D2, B3
-        try:
-            data = read_json(file)
-            if not data:
-                return f"{prefix}1"
-            max_num = max(int(d["id"][1:]) for d in data if d["id"].startswith(prefix))
-            return f"{prefix}{max_num + 1}"
-        except Exception:
-            return f"{prefix}1"
+        if self.repo.read_only:
+            return None  # a standby's sequences must not run ahead of the primary; _mutate refuses anyway
+        return self.ids.next_id(prefix, seed=lambda: self.max_id_in_use(file, prefix))
+
+    def max_id_in_use(self, file, prefix):
+        # only scanned once per prefix, to start the sequence after existing records
+        record_ids = list(self.repo.by_file[file].records)
+        if file == self.patient_file:
+            record_ids += self.archive.ids()  # archived ids must not be handed out again
+        numbers = [int(record_id[len(prefix):]) for record_id in record_ids
+                   if record_id.startswith(prefix) and record_id[len(prefix):].isdigit()]
+        return max(numbers, default=0)
 
     def save_entity(self, file, entity):
-        data = read_json(file)
-        data.append(entity.to_dict()) #fetch json and append to json before writing back
-        write_json(file, data)
-
-
-
+        collection = self.repo.by_file[file]
+        collection.add(entity.to_dict()) #append in memory, written through on commit
+        self.repo.commit()
+
+    def transaction(self):
+        # Unit of work: operations run inside `with h.transaction():` are committed together,
+        # atomically, when the block ends (and not at all if it raises). A conflict with
+        # another process surfaces as VersionConflict at the end of the block.
+        return self.repo.batch()
+
+    def _mutate(self, apply):
+        # Runs one read-modify-write inside a batch and returns apply()'s message. If another
+        # process saved the same collections first, our changes are dropped and apply() runs
+        # again on top of the fresh state instead of overwriting theirs. A lock that cannot
+        # be had or a failed write is logged and reported; the batch has rolled back.
+        if self.repo.read_only:
+            return READ_ONLY_MESSAGE
+        for attempt in range(config.CONFLICT_RETRIES):
+            try:
+                with self.repo.batch():
+                    return apply()
+            except VersionConflict:
+                self.conflict_retries += 1
+                # jittered exponential backoff so the competing writers spread out
+                time.sleep(random.uniform(0, config.CONFLICT_BACKOFF_SECONDS * 2 ** min(attempt, 6)))
+            except (LockTimeout, OSError) as e:
+                log_action("write", getattr(e, "filename", None) or "-", f"error: {str(e)}")
+                return f" Could not save: {e}. Nothing was changed, please try again."
+        return " Could not save: the records were changed by another station, please try again."
+
+    def _report(self, message):
+        self.last_message = message
+        if self.echo:
+            print(message)
+        return message
 
     def discharge_patient(self, patient_id):
-            patients = read_json(self.patient_file)
-            beds = read_json(self.bed_file)
-
-            patient = next((p for p in patients if p["id"] == patient_id and not p.get("isDeleted", False)), None)
-            if not patient:
-                print(" Patient not found or already discharged.")
-                return
-
-            print(f"\nBilling Summary for {patient['name']} (ID: {patient_id}):")
-            billing_items = patient.get("billing", [])
-            total_amount = sum(self.facilities.get(item, 0) for item in billing_items)
-            if billing_items:
-                for item in billing_items:
-                    print(f" - {item}: ₹{self.facilities.get(item, 0)}")
-            else:
-                print(" No facilities used.")
-            print(f"Total Bill: ₹{total_amount}")
-
-            patient["isDeleted"] = True
-
-            for bed in beds:
-                if bed.get("patientId") == patient_id:
-                    bed["patientId"] = None
-                    bed["doctorId"] = None
-                    bed["priority"] = None
-                    bed["status"] = "Vacant"
-
-            write_json(self.patient_file, patients)
-            write_json(self.bed_file, beds)
-            print(f"✅ Patient {patient_id} discharged and bed freed.")
+            def apply():
+                patients = self.repo.patients
+                beds = self.repo.beds
+
+                patient = patients.get_active(patient_id)
+                if not patient:
+                    return " Patient not found or already discharged."
+
+                lines = [f"\nBilling Summary for {patient['name']} (ID: {patient_id}):"]
+                billing_items = patient.get("billing", [])
+                total_amount = sum(self.facilities.get(item, 0) for item in billing_items)
+                if billing_items:
+                    for item in billing_items:
+                        lines.append(f" - {item}: ₹{self.facilities.get(item, 0)}")
+                else:
+                    lines.append(" No facilities used.")
+                lines.append(f"Total Bill: ₹{total_amount}")
+
+                self.repo.record("patient_discharged", patientId=patient_id, total=total_amount)
+
+                patients.update(patient_id, isDeleted=True, dischargedAt=datetime.now().isoformat(timespec='seconds'))
+
+                for bed in beds.find("patientId", patient_id):
+                    beds.update(bed["id"], patientId=None, doctorId=None, priority=None, status=VACANT)
+
+                lines.append(f"✅ Patient {patient_id} discharged and bed freed.")
+                return "\n".join(lines)
+
+            return self._report(self._mutate(apply))
+
+    def archive_discharged(self, older_than_days=None):
+        # Moves discharged patients (billing and medication history included) out of
+        # patients.json into the monthly archive files, keeping the working set small.
+        days = config.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+
+        def apply():
+            patients = self.repo.patients
+            # patients discharged before dischargedAt was recorded count as old enough
+            due = [p for p in patients.all() if p.get("isDeleted", False) and (p.get("dischargedAt") or "") <= cutoff]
+            if not due:
+                return " No discharged patients to archive."
+            self.repo.record("patients_archived", patientIds=[p["id"] for p in due])
+            # written before the patients leave patients.json, so a crash loses nothing;
+            # a retry (or a later run after a failed commit) finds them indexed and skips them
+            self.archive.add(due)
+            for p in due:
+                patients.remove(p["id"])
+            return f" Archived {len(due)} discharged patients, {len(patients.records)} left in {self.patient_file}."
+
+        return self._report(self._mutate(apply))
+
+    def find_archived_patient(self, patient_id):
+        entry = self.archive.get(patient_id)
+        if not entry:
+            print(f" No archived patient with ID {patient_id}.")
+            return None
+        p = entry["patient"]
+        print(f"ID: {p['id']}, Name: {p['name']}, Age: {p['age']}, Gender: {p['gender']}, Priority: {p['priority']}")
+        print(f"  Discharged: {p.get('dischargedAt') or 'unknown'}, archived: {entry['archivedAt']}")
+        print(f"  Medications: {', '.join(p.get('present_medication') or []) or 'None'}"
+              f" | Past: {', '.join(p.get('past_medication') or []) or 'None'}")
+        billing = p.get("billing") or []
+        print(f"  Billing: {', '.join(billing) or 'None'} (₹{sum(self.facilities.get(i, 0) for i in billing)})")
+        return p
 
     def update_patient_priority(self, patient_id, new_priority):
-        patients = read_json(self.patient_file)
-        beds = read_json(self.bed_file)
+        def apply():
+            patients = self.repo.patients
+            beds = self.repo.beds
 
-        found = False
-        for p in patients:
-            if p["id"] == patient_id and not p["isDeleted"]:
-                p["priority"] = new_priority.capitalize()
-                found = True
-                break
+            if not patients.get_active(patient_id):
+                return "Patient not found or deleted."
 
-        if found:
-            for b in beds:
-                if b.get("patientId") == patient_id and not b["isDeleted"]:
-                    b["priority"] = new_priority.capitalize()
-            write_json(self.patient_file, patients)
-            write_json(self.bed_file, beds)
-            print(f"Updated priority for {patient_id} to {new_priority}")
-        else:
-            print("Patient not found or deleted.")
+            self.repo.record("priority_changed", patientId=patient_id, priority=new_priority.capitalize())
+            patients.update(patient_id, priority=new_priority.capitalize())
+            for b in beds.find("patientId", patient_id):
+                if not b["isDeleted"]:
+                    beds.update(b["id"], priority=new_priority.capitalize())
+            return f"Updated priority for {patient_id} to {new_priority}"
+
+        return self._report(self._mutate(apply))
 
 
 
     def show_doctors(self):
-        doctors = read_json(self.doctor_file)
         print("\n Doctors List:")
-        for d in doctors:
-            if not d["isDeleted"]:
-                print(f"ID: {d['id']}, Name: {d['name']}, Age: {d['age']}, Gender: {d['gender']}, Specialization: {d['specialization']}")
+        for d in self.repo.doctors.stream():
+            if not d.get("isDeleted", False):
+                print(f"ID: {d['id']}, Name: {d['name']}, Age: {d['age']}, Gender: {d['gender']}, "
+                      f"Specialization: {d['specialization']}")
+
+    def show_logs(self, action=None, file=None, limit=20):
+        # last `limit` matching audit entries, rotated segments included; the log is
+        # streamed, only `limit` are kept
+        flush_logs()
+        recent = deque(query_logs(action=action, file=file), maxlen=limit)
+        if not recent:
+            print(" No matching log entries.")
+            return
+        for entry in recent:
+            print(f"{entry.get('timestamp', '-'):<20} {entry.get('action', '-'):<14} "
+                  f"{entry.get('file', '-')}: {entry.get('status', '-')}")
 
     def doctor_visit(self, patient_id):
-        patients = read_json(self.patient_file)
-        for p in patients:
-            if p["id"] == patient_id and not p["isDeleted"]:
-                print(f"\n Doctor Visit for {p['name']} (ID: {p['id']}, Age: {p['age']}, Gender: {p['gender']})")
-                print(f"Current Medications: {', '.join(p['present_medication']) or 'None'}")
-                print(f"Past Medications: {', '.join(p['past_medication']) or 'None'}")
-
-                to_remove = input("Enter medications to stop (comma-separated): ").strip()
-                if to_remove:
-                    to_remove_list = [m.strip() for m in to_remove.split(",")]
-                    for m in to_remove_list:
-                        if m in p["present_medication"]:
-                            p["present_medication"].remove(m)
-                        p["past_medication"].append(m)
-
-                to_add = input("Enter new medications (comma-separated): ").strip()
-                if to_add:
-                    for med in map(str.strip, to_add.split(",")):
-                        if med:
-                            p["present_medication"].append(med)
-
-                write_json(self.patient_file, patients)
-                print(" Medications updated.")
-                return
+        p = self.repo.patients.get_active(patient_id)
+        if not p:
+            print(" Patient not found or deleted.")
+            return
 
-        print(" Patient not found or deleted.")
+        print(f"\n Doctor Visit for {p['name']} (ID: {p['id']}, Age: {p['age']}, Gender: {p['gender']})")
+        print(f"Current Medications: {', '.join(p['present_medication']) or 'None'}")
+        print(f"Past Medications: {', '.join(p['past_medication']) or 'None'}")
+
+        to_remove = input("Enter medications to stop (comma-separated): ").strip()
+        to_remove_list = [m.strip() for m in to_remove.split(",")] if to_remove else []
+        to_add = input("Enter new medications (comma-separated): ").strip()
+        to_add_list = [med for med in map(str.strip, to_add.split(",")) if med] if to_add else []
+        self.update_medications(patient_id, to_remove_list, to_add_list)
+
+    def update_medications(self, patient_id, to_remove_list, to_add_list):
+        # applied to the latest copy of the patient, after the prompts
+        def apply():
+            p = self.repo.patients.get_active(patient_id)
+            if not p:
+                return " Patient not found or deleted."
+            self.repo.record("medication_changed", patientId=patient_id, stopped=to_remove_list, started=to_add_list)
+            for m in to_remove_list:
+                if m in p["present_medication"]:
+                    p["present_medication"].remove(m)
+                p["past_medication"].append(m)
+            for med in to_add_list:
+                p["present_medication"].append(med)
+            self.repo.patients.mark_dirty(patient_id)
+            return " Medications updated."
+
+        return self._report(self._mutate(apply))
 
     def fetch_patients_by_doctor(self, doctor_id):
-        beds = read_json(self.bed_file)
-        patients = read_json(self.patient_file)
-
-        priority_map = {"red": 3, "yellow": 2, "green": 1, None: 0}
-
-        # Filter and sort beds assigned to the given doctor, by patient priority
-        filtered_beds = [
-            bed for bed in beds
-            if not bed["isDeleted"]
-            and bed["doctorId"] == doctor_id
-            and bed["status"] == "Occupied"
-        ]
+        beds = self.repo.beds
 
-        sorted_beds = sorted( filtered_beds, key=lambda b: -priority_map.get((b.get("priority") or "").lower(), 0)) #-priority because to get red-3 first before yellow-2
+        # the doctor's patients in triage order, limited to those currently in a bed
+        in_beds = []
+        for patient in self.triage_list(doctor_id):
+            bed = beds.get(patient.get("bedId")) if patient.get("bedId") else None
+            if bed and not bed["isDeleted"] and bed.get("patientId") == patient["id"]:
+                in_beds.append((patient, bed))
 
-        if not sorted_beds:
+        if not in_beds:
             print(f" No patients found for Doctor ID: {doctor_id}")
             return
 
         print(f"\n Patients under Doctor {doctor_id} (sorted by priority):")
-        for bed in sorted_beds:
-            patient = next((p for p in patients if p["id"] == bed["patientId"] and not p["isDeleted"]), None)
-            if patient:
-                print(f"🔹 Patient ID: {patient['id']}, Name: {patient['name']}, Age: {patient['age']}, "
-                      f"Gender: {patient['gender']}, Priority: {patient['priority']}, Bed ID: {bed['id']}")
+        for patient, bed in in_beds:
+            print(f"🔹 Patient ID: {patient['id']}, Name: {patient['name']}, Age: {patient['age']}, "
+                  f"Gender: {patient['gender']}, Priority: {patient['priority']}, Bed ID: {bed['id']}")
 
     # def change_doctor_for_bed(self, bed_id, new_doctor_id):
     #     beds = read_json(self.bed_file)
@@ -319,20 +507,17 @@ class HospitalManager:
     #     print(f" Doctor for Bed {bed_id} changed from {old_doctor_id} to {new_doctor_id}.")
 
     def billing_menu(self, patient_id):
-            patients = read_json(self.patient_file)
-            patient = next((p for p in patients if p["id"] == patient_id and not p.get("isDeleted", False)), None)
+            patient = self.repo.patients.get_active(patient_id)
 
             if not patient:
                 print(" Patient not found or already deleted.")
                 return
 
-            if "billing" not in patient:
-                patient["billing"] = []
-
+            billing = patient.get("billing", [])
             print(f"\n Current Bill for {patient['name']} (ID: {patient_id}):")
-            total = sum(self.facilities.get(f, 0) for f in patient["billing"])
+            total = sum(self.facilities.get(f, 0) for f in billing)
             print(f"Total Amount: ₹{total}")
-            print("Added Facilities:", ", ".join(patient['billing']) or "None")
+            print("Added Facilities:", ", ".join(billing) or "None")
 
             print("\nAvailable Facilities:")
             for i, (f, price) in enumerate(self.facilities.items(), 1):
@@ -344,80 +529,69 @@ class HospitalManager:
                     return
                 choice = int(choice)
                 facility = list(self.facilities.keys())[choice - 1]
-                patient["billing"].append(facility)
-                write_json(self.patient_file, patients)
-                print(f" {facility} added to bill.")
             except (IndexError, ValueError):
                 print(" Invalid selection.")
+                return
+            self.add_billing_item(patient_id, facility)
+
+    def add_billing_item(self, patient_id, facility):
+        def apply():
+            if facility not in self.facilities:
+                return f" Unknown facility: {facility}"
+            patient = self.repo.patients.get_active(patient_id)
+            if not patient:
+                return " Patient not found or already deleted."
+            self.repo.record("billing_item_added", patientId=patient_id, item=facility,
+                             price=self.facilities.get(facility, 0))
+            patient.setdefault("billing", []).append(facility)
+            self.repo.patients.mark_dirty(patient_id)
+            return f" {facility} added to bill."
+
+        return self._report(self._mutate(apply))
     
     def change_bed_for_patient(self, patient_id, new_bed_id):
-       patients = read_json(self.patient_file)
-       beds = read_json(self.bed_file)
-
-       patient = next((p for p in patients if p["id"] == patient_id and not p.get("isDeleted", False)), None)
-       if not patient:
-           print(f"Patient with ID {patient_id} not found.")
-           return
-
-       new_bed = next((b for b in beds if b["id"] == new_bed_id and not b.get("isDeleted", False)), None)
-       if not new_bed:
-           print(f"New Bed with ID {new_bed_id} not found.")
-           return
-
-       if new_bed.get("status") == "occupied":
-           print(f"Bed {new_bed_id} is already occupied.")
-           return
-
-       old_bed_id = patient.get("bedId")
-
-       # Free up the old bed
-       for b in beds:
-           if b["id"] == old_bed_id:
-               b["patientId"] = None
-               b["priority"] = None
-               b["status"] = "vacant"
-               break
-
-       # Assign new bed
-       for b in beds:
-           if b["id"] == new_bed_id:
-               b["patientId"] = patient_id
-               b["priority"] = patient.get("priority", "low")
-               b["status"] = "occupied"
-               break
-
-       # Update patient
-       for p in patients:
-           if p["id"] == patient_id:
-               p["bedId"] = new_bed_id
-               break
-
-       write_json(self.patient_file, patients)
-       write_json(self.bed_file, beds)
-       print(f"Changed bed for Patient {patient_id} from Bed {old_bed_id} to Bed {new_bed_id}.")
+       def apply():
+           patients = self.repo.patients
+           beds = self.repo.beds
+
+           patient = patients.get_active(patient_id)
+           if not patient:
+               return f"Patient with ID {patient_id} not found."
+
+           new_bed = beds.get_active(new_bed_id)
+           if not new_bed:
+               return f"New Bed with ID {new_bed_id} not found."
+
+           if not is_vacant(new_bed) and new_bed.get("patientId") != patient_id:
+               return f"Bed {new_bed_id} is already occupied."
+
+           old_bed_id = patient.get("bedId")
+
+           # Free up the old bed, assign the new one and update the patient
+           self._occupy_bed(patient, new_bed)
+           return f"Changed bed for Patient {patient_id} from Bed {old_bed_id} to Bed {new_bed_id}."
+
+       return self._report(self._mutate(apply))
 
     def change_doctor_for_patient(self, patient_id, new_doctor_id):
-        patients = read_json(self.patient_file)
-        doctors = read_json(self.doctor_file)
+        def apply():
+            patients = self.repo.patients
 
-        # Find the patient
-        patient = next((p for p in patients if p["id"] == patient_id and not p.get("isDeleted", False)), None)
-        if not patient:
-            print(f"Patient with ID {patient_id} not found.")
-            return
+            # Find the patient
+            patient = patients.get_active(patient_id)
+            if not patient:
+                return f"Patient with ID {patient_id} not found."
 
-        # Find the new doctor
-        doctor = next((d for d in doctors if d["id"] == new_doctor_id and not d.get("isDeleted", False)), None)
-        if not doctor:
-            print(f"Doctor with ID {new_doctor_id} not found.")
-            return
+            # Find the new doctor
+            doctor = self.repo.doctors.get_active(new_doctor_id)
+            if not doctor:
+                return f"Doctor with ID {new_doctor_id} not found."
 
-        # Update doctorId
-        old_doctor_id = patient.get("doctorId")
-        for p in patients:
-            if p["id"] == patient_id:
-                p["doctorId"] = new_doctor_id
-                break
+            # Update doctorId
+            old_doctor_id = patient.get("doctorId")
+            self.repo.record("doctor_assigned", patientId=patient_id, doctorId=new_doctor_id,
+                             previousDoctorId=old_doctor_id)
+            patients.update(patient_id, doctorId=new_doctor_id)
+            return f"Changed doctor for Patient {patient_id} from Doctor {old_doctor_id} to Doctor {new_doctor_id}."
 
-        write_json(self.patient_file, patients)
-        print(f"Changed doctor for Patient {patient_id} from Doctor {old_doctor_id} to Doctor {new_doctor_id}.")
+        return self._report(self._mutate(apply))
@@ -0,0 +1,48 @@
+import csv
+import json
+import os
+
+class RowError(ValueError):
+    # stands in for a row that could not be read, so the rows after it still import
+    pass
+
+def _objects(rows):
+    for row in rows:
+        yield row if isinstance(row, dict) else RowError("not a JSON object")
+
+def read_rows(source):
+    # Yields import rows as dicts. `source` is either an iterable of dicts or a path
+    # to a .csv (header row required), .jsonl (one object per line) or .json array file.
+    # A row that is not an object (or a .jsonl line that is not JSON) is yielded as a
+    # RowError.
+    if not isinstance(source, (str, os.PathLike)):
+        yield from _objects(source)
+        return
+
+    path = os.fspath(source)
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        if ext == ".csv":
+            for row in csv.DictReader(f):
+                yield {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+        elif ext == ".jsonl":
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield RowError(f"invalid JSON: {e}")
+                    continue
+                yield from _objects([row])
+        elif ext == ".json":
+            rows = json.load(f)
+            if not isinstance(rows, list):
+                raise ValueError(f"{path}: expected a JSON array")
+            yield from _objects(rows)
+        else:
+            raise ValueError(f"Unsupported import file type: {ext or path}")
+
+def missing_fields(row, required):
+    return [field for field in required if row.get(field) in (None, "")]
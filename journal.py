@@ -0,0 +1,42 @@
+import os
+import time
+
+import codec
+import config
+from fileio import atomic_write_json
+
+class Journal:
+    # Write-ahead journal for multi-file commits. A commit first lands here as one
+    # fsync'd file listing every collection it changes; only then are the data files
+    # rewritten. If the process dies halfway, recover() finishes the job on next start.
+    def __init__(self, directory=None):
+        self.directory = directory or config.JOURNAL_DIR
+
+    def write(self, entries):
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"txn-{time.time_ns()}-{os.getpid()}.json"
+        path = os.path.join(self.directory, name)
+        # renamed into place, so a journal file that exists is always complete
+        atomic_write_json(path, {"entries": entries}, fsync=True, compact=True)
+        return path
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def pending(self):
+        # (path, entries) for every commit that was journaled but not cleaned up, oldest first
+        try:
+            names = sorted(n for n in os.listdir(self.directory) if n.startswith("txn-") and n.endswith(".json"))
+        except FileNotFoundError:
+            return []
+        result = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                result.append((path, codec.load_file(path)["entries"]))
+            except (OSError, ValueError, KeyError):
+                continue
+        return result
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class LockTimeout(Exception):
+    pass
+
+class FileLock:
+    # Advisory, cross-process lock on "<path>.lock", held only for a with-block.
+    # Re-entrant inside one process, so nested helpers can take the same lock.
+    _local = {}
+    _guard = threading.Lock()
+
+    def __init__(self, path, timeout=10.0, poll=0.005):
+        self.lock_file = path + ".lock"
+        self.timeout = timeout
+        self.poll = poll
+
+    def _state(self):
+        with FileLock._guard:
+            key = os.path.abspath(self.lock_file)
+            if key not in FileLock._local:
+                FileLock._local[key] = {"rlock": threading.RLock(), "depth": 0, "fh": None}
+            return FileLock._local[key]
+
+    def _try_lock(self, fh):
+        try:
+            if fcntl:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        state = self._state()
+        if not state["rlock"].acquire(timeout=self.timeout):
+            raise LockTimeout(f"timed out waiting for {self.lock_file}")
+        if state["depth"]:
+            state["depth"] += 1
+            return self
+
+        fh = open(self.lock_file, 'a+')
+        deadline = time.monotonic() + self.timeout
+        while not self._try_lock(fh):
+            if time.monotonic() >= deadline:
+                fh.close()
+                state["rlock"].release()
+                raise LockTimeout(f"timed out waiting for {self.lock_file}")
+            time.sleep(self.poll)
+        state["fh"] = fh
+        state["depth"] = 1
+        return self
+
+    def release(self):
+        state = self._state()
+        state["depth"] -= 1
+        if not state["depth"]:
+            fh = state["fh"]
+            state["fh"] = None
+            try:
+                if fcntl:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+                else:
+                    fh.seek(0)
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                fh.close()
+        state["rlock"].release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
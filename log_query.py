@@ -0,0 +1,34 @@
+import argparse
+import config
+from locks import FileLock
+from logstore import query_logs, rotate
+
+# Search the audit trail, rotated gzip segments included, without unpacking it:
+#   python log_query.py --since 2024-05-01 --until 2024-05-02T12:00 --action write --file patients
+#   python log_query.py --level warning
+#   python log_query.py --rotate      (force a rotation now, e.g. from a nightly job)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the audit log")
+    parser.add_argument("--since", help="ISO date/time, inclusive")
+    parser.add_argument("--until", help="ISO date/time, exclusive")
+    parser.add_argument("--action", help="e.g. read, write, write_backup, recover")
+    parser.add_argument("--file", help="part of the file name")
+    parser.add_argument("--level", help="minimum level: DEBUG, INFO, WARNING or ERROR")
+    parser.add_argument("--log", default=config.LOG_FILE)
+    parser.add_argument("--limit", type=int, default=0, help="stop after this many entries")
+    parser.add_argument("--rotate", action="store_true")
+    args = parser.parse_args()
+
+    if args.rotate:
+        with FileLock(args.log):  # as AuditLog does, so no writer appends mid-rotation
+            segment = rotate(args.log)
+        print(f"✅ Rotated into {segment}" if segment else " Nothing to rotate.")
+    else:
+        count = 0
+        for entry in query_logs(args.since, args.until, args.action, args.file, path=args.log, level=args.level):
+            print(f"{entry.get('timestamp', '-'):<20} {entry.get('action', '-'):<14} "
+                  f"{entry.get('file', '-')}: {entry.get('status', '-')}")
+            count += 1
+            if args.limit and count >= args.limit:
+                break
+        print(f" {count} entries")
@@ -0,0 +1,366 @@
+import atexit
+import gzip
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+import codec
+import config
+from locks import FileLock
+from streamreader import iter_json_array, iter_records
+
+# Rotated segments are named after the time range they cover, so a query can skip a
+# segment without opening it: logs-20240501T083000-20240502T090000.jsonl.gz
+SEGMENT_NAME = re.compile(r"^(?P<stem>.+)-(?P<start>\d{8}T\d{6})-(?P<end>\d{8}T\d{6})(?:-\d+)?\.jsonl\.gz$")
+SEGMENT_TIME = "%Y%m%dT%H%M%S"
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+# actions that are worth a look even when they succeed, and the routine ones
+WARNING_ACTIONS = {"read_backup", "recover", "log_dropped"}
+DEBUG_ACTIONS = {"read"}
+
+def parse_sampling(spec):
+    # "read=0.01,snapshot=0.5" -> {"read": 0.01, "snapshot": 0.5}; bad parts are ignored
+    rates = {}
+    for part in (spec or "").split(","):
+        action, _, rate = part.partition("=")
+        try:
+            rates[action.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+class LogPolicy:
+    # Decides which audit entries are written. Entries at or above the configured level
+    # always are (successful reads are DEBUG, writes INFO, failures ERROR); entries
+    # below it are kept only at their action's sample rate (0 unless configured).
+    # Whatever is left out is counted per action and file, and summary() turns the
+    # counts into one entry so the totals stay in the audit trail.
+    def __init__(self, level=None, sampling=None, rng=random.random):
+        self.level = LEVELS.get((level or config.LOG_LEVEL).upper(), LEVELS["INFO"])
+        self.sampling = parse_sampling(config.LOG_SAMPLING if sampling is None else sampling)
+        self.rng = rng
+        self.counts = {}
+        self.since = datetime.now()
+        self._last_summary = time.monotonic()
+
+    def level_of(self, action, status):
+        if str(status).startswith("error"):
+            return "ERROR"
+        if action in WARNING_ACTIONS:
+            return "WARNING"
+        if action in DEBUG_ACTIONS:
+            return "DEBUG"
+        return "INFO"
+
+    def admit(self, action, file, level):
+        if LEVELS[level] >= self.level:
+            return True
+        rate = self.sampling.get(action, 0.0)
+        if rate and self.rng() < rate:
+            return True
+        per_file = self.counts.setdefault(action, {})
+        per_file[file] = per_file.get(file, 0) + 1
+        return False
+
+    def summary_due(self):
+        return bool(self.counts) and time.monotonic() - self._last_summary >= config.LOG_SUMMARY_SECONDS
+
+    def summary(self):
+        # {"action": "summary", "counts": {action: {file: n}}} for the entries left out, or None
+        self._last_summary = time.monotonic()
+        if not self.counts:
+            return None
+        total = sum(n for per_file in self.counts.values() for n in per_file.values())
+        now = datetime.now()
+        entry = {"timestamp": now.isoformat(timespec='seconds'), "action": "summary", "file": "*",
+                 "status": f"{total} entries not logged individually since {self.since.isoformat(timespec='seconds')}",
+                 "level": "INFO", "counts": self.counts}
+        self.counts = {}
+        self.since = now
+        return entry
+
+class AuditLog:
+    # Append-only JSON Lines log. Entries are buffered and written in batches,
+    # so logging never has to load or rewrite what is already on disk.
+    def __init__(self, path=None, batch_size=None):
+        self.path = path or config.LOG_FILE
+        self.batch_size = max(1, batch_size or config.LOG_BATCH_SIZE)
+        self._buffer = []
+        atexit.register(self.flush)  # don't lose the last partial batch on exit
+
+    def append(self, entry):
+        self._buffer.append(codec.dumps_line(entry))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        self._write_lines(self._buffer)
+        self._buffer.clear()
+
+    def _write_lines(self, lines):
+        text = "\n".join(lines) + "\n"
+        # the lock keeps appends from landing in a file that is being rotated away
+        with FileLock(self.path):
+            with open(self.path, 'a', encoding='utf-8') as lfile:
+                lfile.write(text)
+            rotate_if_due(self.path)
+
+class AsyncAuditLog(AuditLog):
+    # Same log, written by a background thread. append() only puts the entry on a
+    # bounded in-memory queue (a deque: no lock, no thread wake-up per entry); the
+    # writer wakes when the queue stops being empty, lets `linger` seconds of entries
+    # pile up, then encodes and appends them in batches. When the queue is full,
+    # policy "drop" discards the entry and counts it, "block" waits for room.
+    def __init__(self, path=None, batch_size=None, queue_size=None, policy=None, linger=None):
+        super().__init__(path, batch_size)
+        self.queue_size = max(1, queue_size or config.LOG_QUEUE_SIZE)
+        self.policy = policy or config.LOG_QUEUE_POLICY
+        self.linger = config.LOG_LINGER_SECONDS if linger is None else linger
+        self.dropped = 0
+        self._reported = 0
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._idle = threading.Condition()
+        self._busy = False
+        self._flushing = False
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # first use, or a forked child: the parent's thread and entries did not come along
+            self._pending = deque()
+            self._buffer = []
+            self._wake = threading.Event()
+            self._idle = threading.Condition()
+            self._busy = False
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def append(self, entry):
+        if self._pid != os.getpid():
+            self._start()
+        if len(self._pending) >= self.queue_size:
+            if self.policy != "block":
+                self.dropped += 1
+                return
+            while len(self._pending) >= self.queue_size:
+                self._wake.set()
+                time.sleep(0.001)
+        self._pending.append(entry)
+        if not self._wake.is_set():
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            if self.linger and not self._flushing:
+                time.sleep(self.linger)
+            # cleared before draining, so an entry added from here on wakes us again
+            self._wake.clear()
+            with self._idle:
+                self._busy = True
+            try:
+                while self._pending:
+                    batch = []
+                    while self._pending and len(batch) < self.batch_size:
+                        batch.append(self._pending.popleft())
+                    self._write_batch(batch)
+            finally:
+                with self._idle:
+                    self._busy = False
+                    self._idle.notify_all()
+
+    def _write_batch(self, batch):
+        try:
+            lines = [codec.dumps_line(entry) for entry in batch]
+            if self.dropped > self._reported:
+                lines.append(codec.dumps_line({
+                    "timestamp": datetime.now().isoformat(timespec='seconds'), "action": "log_dropped",
+                    "file": self.path, "status": f"{self.dropped - self._reported} entries dropped, queue full"}))
+                self._reported = self.dropped
+            self._write_lines(lines)
+        except Exception as e:
+            print(f"Logging error: {e}")
+
+    def flush(self):
+        # waits until everything queued so far is on disk
+        if self._pid != os.getpid():
+            return
+        self._flushing = True
+        try:
+            with self._idle:
+                while self._pending or self._busy:
+                    self._wake.set()
+                    self._idle.wait(0.05)
+        finally:
+            self._flushing = False
+
+def _first_timestamp(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return datetime.fromisoformat(codec.loads(f.readline())["timestamp"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def rotate_if_due(path=None):
+    path = path or config.LOG_FILE
+    if os.path.exists(path + ".rotating"):
+        return rotate(path)  # finish a rotation that was interrupted
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return None
+    first = _first_timestamp(path)
+    too_old = first is not None and datetime.now() - first >= timedelta(hours=config.LOG_MAX_AGE_HOURS)
+    if size >= config.LOG_MAX_BYTES or too_old:
+        return rotate(path)
+    return None
+
+def rotate(path=None, archive_dir=None):
+    # Compress the current log into a dated segment and start a new one.
+    # Call with the log's FileLock held (AuditLog.flush does).
+    path = path or config.LOG_FILE
+    archive_dir = archive_dir_for(path, archive_dir)
+    rotating = path + ".rotating"
+    if not os.path.exists(rotating):
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        # rename first so new entries go to a fresh file while this one is compressed
+        os.replace(path, rotating)
+
+    now = datetime.now()
+    start = _first_timestamp(rotating) or now
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = f"{stem}-{start.strftime(SEGMENT_TIME)}-{now.strftime(SEGMENT_TIME)}"
+    os.makedirs(archive_dir, exist_ok=True)
+    segment = os.path.join(archive_dir, name + ".jsonl.gz")
+    n = 1
+    while os.path.exists(segment):
+        segment = os.path.join(archive_dir, f"{name}-{n}.jsonl.gz")
+        n += 1
+
+    tmp = segment + ".tmp"
+    with open(rotating, 'rb') as src, gzip.open(tmp, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, segment)
+    os.remove(rotating)
+    apply_retention(archive_dir, stem)
+    return segment
+
+def archive_dir_for(path, archive_dir=None):
+    # segments live next to the log they came from, in LOG_ARCHIVE_DIR
+    return archive_dir or os.path.join(os.path.dirname(os.path.abspath(path)), config.LOG_ARCHIVE_DIR)
+
+def segments(archive_dir=None, stem=None):
+    # [(start, end, path)] of the rotated segments, oldest first
+    archive_dir = archive_dir or archive_dir_for(config.LOG_FILE)
+    stem = stem or os.path.splitext(os.path.basename(config.LOG_FILE))[0]
+    try:
+        names = os.listdir(archive_dir)
+    except FileNotFoundError:
+        return []
+    found = []
+    for name in names:
+        match = SEGMENT_NAME.match(name)
+        if match and match.group("stem") == stem:
+            found.append((datetime.strptime(match.group("start"), SEGMENT_TIME),
+                          datetime.strptime(match.group("end"), SEGMENT_TIME),
+                          os.path.join(archive_dir, name)))
+    return sorted(found)
+
+def apply_retention(archive_dir=None, stem=None):
+    # Drop segments past the retention period, then the oldest beyond the count limit
+    cutoff = datetime.now() - timedelta(days=config.LOG_RETENTION_DAYS)
+    found = segments(archive_dir, stem)
+    expired = [s for s in found if s[1] < cutoff]
+    kept = [s for s in found if s[1] >= cutoff]
+    expired += kept[:max(0, len(kept) - max(1, config.LOG_KEEP_SEGMENTS))]
+    for _, _, segment in expired:
+        os.remove(segment)
+    return [segment for _, _, segment in expired]
+
+def query_logs(since=None, until=None, action=None, file=None, path=None, archive_dir=None, level=None):
+    # Entries from the rotated segments and the current log, oldest first, filtered by
+    # time range (since inclusive, until exclusive; datetimes or ISO strings), action,
+    # a substring of the file name and a minimum level (entries from before levels
+    # existed count as INFO). Segments outside the range are not opened, the
+    # others are decompressed as a stream.
+    path = path or config.LOG_FILE
+    since = datetime.fromisoformat(since) if isinstance(since, str) else since
+    until = datetime.fromisoformat(until) if isinstance(until, str) else until
+    stem = os.path.splitext(os.path.basename(path))[0]
+    min_level = LEVELS.get(level.upper(), 0) if level else 0
+
+    # segment names are to the second, so the end is widened by one
+    sources = [s for start, end, s in segments(archive_dir_for(path, archive_dir), stem)
+               if (since is None or end + timedelta(seconds=1) > since) and (until is None or start < until)]
+    for source in sources + [path]:
+        for entry in _read_segment(source):
+            if action is not None and entry.get("action") != action:
+                continue
+            if file is not None and file not in str(entry.get("file", "")):
+                continue
+            if min_level and LEVELS.get(entry.get("level", "INFO"), 0) < min_level:
+                continue
+            if since is not None or until is not None:
+                try:
+                    when = datetime.fromisoformat(entry["timestamp"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if (since is not None and when < since) or (until is not None and when >= until):
+                    continue
+            yield entry
+
+def _read_segment(source):
+    if not source.endswith(".gz"):
+        yield from read_logs(source)
+        return
+    with gzip.open(source, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield codec.loads(line)
+            except ValueError:
+                continue
+
+def read_logs(path=None):
+    # Generator: yields one entry at a time instead of loading the whole log.
+    # Works on logs.jsonl and on the old logs.json array alike.
+    path = path or config.LOG_FILE
+    if not os.path.exists(path):
+        return
+    yield from iter_records(path)
+
+def migrate_json_logs(src=None, dst=None):
+    # One-time conversion of the old logs.json array into JSON Lines.
+    # The old file is renamed afterwards so the migration never runs twice.
+    src = src or config.LEGACY_LOG_FILE
+    dst = dst or config.LOG_FILE
+    if not os.path.exists(src):
+        return 0
+    count = 0
+    with open(dst, 'a', encoding='utf-8') as out:
+        try:
+            # streamed, a huge logs.json never has to fit in memory
+            for entry in iter_json_array(src):
+                out.write(codec.dumps_line(entry) + "\n")
+                count += 1
+        except ValueError:
+            pass  # keep whatever could be read before the damage
+    os.replace(src, src + ".migrated")
+    return count
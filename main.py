@@ -1,8 +1,13 @@
 
 from hospital_management import HospitalManager
+from logstore import migrate_json_logs
+from utils import flush_logs
 
 def main():
+    migrate_json_logs()  # no-op once logs.json has been converted to logs.jsonl
     h = HospitalManager()
+    if h.repo.read_only:
+        print(" Read-only standby: queries are served from the replicated data, changes are refused.")
     while True:
         print("\n Hospital Management System")
         print("1. Add Patient")
@@ -20,6 +25,12 @@ def main():
         print("13. Billing")
         print("14. Discharge Patient")
         print("15. change doctor for patient")
+        print("16. Bulk Import (CSV/JSONL)")
+        print("17. Auto-assign Bed")
+        print("18. Next Patient for Doctor")
+        print("19. Show Audit Log")
+        print("20. Archive Discharged Patients")
+        print("21. Find Archived Patient")
         print("0. Exit")
 
         choice = input("Enter choice: ")
@@ -79,8 +90,37 @@ def main():
                 pid = input("Enter patient ID: ")
                 did = input("Enter Doctor Id: ")
                 h.change_doctor_for_patient(pid, did)
+            elif choice == "16":
+                kind = input("Import what (patients/doctors/beds): ").strip().lower()
+                path = input("Enter file path (.csv/.jsonl): ").strip()
+                importers = {"patients": h.bulk_add_patients, "doctors": h.bulk_add_doctors, "beds": h.bulk_add_beds}
+                if kind not in importers:
+                    print(" Invalid choice.")
+                else:
+                    try:
+                        importers[kind](path)
+                    except (OSError, ValueError) as e:
+                        print(f" Could not read {path}: {e}")
+            elif choice == "17":
+                pid = input("Enter patient ID: ")
+                bed_type = input("Bed type (ICU/GENERAL/SPECIAL, blank = by priority): ").strip() or None
+                ward = input("Ward (blank = any): ").strip() or None
+                h.auto_assign_bed(pid, bed_type, ward)
+            elif choice == "18":
+                did = input("Enter doctor ID: ")
+                h.next_patient_for_doctor(did)
+            elif choice == "19":
+                action = input("Action filter (read/write/..., blank = all): ").strip() or None
+                file = input("File filter (blank = all): ").strip() or None
+                h.show_logs(action, file)
+            elif choice == "20":
+                h.archive_discharged()
+            elif choice == "21":
+                pid = input("Enter patient ID: ")
+                h.find_archived_patient(pid)
             elif choice == "0":
                 print("👋 Exiting...")
+                flush_logs()
                 # upload_to_mongodb()
                 break
             else:
@@ -89,4 +129,7 @@ def main():
             print(" Invalid input. Please enter a valid number or option.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        flush_logs()  # also on Ctrl+C / end of input, so queued log entries reach the disk
\ No newline at end of file
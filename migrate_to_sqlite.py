@@ -0,0 +1,12 @@
+import sys
+import config
+from storage import migrate_json_to_sqlite
+
+# Usage: python migrate_to_sqlite.py [database file]
+# Then run main.py with HMS_STORAGE=sqlite (and HMS_SQLITE_FILE if not hospital.db).
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else config.SQLITE_FILE
+    counts = migrate_json_to_sqlite(db_path=db_path)
+    for name, count in counts.items():
+        print(f" {name}: {count} records imported")
+    print(f"✅ Migrated to {db_path}")
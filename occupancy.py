@@ -0,0 +1,55 @@
+from bed_allocator import OCCUPIED, normalize_status, normalize_ward
+
+BED_TYPES = ("GENERAL", "ICU", "SPECIAL")
+
+def occupancy_key(bed):
+    # (ward, bed_type, occupied) a bed counts towards, None for deleted or unknown types
+    bed_type = (bed.get("bed_type") or "").upper()
+    if bed.get("isDeleted", False) or bed_type not in BED_TYPES:
+        return None
+    return (normalize_ward(bed.get("ward")) or "UNKNOWN", bed_type, normalize_status(bed.get("status")) == OCCUPIED)
+
+class OccupancyCounter:
+    # Per (ward, bed_type) totals, maintained by the beds collection like an Index, so
+    # they are only rebuilt from scratch when the collection is (re)loaded.
+    def __init__(self):
+        self._wards = {}  # ward -> {bed_type: [total, occupied]}, wards in first-seen order
+        self._keys = {}   # bed id -> key it is counted under
+
+    def reset(self, records):
+        self._wards = {}
+        self._keys = {}
+        for record in records.values():
+            self.update(record)
+
+    def update(self, record):
+        new_key = occupancy_key(record)
+        if self._keys.get(record["id"]) == new_key:
+            return
+        self.remove(record["id"])
+        if new_key is None:
+            return
+        ward, bed_type, occupied = new_key
+        counts = self._wards.setdefault(ward, {t: [0, 0] for t in BED_TYPES})[bed_type]
+        counts[0] += 1
+        counts[1] += occupied
+        self._keys[record["id"]] = new_key
+
+    def remove(self, record_id):
+        old_key = self._keys.pop(record_id, None)
+        if old_key is None:
+            return
+        ward, bed_type, occupied = old_key
+        counts = self._wards[ward][bed_type]
+        counts[0] -= 1
+        counts[1] -= occupied
+        if not any(total for total, _ in self._wards[ward].values()):
+            del self._wards[ward]
+
+    def summary(self, ward=None):
+        wards = [normalize_ward(ward)] if ward is not None else list(self._wards)
+        return {
+            w: {t: {"total": total, "occupied": occupied, "vacant": total - occupied}
+                for t, (total, occupied) in self._wards[w].items()}
+            for w in wards if w in self._wards
+        }
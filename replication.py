@@ -0,0 +1,254 @@
+import argparse
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import codec
+import config
+from archive import PatientArchive
+from events import EventLog
+from sequence import SequenceAllocator
+from storage import EventStorage, ReplicationGap
+
+# Warm standby for the "events" storage backend. The primary's event log is the change
+# feed: a follower connects, says which seq it has, and receives every commit after it,
+# one JSON line each, then keeps receiving new ones as they are appended. A follower with
+# nothing (or further behind than the rotated segments reach) first gets a full copy, and
+# so does one that receives a commit that does not follow its last one.
+#
+#   primary data directory:  python replication.py serve
+#   standby data directory:  python replication.py follow --primary 10.0.0.5:7700
+#
+# Messages, one JSON object per line:
+#   follower -> primary   {"from": 41}
+#   primary -> follower   {"install": 57, "collections": {"patients.json": [...], ...},
+#                          "archive": [...], "sequences": {...}}
+#                         {"seq": 58, "events": [...], "changes": {...},    (an event log line)
+#                          "sequences": {...}[, "archived": [...]]}
+#                         {"heartbeat": 58}                                 (when idle)
+#
+# The archive/ partitions and sequences.json are not in the event log, so they travel
+# alongside it: the full copy carries every archived patient, a commit with a
+# patients_archived event carries the archive entries of the patients it removed (the
+# primary archives them before that commit), and both carry the primary's id counters,
+# which the standby only ever raises. A promoted standby therefore still finds archived
+# patients and does not hand out an id the primary already used.
+#
+# The standby's own HospitalManager (main.py with HMS_STORAGE=events HMS_READ_ONLY=1 in
+# the standby directory) serves the show_* and fetch_* queries from the replicated copy.
+# To promote it, stop the follower and start it without HMS_READ_ONLY.
+
+FILES = ("patients.json", "doctors.json", "beds.json")
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+def _send(sock, message):
+    sock.sendall(codec.dumps_line(message).encode("utf-8") + b"\n")
+
+class _FeedHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        try:
+            request = codec.loads(self.rfile.readline())
+            sent = int(request.get("from", 0))
+        except (ValueError, AttributeError):
+            return
+        feed = EventLog(server.storage.log.path)  # own read position per follower
+        try:
+            sent = self._catch_up(feed, sent)
+            idle_since = time.monotonic()
+            while not server.stopping.is_set():
+                reset, entries = feed.read_new()
+                if reset:
+                    # the log was rotated: lines we have not sent may be in the new segment.
+                    # Read under the log lock so a checkpoint cannot move them aside midway,
+                    # and keep what read_new() returned, which may predate that listing.
+                    with server.storage.lock(server.storage.log.path):
+                        history = list(feed.entries(sent))
+                    entries = sorted({e["seq"]: e for e in entries + history if "seq" in e}.values(),
+                                     key=lambda e: e["seq"])
+                entries = [e for e in entries if e.get("seq", 0) > sent]
+                for entry in entries:
+                    _send(self.connection, self._with_metadata(entry))
+                    sent = entry["seq"]
+                if entries:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= config.REPLICATION_HEARTBEAT_SECONDS:
+                    _send(self.connection, {"heartbeat": sent})
+                    idle_since = time.monotonic()
+                server.stopping.wait(config.REPLICATION_POLL_SECONDS)
+        except OSError:
+            pass  # follower went away, it reconnects with its own seq
+
+    def _catch_up(self, feed, sent):
+        storage = self.server.storage
+        first = feed.first_seq()
+        head = storage.last_seq()
+        if sent == 0 or sent > head or (first is not None and sent < first - 1):
+            # nothing usable on the follower: ship a full copy, then the commits after it
+            seq, collections = storage.export(self.server.files)
+            _send(self.connection, {"install": seq, "collections": {
+                os.path.basename(file): records for file, records in collections.items()},
+                "archive": list(self.server.archive.entries()),
+                "sequences": self.server.sequences.state()})
+            sent = seq
+        # the first read_new() in handle() reports a reset, which sends the history after `sent`
+        return sent
+
+    def _with_metadata(self, entry):
+        server = self.server
+        archived = [pid for event in entry.get("events", ()) if event.get("type") == "patients_archived"
+                    for pid in event.get("patientIds", ())]
+        entry = dict(entry, sequences=server.sequences.state())
+        if archived:
+            entry["archived"] = [found for found in map(server.archive.get, archived) if found]
+        return entry
+
+class ReplicationServer(socketserver.ThreadingTCPServer):
+    # Serves the change feed of the primary's event log, one thread per follower
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, storage=None, address=None, files=FILES, archive=None, sequences=None):
+        self.storage = storage or EventStorage()
+        self.files = files
+        self.archive = PatientArchive() if archive is None else archive
+        self.sequences = sequences or SequenceAllocator()
+        self.stopping = threading.Event()
+        super().__init__(parse_address(address or config.REPLICATION_ADDRESS), _FeedHandler)
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name="replication-server", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
+
+class Follower:
+    # Keeps a standby's event store current from a primary. Commits are appended to the
+    # local log under the primary's seq numbers, so readers in the standby directory pick
+    # them up incrementally, exactly as they would a local commit.
+    def __init__(self, storage=None, primary=None, files=None, archive=None, sequences=None):
+        self.storage = storage or EventStorage()
+        self.primary = parse_address(primary or config.REPLICATION_ADDRESS)
+        # primary file name -> local path; by default the same names in the working directory
+        self.files = files or {}
+        self.archive = PatientArchive() if archive is None else archive
+        self.sequences = sequences or SequenceAllocator()
+        self.stopping = threading.Event()
+        self.connected = threading.Event()
+        self.applied = 0
+        self.last_contact = None
+        self._sock = None
+        self._resync = False  # ask for a full copy on the next connect
+
+    def _local(self, file):
+        name = os.path.basename(file)
+        return self.files.get(name, name)
+
+    def _archive(self, entries):
+        # archived before the commit that drops them from patients.json, as on the primary;
+        # add() skips patients this standby already has
+        by_time = {}
+        for entry in entries:
+            by_time.setdefault(entry["archivedAt"], []).append(entry["patient"])
+        for archived_at, records in sorted(by_time.items()):
+            self.archive.add(records, archived_at)
+
+    def apply(self, message):
+        # the id counters first, so nothing that can read the new records sees old counters
+        if message.get("sequences"):
+            self.sequences.advance(message["sequences"])
+        if "install" in message:
+            self._archive(message.get("archive", ()))
+            self.storage.install(message["install"], {
+                self._local(file): records for file, records in message["collections"].items()})
+        elif "seq" in message:
+            entry = dict(message, changes={self._local(f): c for f, c in message["changes"].items()})
+            entry.pop("sequences", None)
+            self._archive(entry.pop("archived", ()))
+            if "full" in entry:
+                entry["full"] = [self._local(f) for f in entry["full"]]
+            if self.storage.apply_replicated(entry):
+                self.applied += 1
+        self.last_contact = time.monotonic()
+
+    def run(self):
+        # connects, follows and reconnects until stop(); a silent primary counts as gone
+        backoff = 0.1
+        while not self.stopping.is_set():
+            try:
+                with socket.create_connection(self.primary, timeout=config.REPLICATION_HEARTBEAT_SECONDS * 3) as sock:
+                    self._sock = sock
+                    _send(sock, {"from": 0 if self._resync else self.storage.last_seq()})
+                    self._resync = False
+                    self.connected.set()
+                    backoff = 0.1
+                    with sock.makefile('rb') as stream:
+                        for line in stream:
+                            if self.stopping.is_set():
+                                break
+                            self.apply(codec.loads(line))
+            except ReplicationGap:
+                self._resync = True  # missed commits: start over from a full copy
+            except (OSError, ValueError):
+                pass
+            self._sock = None
+            self.connected.clear()
+            self.stopping.wait(backoff)
+            backoff = min(backoff * 2, 5.0)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="replication-follower", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.stopping.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # wakes the reading thread
+            except OSError:
+                pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm-standby replication of the event store")
+    sub = parser.add_subparsers(dest="role", required=True)
+    serve = sub.add_parser("serve", help="publish this directory's event log")
+    serve.add_argument("--listen", default=config.REPLICATION_ADDRESS)
+    follow = sub.add_parser("follow", help="keep this directory a copy of a primary")
+    follow.add_argument("--primary", default=config.REPLICATION_ADDRESS)
+    args = parser.parse_args(argv)
+
+    if args.role == "serve":
+        if config.STORAGE_BACKEND != "events":
+            print(" Warning: HMS_STORAGE is not 'events', followers get a copy but no further changes.")
+        server = ReplicationServer(address=args.listen)
+        print(f" Serving the change feed on {args.listen} (seq {server.storage.last_seq()})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
+    else:
+        follower = Follower(primary=args.primary)
+        follower.start()
+        print(f" Following {args.primary}")
+        try:
+            while True:
+                time.sleep(5)
+                state = "connected" if follower.connected.is_set() else "reconnecting"
+                print(f" {state}, at seq {follower.storage.last_seq()}, {follower.applied} commits applied")
+        except KeyboardInterrupt:
+            follower.stop()
+
+if __name__ == "__main__":
+    sys.exit(main())
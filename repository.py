@@ -0,0 +1,301 @@
+from contextlib import contextmanager
+
+import config
+from storage import open_storage, ReadOnlyStore
+from events import make_event
+from bed_allocator import vacant_key
+from triage import TriageQueue
+from occupancy import OccupancyCounter
+
+class Index:
+    # Secondary index: key -> ids, kept in insertion order (dict used as an ordered set).
+    # `key` is a field name or a function of the record; records whose key is None are not indexed.
+    def __init__(self, key):
+        self.key = key if callable(key) else (lambda r, field=key: r.get(field))
+        self._buckets = {}
+        self._keys = {}  # id -> key it is currently filed under
+
+    def reset(self, records):
+        self._buckets = {}
+        self._keys = {}
+        for record in records.values():
+            self.update(record)
+
+    def update(self, record):
+        record_id = record["id"]
+        new_key = self.key(record)
+        old_key = self._keys.get(record_id)
+        if record_id in self._keys and old_key == new_key:
+            return
+        self.remove(record_id)
+        if new_key is not None:
+            self._buckets.setdefault(new_key, {})[record_id] = None
+            self._keys[record_id] = new_key
+
+    def remove(self, record_id):
+        if record_id not in self._keys:
+            return
+        old_key = self._keys.pop(record_id)
+        bucket = self._buckets.get(old_key)
+        if bucket is not None:
+            bucket.pop(record_id, None)
+            if not bucket:
+                del self._buckets[old_key]
+
+    def ids(self, value):
+        return list(self._buckets.get(value, ()))
+
+    def count(self, value):
+        return len(self._buckets.get(value, ()))
+
+    def first(self, value):
+        # oldest id filed under `value`, without copying the bucket
+        return next(iter(self._buckets.get(value, ())), None)
+
+    def keys(self):
+        return list(self._buckets)
+
+class Collection:
+    # One collection (patients, doctors or beds) kept in memory as {id: record}. It is
+    # loaded from the storage backend once and only re-read when the backend reports
+    # a change made by another process (file mtime/size, or the SQLite version counter).
+    def __init__(self, file, storage, indexes=None):
+        self.file = file
+        self.storage = storage
+        # plain keys become an Index; objects with the same reset/update/remove methods
+        # (e.g. the per-doctor TriageQueue) are maintained as they are
+        self.indexes = {name: key if hasattr(key, "reset") else Index(key) for name, key in (indexes or {}).items()}
+        self._records = None
+        self._stamp = None
+        self.version = None    # storage version the in-memory copy is based on
+        self._changed = {}     # ids added/updated since the last flush, in order (dict as ordered set)
+        self._rewrite = False  # change not tied to a record id, save everything
+        self._holding = False  # inside a batch: check for outside changes only once
+        self._checked = False
+
+    def load(self):
+        # version first: if a save sneaks in between we conflict later instead of losing it
+        self.version = self.storage.version(self.file)
+        data = self.storage.load(self.file) or []
+        self._records = {r["id"]: r for r in data}
+        for index in self.indexes.values():
+            index.reset(self._records)
+        self._stamp = self._stamp_for(self.version)
+        self._changed = {}
+        self._rewrite = False
+
+    def refresh(self):
+        # unsaved local changes win over the stored copy until they are flushed
+        if self._records is not None and (self.dirty or self._checked):
+            return
+        if self._records is None or self.storage.stamp(self.file) != self._stamp:
+            if not self._catch_up():
+                self.load()
+        self._checked = self._holding
+
+    def _catch_up(self):
+        # backends that can list changes (EventStorage, ShardedStorage) hand over just the
+        # records other processes changed, instead of the whole collection
+        if self._records is None or not hasattr(self.storage, "changes_since"):
+            return False
+        since = self.storage.changes_since(self.file, self.version)
+        if since is None:
+            return False
+        version, changes = since
+        for record_id, record in changes.items():
+            if record is None:
+                self._records.pop(record_id, None)
+                for index in self.indexes.values():
+                    index.remove(record_id)
+            else:
+                self._records[record_id] = record
+                self._reindex(record)
+        self.version = self._stamp = version
+        return True
+
+    def _stamp_for(self, version):
+        # backends that can list changes use their version as the stamp; reading the stamp
+        # again could take in a commit made in the meantime without its records
+        return version if hasattr(self.storage, "changes_since") else self.storage.stamp(self.file)
+
+    def hold(self):
+        # one consistent snapshot for the duration of a batch
+        self._holding = True
+        self._checked = False
+
+    def release(self):
+        self._holding = False
+        self._checked = False
+
+    @property
+    def records(self):
+        self.refresh()
+        return self._records
+
+    def get(self, record_id):
+        if self._records is None and not self._holding:
+            # not loaded yet: a read-only lookup is served from the snapshot, so startup
+            # does not decode the whole file for it
+            snapshot = self.storage.snapshot(self.file)
+            if snapshot is not None:
+                return snapshot.get(record_id)
+        return self.records.get(record_id)
+
+    def get_active(self, record_id):
+        # same as get() but hides soft-deleted records
+        record = self.get(record_id)
+        if record is None or record.get("isDeleted", False):
+            return None
+        return record
+
+    def all(self):
+        return list(self.records.values())
+
+    def stream(self):
+        # Iterates the records without loading the collection: from memory when the
+        # copy here is loaded and current, otherwise straight from the storage backend.
+        if self._records is not None and (self.dirty or self._holding or
+                                          self.storage.stamp(self.file) == self._stamp):
+            yield from list(self._records.values())
+        else:
+            yield from self.storage.iter_records(self.file)
+
+    def find(self, index_name, value):
+        records = self.records
+        return [records[i] for i in self.indexes[index_name].ids(value)]
+
+    def index(self, index_name):
+        self.refresh()
+        return self.indexes[index_name]
+
+    def add_index(self, index_name, index):
+        # attach an index after construction; it is filled from the records already loaded
+        self.indexes[index_name] = index
+        if self._records is not None:
+            index.reset(self._records)
+
+    def add(self, record):
+        self.records[record["id"]] = record
+        self._reindex(record)
+        self._changed[record["id"]] = None
+
+    def update(self, record_id, **changes):
+        # indexed fields must be changed through here so the indexes follow
+        record = self.records[record_id]
+        record.update(changes)
+        self._reindex(record)
+        self._changed[record_id] = None
+        return record
+
+    def remove(self, record_id):
+        # hard delete (archival); saved like a change, the backend drops the row
+        record = self.records.pop(record_id, None)
+        if record is None:
+            return None
+        for index in self.indexes.values():
+            index.remove(record_id)
+        self._changed[record_id] = None
+        return record
+
+    def _reindex(self, record):
+        for index in self.indexes.values():
+            index.update(record)
+
+    def mark_dirty(self, record_id=None):
+        # for records changed in place (e.g. medication or billing lists)
+        if record_id is None:
+            self._rewrite = True
+        else:
+            self._changed[record_id] = None
+
+    @property
+    def dirty(self):
+        return self._rewrite or bool(self._changed)
+
+    def pending(self):
+        # what commit() hands to the storage backend for this collection
+        changed = None if self._rewrite else list(self._changed)
+        return (self.file, self._records, changed, self.version)
+
+    def mark_saved(self, version):
+        self.version = version
+        self._stamp = self._stamp_for(version)
+        self._changed = {}
+        self._rewrite = False
+
+class Repository:
+    # Holds the patient/doctor/bed collections for one HospitalManager.
+    # Changes are written through on commit(), or once at the end of a batch().
+    def __init__(self, patient_file, doctor_file, bed_file, storage=None, read_only=None):
+        self.storage = storage or open_storage()
+        self.read_only = config.READ_ONLY if read_only is None else read_only
+        self.patients = Collection(patient_file, self.storage, indexes={
+            "doctorId": "doctorId",
+            "bedId": "bedId",
+            "triage": TriageQueue(),  # per-doctor heaps, see triage.py
+        })
+        self.doctors = Collection(doctor_file, self.storage)
+        self.beds = Collection(bed_file, self.storage, indexes={
+            "patientId": "patientId",
+            "doctorId": "doctorId",
+            "ward": "ward",
+            "bed_type": lambda b: (b.get("bed_type") or "").upper() or None,
+            "status": lambda b: (b.get("status") or "").lower() or None,  # stored as both "occupied" and "Occupied"
+            "vacant": vacant_key,  # free lists per (ward, bed_type), see bed_allocator
+            "occupancy": OccupancyCounter(),  # per-ward totals for show_bed_status
+        })
+        self.by_file = {c.file: c for c in (self.patients, self.doctors, self.beds)}
+        self._batch_depth = 0
+        self._events = []  # typed events of the changes not committed yet
+
+    def record(self, event_type, **data):
+        # names the change being made (see events.EVENT_TYPES); saved with the next commit
+        self._events.append(make_event(event_type, **data))
+
+    def collections(self):
+        return (self.patients, self.doctors, self.beds)
+
+    def commit(self):
+        # All changed collections are saved as one atomic unit. The backend raises
+        # VersionConflict if another process saved any of them since we loaded it.
+        if self._batch_depth:
+            return  # written once when the outermost batch ends
+        dirty = [c for c in self.collections() if c.dirty]
+        if not dirty:
+            self._events = []
+            return
+        if self.read_only:
+            raise ReadOnlyStore("this node is a read-only standby")
+        versions = self.storage.commit([c.pending() for c in dirty], events=self._events)
+        self._events = []
+        for c, version in zip(dirty, versions):
+            c.mark_saved(version)
+
+    def rollback(self):
+        self._events = []
+        for c in self.collections():
+            if c.dirty:
+                c.load()  # drop the half-applied changes
+
+    @contextmanager
+    def batch(self):
+        outermost = not self._batch_depth
+        if outermost:
+            for c in self.collections():
+                c.hold()
+        self._batch_depth += 1
+        try:
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+            if outermost:
+                self.commit()
+        except Exception:
+            if outermost:
+                self.rollback()
+            raise
+        finally:
+            if outermost:
+                for c in self.collections():
+                    c.release()
@@ -0,0 +1,55 @@
+import json
+import os
+
+import config
+from locks import FileLock
+
+class SequenceAllocator:
+    # Per-prefix id counters kept in a small metadata file, e.g. {"P": 12, "D": 4, "B": 9}.
+    # Every allocation runs under a file lock, so concurrent processes never hand out
+    # the same id.
+    def __init__(self, path=None):
+        self.path = path or config.SEQUENCE_FILE
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write(self, state):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def reserve(self, prefix, count, seed=None):
+        # Hands out `count` consecutive ids in one locked read/write. `seed()` returns the
+        # highest number already used and is only called the first time a prefix is seen.
+        if count < 1:
+            return []
+        with FileLock(self.path):
+            state = self._read()
+            last = state.get(prefix)
+            if last is None:
+                last = seed() if seed else 0
+            state[prefix] = last + count
+            self._write(state)
+        return [f"{prefix}{n}" for n in range(last + 1, last + count + 1)]
+
+    def state(self):
+        # {prefix: last id number handed out}
+        return self._read()
+
+    def advance(self, state):
+        # Raises the counters to at least those in `state` (another node's), never lowers
+        # them; a standby keeps its counters current this way (see replication.py)
+        with FileLock(self.path):
+            current = self._read()
+            merged = {**current, **{p: max(n, current.get(p, 0)) for p, n in state.items()}}
+            if merged != current:
+                self._write(merged)
+
+    def next_id(self, prefix, seed=None):
+        return self.reserve(prefix, 1, seed)[0]
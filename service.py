@@ -0,0 +1,451 @@
+import argparse
+import asyncio
+import contextlib
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import codec
+import config
+from hospital_management import HospitalManager, READ_ONLY_MESSAGE
+from replication import parse_address
+from utils import flush_logs
+
+# Service mode: the HospitalManager operations as JSON over HTTP.
+#
+#   python service.py [--listen 127.0.0.1:8080]
+#
+# One process owns the data. Reads are answered on the event loop straight from the
+# in-memory collections, any number of them between two writes. Writes go through one
+# queue to one writer, which runs them on its own thread; whatever has queued up while
+# the previous group was being saved (up to HMS_SERVICE_WRITE_BATCH operations) goes
+# into one transaction, so one commit pays for the whole group. Reads wait while a group
+# is being applied, so they never see half of one.
+#
+#   GET  /patients                   active patients
+#   GET  /patients/P3                one patient (discharged ones too)
+#   GET  /doctors                    active doctors
+#   GET  /doctors/D1/patients        the doctor's patients in triage order
+#   GET  /doctors/D1/next            the first of them
+#   GET  /beds                       all beds
+#   GET  /beds/occupancy[?ward=A]    occupied/total per ward and bed type
+#   POST /patients                   {"name", "age", "gender", "priority"}        -> 201 {"id"}
+#   POST /doctors                    {"name", "age", "gender", "specialization"}  -> 201 {"id"}
+#   POST /beds                       {"bed_type", "ward"}                         -> 201 {"id"}
+#   POST /patients/P3/bed            {"bedId"}, or {"bedType", "ward"} (both optional) for any free bed
+#   POST /patients/P3/doctor         {"doctorId"}
+#   POST /patients/P3/priority       {"priority"}
+#   POST /patients/P3/billing        {"item"}
+#   POST /patients/P3/medications    {"stop": [...], "start": [...]}
+#   POST /patients/P3/discharge
+#
+# Every response is a JSON object or list. Writes answer with the manager's message in
+# "message"; one the manager turned down (bed taken, nothing vacant, ...) is a 409.
+
+PRIORITIES = ("red", "yellow", "green")
+
+class BadRequest(Exception):
+    pass
+
+class NotFound(Exception):
+    pass
+
+def _field(body, name, kind=str, default=None):
+    value = body.get(name, default)
+    if value is None:
+        raise BadRequest(f"missing field: {name}")
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f"invalid {name}: {value!r}")
+
+def _names(value):
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        raise BadRequest("expected a list of names")
+    return [str(v).strip() for v in value if str(v).strip()]
+
+class HospitalService:
+    def __init__(self, manager=None, write_batch=None, queue_size=None):
+        self.h = manager or HospitalManager()
+        self.h.echo = False  # messages go into the responses, not to the server's stdout
+        self.write_batch = write_batch or config.SERVICE_WRITE_BATCH
+        self.queue_size = queue_size or config.SERVICE_QUEUE_SIZE
+        self.writes = 0
+        self.groups = 0
+        self.split_groups = 0  # groups that failed together and were re-run one by one
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hms-writer")
+        self._server = None
+        self._writer_task = None
+        self.routes = [
+            ("GET", r"/patients", self.list_patients),
+            ("GET", r"/patients/(?P<pid>[^/]+)", self.get_patient),
+            ("GET", r"/doctors", self.list_doctors),
+            ("GET", r"/doctors/(?P<did>[^/]+)/patients", self.doctor_patients),
+            ("GET", r"/doctors/(?P<did>[^/]+)/next", self.doctor_next),
+            ("GET", r"/beds", self.list_beds),
+            ("GET", r"/beds/occupancy", self.occupancy),
+            ("POST", r"/patients", self.admit),
+            ("POST", r"/doctors", self.add_doctor),
+            ("POST", r"/beds", self.add_bed),
+            ("POST", r"/patients/(?P<pid>[^/]+)/bed", self.assign_bed),
+            ("POST", r"/patients/(?P<pid>[^/]+)/doctor", self.assign_doctor),
+            ("POST", r"/patients/(?P<pid>[^/]+)/priority", self.set_priority),
+            ("POST", r"/patients/(?P<pid>[^/]+)/billing", self.add_billing_item),
+            ("POST", r"/patients/(?P<pid>[^/]+)/medications", self.update_medications),
+            ("POST", r"/patients/(?P<pid>[^/]+)/discharge", self.discharge),
+        ]
+        self.routes = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in self.routes]
+
+    # --- lifecycle ---
+
+    async def start(self, address=None):
+        host, port = parse_address(address or config.SERVICE_ADDRESS)
+        self.queue = asyncio.Queue(self.queue_size)
+        self.idle = asyncio.Event()  # set while no write group is being applied
+        self.idle.set()
+        self._writer_task = asyncio.create_task(self._writer())
+        self._server = await asyncio.start_server(self._client, host, port)
+        return self._server
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._writer_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._writer_task
+        self._executor.shutdown(wait=True)
+
+    # --- the write path ---
+
+    async def _write(self, op):
+        if self.h.repo.read_only:
+            return 403, {"error": READ_ONLY_MESSAGE.strip()}
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((op, future))
+        except asyncio.QueueFull:
+            return 503, {"error": "too many writes waiting, try again"}
+        return await future
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            group = [await self.queue.get()]
+            while len(group) < self.write_batch and not self.queue.empty():
+                group.append(self.queue.get_nowait())
+            self.idle.clear()
+            try:
+                results = await loop.run_in_executor(self._executor, self._apply_group, [op for op, _ in group])
+            except Exception as e:
+                results = [(500, {"error": str(e)})] * len(group)
+            finally:
+                self.idle.set()
+            for (_, future), result in zip(group, results):
+                if not future.done():
+                    future.set_result(result)
+            await asyncio.sleep(0)  # let the reads that waited for this group run first
+
+    def _apply_group(self, ops):
+        # writer thread. The group is one transaction; if it cannot be saved as a whole
+        # (another station changed the files, or one of the operations failed) it is
+        # rolled back and every operation runs again on its own, with the usual retries.
+        self.groups += 1
+        self.writes += len(ops)
+        if len(ops) > 1:
+            try:
+                with self.h.transaction():
+                    return [self._run(op) for op in ops]
+            except Exception:
+                self.split_groups += 1
+        results = []
+        for op in ops:
+            try:
+                results.append(self._run(op))
+            except Exception as e:
+                results.append((500, {"error": f"{type(e).__name__}: {e}"}))
+        return results
+
+    def _run(self, op):
+        # the message of the manager operation the op ran is the "message" of the response
+        self.h.last_message = None
+        status, payload = op(self.h)
+        message = (self.h.last_message or "").strip()
+        if message:
+            payload["message"] = message
+        return status, payload
+
+    # --- HTTP ---
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except BadRequest as e:
+                    await self._respond(writer, 400, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body, keep_alive = request
+                status, payload = await self.dispatch(method, target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise BadRequest("malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise BadRequest("invalid Content-Length")
+        body = await reader.readexactly(length) if length else b""
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method.upper(), target, headers, body, keep_alive
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = codec.dumps_line(payload).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/") or "/"
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+            allowed = True
+            if route_method != method:
+                continue
+            try:
+                if method == "GET":
+                    # a read runs between write groups, without yielding once it started
+                    while not self.idle.is_set():
+                        await self.idle.wait()
+                    return handler(query=query, **match.groupdict())
+                try:
+                    data = codec.loads(body) if body.strip() else {}
+                except ValueError as e:
+                    raise BadRequest(f"invalid JSON: {e}")
+                if not isinstance(data, dict):
+                    raise BadRequest("the body must be a JSON object")
+                return await handler(data, **match.groupdict())
+            except BadRequest as e:
+                return 400, {"error": str(e)}
+            except NotFound as e:
+                return 404, {"error": str(e)}
+            except Exception as e:
+                return 500, {"error": f"{type(e).__name__}: {e}"}
+        if allowed:
+            return 405, {"error": f"{method} is not supported on {path}"}
+        return 404, {"error": f"no such endpoint: {path}"}
+
+    # --- reads (event loop, between write groups) ---
+
+    def _patient(self, pid):
+        patient = self.h.repo.patients.get_active(pid)
+        if patient is None:
+            raise NotFound(f"Patient with ID {pid} not found or already discharged.")
+        return patient
+
+    def _doctor(self, did):
+        if self.h.repo.doctors.get_active(did) is None:
+            raise NotFound(f"Doctor with ID {did} not found.")
+
+    def list_patients(self, query):
+        return 200, [p for p in self.h.repo.patients.all() if not p.get("isDeleted", False)]
+
+    def get_patient(self, query, pid):
+        patient = self.h.repo.patients.get(pid)
+        if patient is None:
+            raise NotFound(f"Patient with ID {pid} not found.")
+        return 200, patient
+
+    def list_doctors(self, query):
+        return 200, [d for d in self.h.repo.doctors.all() if not d.get("isDeleted", False)]
+
+    def doctor_patients(self, query, did):
+        self._doctor(did)
+        return 200, self.h.triage_list(did)
+
+    def doctor_next(self, query, did):
+        self._doctor(did)
+        patients = self.h.repo.patients
+        pid = patients.index("triage").peek(did)
+        if pid is None:
+            raise NotFound(f"No patients waiting for Doctor ID: {did}")
+        return 200, patients.get(pid)
+
+    def list_beds(self, query):
+        return 200, [b for b in self.h.repo.beds.all() if not b.get("isDeleted", False)]
+
+    def occupancy(self, query):
+        return 200, self.h.get_occupancy(query.get("ward"))
+
+    # --- writes (queued for the writer thread) ---
+
+    async def admit(self, body):
+        name, age = _field(body, "name"), _field(body, "age", int)
+        gender = _field(body, "gender", default="Other")
+        priority = _field(body, "priority", default="yellow").lower()
+        if priority not in PRIORITIES:
+            raise BadRequest(f"priority must be one of {', '.join(PRIORITIES)}")
+
+        def op(h):
+            pid = h.add_patient(name, age, gender, priority)
+            return (201, {"id": pid}) if pid else (409, {})
+        return await self._write(op)
+
+    async def add_doctor(self, body):
+        name, age = _field(body, "name"), _field(body, "age", int)
+        gender, specialization = _field(body, "gender", default="Other"), _field(body, "specialization")
+
+        def op(h):
+            did = h.add_doctor(name, age, gender, specialization)
+            return (201, {"id": did}) if did else (409, {})
+        return await self._write(op)
+
+    async def add_bed(self, body):
+        bed_type, ward = _field(body, "bed_type", default="GENERAL"), _field(body, "ward", default="A")
+
+        def op(h):
+            bid = h.add_bed(bed_type, ward)
+            return (201, {"id": bid}) if bid else (409, {})
+        return await self._write(op)
+
+    async def assign_bed(self, body, pid):
+        self._patient(pid)
+        bed_id = body.get("bedId")
+        if bed_id is not None and self.h.repo.beds.get_active(bed_id) is None:
+            raise NotFound(f"Bed with ID {bed_id} not found.")
+        bed_type, ward = body.get("bedType"), body.get("ward")
+
+        def op(h):
+            if bed_id is None:
+                h.auto_assign_bed(pid, bed_type, ward)
+            else:
+                h.assign_bed_to_patient(pid, bed_id)
+            patient = h.repo.patients.get(pid) or {}
+            assigned = patient.get("bedId")
+            bed = h.repo.beds.get(assigned) if assigned else None
+            ok = bed is not None and bed.get("patientId") == pid and bed_id in (None, assigned)
+            return (200, {"id": pid, "bedId": assigned}) if ok else (409, {})
+        return await self._write(op)
+
+    async def assign_doctor(self, body, pid):
+        self._patient(pid)
+        did = _field(body, "doctorId")
+        self._doctor(did)
+
+        def op(h):
+            h.change_doctor_for_patient(pid, did)
+            ok = (h.repo.patients.get(pid) or {}).get("doctorId") == did
+            return (200, {"id": pid, "doctorId": did}) if ok else (409, {})
+        return await self._write(op)
+
+    async def set_priority(self, body, pid):
+        self._patient(pid)
+        priority = _field(body, "priority").lower()
+        if priority not in PRIORITIES:
+            raise BadRequest(f"priority must be one of {', '.join(PRIORITIES)}")
+
+        def op(h):
+            h.update_patient_priority(pid, priority)
+            ok = (h.repo.patients.get(pid) or {}).get("priority") == priority.capitalize()
+            return (200, {"id": pid, "priority": priority.capitalize()}) if ok else (409, {})
+        return await self._write(op)
+
+    async def add_billing_item(self, body, pid):
+        self._patient(pid)
+        item = _field(body, "item")
+        if item not in self.h.facilities:
+            raise BadRequest(f"unknown item {item!r}, one of: {', '.join(self.h.facilities)}")
+
+        def op(h):
+            before = len((h.repo.patients.get_active(pid) or {}).get("billing") or [])
+            h.add_billing_item(pid, item)
+            billing = (h.repo.patients.get_active(pid) or {}).get("billing") or []
+            return (200, {"id": pid, "billing": list(billing)}) if len(billing) > before else (409, {})
+        return await self._write(op)
+
+    async def update_medications(self, body, pid):
+        self._patient(pid)
+        stop, start = _names(body.get("stop", [])), _names(body.get("start", []))
+
+        def op(h):
+            h.update_medications(pid, stop, start)
+            patient = h.repo.patients.get_active(pid)
+            if patient is None:
+                return 409, {}
+            return 200, {"id": pid, "present_medication": list(patient["present_medication"])}
+        return await self._write(op)
+
+    async def discharge(self, body, pid):
+        self._patient(pid)
+
+        def op(h):
+            patient = h.repo.patients.get_active(pid)
+            total = sum(h.facilities.get(i, 0) for i in (patient or {}).get("billing") or [])
+            h.discharge_patient(pid)
+            ok = patient is not None and (h.repo.patients.get(pid) or {}).get("isDeleted", False)
+            return (200, {"id": pid, "total": total}) if ok else (409, {})
+        return await self._write(op)
+
+async def _serve(address):
+    service = HospitalService()
+    server = await service.start(address)
+    where = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+    print(f" Serving the hospital API on http://{where}"
+          + (" (read-only standby)" if service.h.repo.read_only else ""))
+    try:
+        await server.serve_forever()
+    finally:
+        await service.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HospitalManager as an HTTP/JSON service")
+    parser.add_argument("--listen", default=config.SERVICE_ADDRESS)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args.listen))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        flush_logs()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+# Optional partitioning of the JSON data by ward (HMS_SHARD_BY_WARD=1).
+#
+#   beds.json        ->  beds.A.json, beds.B.json, ...  (each bed in its ward's file)
+#   patients.json    ->  patients.A.json, ...           (active patients, by the ward of their bed)
+#                        patients.json                  (patients without a bed, discharged ones)
+#
+# Every shard is an ordinary JSON collection file with its own version counter, so a
+# change in ward A rewrites only ward A's files and only conflicts with other changes
+# in ward A. In memory a collection is still the union of its shards; loading reads the
+# shards in parallel and afterwards only shards changed by other stations are re-read.
+
+_SAFE = re.compile(r"[^A-Za-z0-9-]")
+
+def ward_key(ward):
+    # "a" -> "A"; anything that is not safe in a file name becomes "-"
+    return _SAFE.sub("-", str(ward).strip().upper())
+
+class ShardedStorage:
+    # Wraps a JsonStorage. Doctors and any other file are passed through untouched.
+    def __init__(self, inner, bed_file="beds.json", patient_file="patients.json", workers=None):
+        self.inner = inner
+        self.bed_file = bed_file
+        self.patient_file = patient_file
+        self.workers = workers or config.SHARD_WORKERS
+        self._members = {}     # file -> {shard file: {id: None}} as of our last load/commit
+        self._bed_wards = {}   # bed id -> ward, to route patients by their bed
+
+    def is_sharded(self, file):
+        return file in (self.bed_file, self.patient_file)
+
+    # --- routing ---
+
+    def shard_file(self, file, ward):
+        if not ward:
+            return file
+        root, ext = os.path.splitext(file)
+        return f"{root}.{ward_key(ward)}{ext}"
+
+    def route(self, file, record):
+        # the shard file a record belongs in
+        if file == self.bed_file:
+            return self.shard_file(file, record.get("ward"))
+        if record.get("isDeleted", False) or not record.get("bedId"):
+            return file
+        return self.shard_file(file, self.bed_ward(record["bedId"]))
+
+    def bed_ward(self, bed_id):
+        if bed_id not in self._bed_wards:
+            # a bed we have not seen (beds not loaded in this process yet)
+            for records in self._fan_out(self.inner.load, self.shards(self.bed_file)):
+                self._note_beds(records or [])
+        return self._bed_wards.get(bed_id)
+
+    def _note_beds(self, records):
+        for bed in records:
+            self._bed_wards[bed["id"]] = bed.get("ward")
+
+    def shards(self, file):
+        # the base file first, then the ward files that exist, by name
+        directory = os.path.dirname(file)
+        root, ext = os.path.splitext(os.path.basename(file))
+        pattern = re.compile(re.escape(root) + r"\.[A-Za-z0-9-]+" + re.escape(ext) + "$")
+        try:
+            names = sorted(n for n in os.listdir(directory or ".") if pattern.match(n))
+        except FileNotFoundError:
+            names = []
+        return [file] + [os.path.join(directory, n) for n in names]
+
+    def _fan_out(self, function, shards):
+        if len(shards) == 1:
+            return [function(shards[0])]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(shards))) as pool:
+            return list(pool.map(function, shards))
+
+    def _composite(self, file, versions):
+        # {shard: version} -> the tuple version() returns, base file first
+        return tuple((shard, versions.get(shard, 0)) for shard in
+                     [file] + sorted(s for s in versions if s != file))
+
+    # --- storage interface ---
+
+    def version(self, file):
+        if not self.is_sharded(file):
+            return self.inner.version(file)
+        return tuple((shard, self.inner.version(shard)) for shard in self.shards(file))
+
+    def stamp(self, file):
+        # the version counters change on every save; Collection relies on stamp == version here
+        return self.version(file)
+
+    def snapshot(self, file):
+        # lookups by id would need the ward first, so sharded files always load
+        return None if self.is_sharded(file) else self.inner.snapshot(file)
+
+    def load(self, file):
+        if not self.is_sharded(file):
+            return self.inner.load(file)
+        shards = self.shards(file)
+        members, records = {}, []
+        for shard, part in zip(shards, self._fan_out(self.inner.load, shards)):
+            members[shard] = {r["id"]: None for r in part or []}
+            records.extend(part or [])
+        self._members[file] = members
+        if file == self.bed_file:
+            self._note_beds(records)
+        return records
+
+    def iter_records(self, file):
+        if not self.is_sharded(file):
+            yield from self.inner.iter_records(file)
+            return
+        for shard in self.shards(file):
+            yield from self.inner.iter_records(shard)
+
+    def changes_since(self, file, version):
+        # (version, {id: record or None}) after re-reading only the shards whose version
+        # moved since `version`; None when the whole collection has to be loaded
+        members = self._members.get(file)
+        if not self.is_sharded(file) or members is None or not isinstance(version, tuple):
+            return None
+        seen = dict(version)
+        current = self.version(file)
+        stale = [shard for shard, v in current if seen.get(shard) != v]
+        stale += [shard for shard in seen if shard not in dict(current)]  # removed by hand
+
+        changes = {}
+        for shard in stale:
+            for record_id in members.pop(shard, {}):
+                changes[record_id] = None
+        loaded = [s for s in stale if s in dict(current)]
+        for shard, part in zip(loaded, self._fan_out(self.inner.load, loaded)):
+            members[shard] = {r["id"]: None for r in part or []}
+            for record in part or []:
+                changes[record["id"]] = record
+            if file == self.bed_file:
+                self._note_beds(part or [])
+        return current, changes
+
+    def commit(self, changes, events=None):
+        # changes: [(file, records, changed_ids, expected_version)]. Each sharded file is
+        # split into the shards its changed records live in (or move out of); all of them
+        # go to the inner storage as one atomic commit with per-shard version checks.
+        inner_changes, plans = [], []
+        for file, records, changed_ids, expected in changes:
+            if file == self.bed_file:
+                self._note_beds(records[i] for i in (records if changed_ids is None else changed_ids)
+                                if i in records)
+        for file, records, changed_ids, expected in changes:
+            if not self.is_sharded(file):
+                inner_changes.append((file, records, changed_ids, expected))
+                plans.append((file, None, [len(inner_changes) - 1]))
+                continue
+            members = dict(self._members.get(file, {}))  # shard dicts are copied before they change
+            copied = set()
+
+            def writable(shard):
+                if shard not in copied:
+                    members[shard] = dict(members.get(shard, {}))
+                    copied.add(shard)
+                return members[shard]
+
+            homes = {record_id: shard for shard, ids in members.items() for record_id in ids} \
+                if changed_ids is None else None
+            if changed_ids is None:
+                changed_ids = list(records) + [i for i in homes if i not in records]
+
+            touched = {}
+            for record_id in changed_ids:
+                old = homes.get(record_id) if homes is not None else self._home(members, record_id)
+                new = self.route(file, records[record_id]) if record_id in records else None
+                if old is not None and old != new:
+                    writable(old).pop(record_id, None)
+                    touched.setdefault(old, {})[record_id] = None
+                if new is not None:
+                    if record_id not in members.get(new, ()):
+                        writable(new)[record_id] = None
+                    touched.setdefault(new, {})[record_id] = None
+
+            seen = dict(expected) if expected is not None else None
+            positions = []
+            for shard, ids in touched.items():
+                shard_records = {i: records[i] for i in members[shard] if i in records}
+                inner_changes.append((shard, shard_records, list(ids),
+                                      None if seen is None else seen.get(shard, 0)))
+                positions.append(len(inner_changes) - 1)
+            plans.append((file, (members, seen or {}, list(touched)), positions))
+
+        versions = self.inner.commit(inner_changes, events=events) if inner_changes else []
+
+        result = []
+        for file, plan, positions in plans:
+            if plan is None:
+                result.append(versions[positions[0]])
+                continue
+            members, seen, shards = plan
+            self._members[file] = members
+            # shards we did not touch stay at the version we loaded them at
+            result.append(self._composite(file, {**seen, **{s: versions[p] for s, p in zip(shards, positions)}}))
+        return result
+
+    def save(self, file, records, changed_ids=None, expected_version=None):
+        return self.commit([(file, records, changed_ids, expected_version)])[0]
+
+    def _home(self, members, record_id):
+        # the shard currently holding a record
+        for shard, ids in members.items():
+            if record_id in ids:
+                return shard
+        return None
+
+def split(files=("patients.json", "beds.json")):
+    # Moves the records of the unsharded files into their ward files:
+    #   python sharding.py split
+    from storage import JsonStorage
+    storage = ShardedStorage(JsonStorage())
+    counts = {}
+    for file in sorted(files, key=lambda f: f != storage.bed_file):  # beds first, patients route by them
+        records = {r["id"]: r for r in storage.load(file)}
+        storage.save(file, records)
+        counts[file] = {os.path.basename(shard): len(ids) for shard, ids in storage._members[file].items()}
+    return counts
+
+def merge(files=("patients.json", "beds.json")):
+    # Puts every record back into the single files and removes the ward files:
+    #   python sharding.py merge
+    from fileio import rotated_backup_filename
+    from storage import JsonStorage
+    inner = JsonStorage()
+    storage = ShardedStorage(inner)
+    counts = {}
+    for file in files:
+        shards = storage.shards(file)
+        records = storage.load(file)
+        inner.save(file, {r["id"]: r for r in records})
+        for shard in shards[1:]:
+            leftovers = [shard + suffix for suffix in ("", ".version", ".snap")]
+            leftovers += [rotated_backup_filename(shard, n) for n in range(max(1, config.BACKUP_KEEP))]
+            for path in leftovers:
+                if os.path.exists(path):
+                    os.remove(path)
+        counts[file] = len(records)
+    return counts
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("split", "merge"):
+        sys.exit("usage: python sharding.py split|merge")
+    for file, count in (split() if sys.argv[1] == "split" else merge()).items():
+        print(f" {file}: {count}")
@@ -0,0 +1,169 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+import codec
+
+# Binary snapshot of one collection, written next to its JSON file as "<file>.snap".
+#
+#   header | record area | spans (count x (start, end) uint64) | ids (JSON list)
+#
+# Each record is stored as compact JSON on its own, so a reader maps the file and only
+# decodes the records it is asked for. The header carries the stamp (version, mtime,
+# size) of the JSON file it was made from; a snapshot whose stamp no longer matches is
+# ignored. A commit appends the records it changed to the record area and rewrites the
+# spans and ids behind them (update_snapshot), so the record area only ever grows and a
+# reader that mapped the file earlier keeps reading the bytes it indexed.
+
+MAGIC = b"HMSSNAP2"
+HEADER = struct.Struct("<8sQqqIQ")  # magic, version, json mtime_ns, json size, count, spans position
+
+def snapshot_filename(file):
+    return file + ".snap"
+
+def _tables(spans, ids, pad=0):
+    if sys.byteorder != "little":
+        spans = array('Q', spans)
+        spans.byteswap()
+    # trailing spaces are still valid JSON; they keep the file from shrinking under a reader
+    return spans.tobytes() + codec.dumps(ids, compact=True) + b" " * pad
+
+def write_snapshot(path, records, stamp):
+    # records: iterable of dicts in file order; written to a temp file and renamed
+    records = list(records)
+    blobs = [codec.dumps(r, compact=True) for r in records]
+    spans = array('Q')
+    position = HEADER.size
+    for blob in blobs:
+        spans.extend((position, position + len(blob)))
+        position += len(blob)
+
+    version, mtime_ns, size = stamp
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                               dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, version, mtime_ns, size, len(blobs), position))
+            f.writelines(blobs)
+            f.write(_tables(spans, [r["id"] for r in records]))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def update_snapshot(path, changed, removed, stamp, previous):
+    # Brings the snapshot of the file as it was at stamp `previous` up to `stamp` by
+    # appending the `changed` records and dropping the `removed` ids. Returns False,
+    # without touching the file, when there is no such snapshot or when superseded
+    # records would take more room than the live ones; the caller rewrites it then.
+    try:
+        f = open(path, 'r+b')
+    except FileNotFoundError:
+        return False
+    with f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return False
+        magic, version, mtime_ns, size, count, spans_at = HEADER.unpack(header)
+        if magic != MAGIC or (version, mtime_ns, size) != tuple(previous):
+            return False
+        f.seek(spans_at)
+        spans = array('Q', f.read(16 * count))
+        if sys.byteorder != "little":
+            spans.byteswap()
+        try:
+            ids = codec.loads(f.read())
+        except ValueError:
+            return False
+        end = f.tell()
+
+        if removed:
+            removed = set(removed)
+            kept = [row for row, record_id in enumerate(ids) if record_id not in removed]
+            ids = [ids[row] for row in kept]
+            spans = array('Q', (n for row in kept for n in (spans[2 * row], spans[2 * row + 1])))
+        rows = {record_id: row for row, record_id in enumerate(ids)}
+        blobs = [codec.dumps(r, compact=True) for r in changed]
+        position = spans_at
+        for record, blob in zip(changed, blobs):
+            row = rows.get(record["id"])
+            if row is None:
+                rows[record["id"]] = len(ids)
+                ids.append(record["id"])
+                spans.extend((position, position + len(blob)))
+            else:
+                spans[2 * row], spans[2 * row + 1] = position, position + len(blob)
+            position += len(blob)
+        live = sum(spans[1::2]) - sum(spans[0::2])
+        if position - HEADER.size > 2 * live:
+            return False
+
+        # records and tables first, the header that points at them last
+        f.seek(spans_at)
+        f.writelines(blobs)
+        tables = _tables(spans, ids)
+        f.write(tables + b" " * max(0, end - position - len(tables)))
+        f.flush()
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, *stamp, len(ids), position))
+        f.flush()
+    return True
+
+class SnapshotReader:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, mtime_ns, size, count, spans_at = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a snapshot file")
+            self.stamp = (version, mtime_ns, size)
+            self.count = count
+            ids_at = spans_at + 16 * count
+            self._spans = array('Q', self._mm[spans_at:ids_at])
+            if sys.byteorder != "little":
+                self._spans.byteswap()
+            # only the ids are decoded up front
+            self._rows = {record_id: row for row, record_id in enumerate(codec.loads(self._mm[ids_at:]))}
+        except BaseException:
+            self._mm.close()
+            raise
+
+    def __contains__(self, record_id):
+        return record_id in self._rows
+
+    def ids(self):
+        return list(self._rows)
+
+    def get(self, record_id):
+        row = self._rows.get(record_id)
+        if row is None:
+            return None
+        return codec.loads(self._mm[self._spans[2 * row]:self._spans[2 * row + 1]])
+
+    def records(self):
+        for row in range(self.count):
+            yield codec.loads(self._mm[self._spans[2 * row]:self._spans[2 * row + 1]])
+
+    def close(self):
+        self._mm.close()
+
+def build_snapshots(files):
+    # Generate snapshots from the current JSON files, e.g. before the first start on a
+    # big data set:  python snapshot.py patients.json doctors.json beds.json
+    from storage import JsonStorage
+    storage = JsonStorage(snapshots=False)  # keeps no snapshot mapped while it is replaced
+    counts = {}
+    for file in files:
+        records = storage.load(file) or []
+        write_snapshot(snapshot_filename(file), records, storage.stamp(file))
+        counts[file] = len(records)
+    return counts
+
+if __name__ == "__main__":
+    for file, count in build_snapshots(sys.argv[1:] or ["patients.json", "doctors.json", "beds.json"]).items():
+        print(f" {file}: {count} records -> {snapshot_filename(file)}")
@@ -0,0 +1,580 @@
+import copy
+import os
+import sqlite3
+from contextlib import ExitStack
+from datetime import datetime
+
+import codec
+import config
+import utils
+from fileio import write_with_backup
+from events import EventLog
+from journal import Journal
+from locks import FileLock
+from sharding import ShardedStorage
+from snapshot import SnapshotReader, snapshot_filename, update_snapshot, write_snapshot
+from streamreader import iter_records
+
+def collection_name(file):
+    # "patients.json" -> "patients"
+    return os.path.splitext(os.path.basename(file))[0]
+
+class VersionConflict(Exception):
+    # Another process saved the collection after we loaded it
+    pass
+
+class ReadOnlyStore(Exception):
+    # Change attempted on a read-only standby (see replication.py)
+    pass
+
+class ReplicationGap(Exception):
+    # A replicated commit does not follow the last one here; the standby needs a full copy
+    pass
+
+class JsonStorage:
+    # The original layout: one JSON array per collection, rewritten in full on save.
+    # Each file has a "<file>.version" counter that is bumped on every save. Commits
+    # that touch several files go through the write-ahead journal so they are all-or-nothing.
+    VERSION_SUFFIX = ".version"
+
+    def __init__(self, journal=None, snapshots=None):
+        self.journal = journal or Journal()
+        self.snapshots = config.SNAPSHOTS if snapshots is None else snapshots
+        self._readers = {}
+        self.recover()
+
+    def load(self, file):
+        before = self.stamp(file)
+        data = utils.read_json(file)
+        # a full read is the moment to (re)build a missing or stale snapshot (commits keep
+        # it current, but the file may predate snapshots or have been edited by hand), as
+        # long as nobody wrote the file while we were reading it
+        if self.snapshots and before is not None and self.snapshot(file) is None and self.stamp(file) == before:
+            try:
+                write_snapshot(snapshot_filename(file), data or [], before)
+            except OSError as e:
+                utils.log_action("snapshot", file, f"error: {str(e)}")
+        return data
+
+    def iter_records(self, file):
+        # one record at a time straight from the file, for listings over big collections
+        if not os.path.exists(file):
+            return
+        done = 0
+        try:
+            for record in iter_records(file):
+                yield record
+                done += 1
+        except ValueError as e:
+            # damaged file: carry on from what load() recovers (backups), skipping what was shown
+            utils.log_action("read", file, f"error: {str(e)}")
+            yield from (self.load(file) or [])[done:]
+
+    def snapshot(self, file):
+        # memory-mapped reader for the file's snapshot, or None if there is no up-to-date one
+        if not self.snapshots:
+            return None
+        stamp = self.stamp(file)
+        reader = self._readers.get(file)
+        if reader is not None and reader.stamp == stamp:
+            return reader
+        # a stale reader is closed before anything replaces its file (Windows refuses
+        # to replace a mapped file)
+        self.close_snapshot(file)
+        if stamp is None:
+            return None
+        try:
+            reader = SnapshotReader(snapshot_filename(file))
+        except (OSError, ValueError):
+            return None
+        if reader.stamp != stamp:
+            reader.close()
+            return None
+        self._readers[file] = reader
+        return reader
+
+    def close_snapshot(self, file):
+        reader = self._readers.pop(file, None)
+        if reader is not None:
+            reader.close()
+
+    def lock(self, file):
+        return FileLock(file)
+
+    def version(self, file):
+        try:
+            with open(file + self.VERSION_SUFFIX, 'r') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_version(self, file, version):
+        tmp = file + self.VERSION_SUFFIX + ".tmp"
+        with open(tmp, 'w') as f:
+            f.write(str(version))
+        os.replace(tmp, file + self.VERSION_SUFFIX)
+
+    def _apply(self, file, data, version, changed=None, removed=()):
+        # changed/removed: what this write changed, when not the whole collection
+        before = self.stamp(file) if self.snapshots else None
+        backup_file = write_with_backup(file, data)
+        utils.log_action("write", file, "atomic write")
+        if backup_file:
+            utils.log_action("write_backup", backup_file, "backup snapshot rotated")
+        self._write_version(file, version)
+        if self.snapshots:
+            self._sync_snapshot(file, data, before, changed, removed)
+
+    def _sync_snapshot(self, file, data, before, changed, removed):
+        # Still under the file lock, so the stamp belongs to the data just written. The
+        # changed records are appended to a snapshot that matched the file before this
+        # write; a missing or stale one is rewritten from `data`. Our reader is closed
+        # first (Windows refuses to replace a mapped file).
+        self.close_snapshot(file)
+        path, stamp = snapshot_filename(file), self.stamp(file)
+        try:
+            if changed is None or before is None or not update_snapshot(path, changed, removed, stamp, before):
+                write_snapshot(path, data, stamp)
+        except OSError as e:
+            utils.log_action("snapshot", file, f"error: {str(e)}")
+
+    def commit(self, changes, events=None):
+        # changes: [(file, records, changed_ids, expected_version)], applied all or nothing.
+        # Returns the new version of each file. The typed events are only kept by EventStorage.
+        with ExitStack() as locks:
+            for file in sorted({c[0] for c in changes}):
+                locks.enter_context(self.lock(file))
+
+            entries = []
+            for file, records, changed_ids, expected_version in changes:
+                current = self.version(file)
+                if expected_version is not None and current != expected_version:
+                    raise VersionConflict(file)
+                full = changed_ids is None
+                changed = records.values() if full else [records[i] for i in changed_ids if i in records]
+                removed = [] if full else [i for i in changed_ids if i not in records]
+                entries.append({"file": file, "version": current + 1, "full": full, "records": list(changed),
+                                "removed": removed})
+
+            # a single file is already replaced atomically, the journal is only needed across files
+            journal_path = self.journal.write(entries) if len(entries) > 1 else None
+            for (file, records, _, _), entry in zip(changes, entries):
+                self._apply(file, list(records.values()), entry["version"],
+                            None if entry["full"] else entry["records"], entry["removed"])
+            if journal_path:
+                self.journal.discard(journal_path)
+        return [entry["version"] for entry in entries]
+
+    def save(self, file, records, changed_ids=None, expected_version=None):
+        return self.commit([(file, records, changed_ids, expected_version)])[0]
+
+    def recover(self):
+        # Finish commits that were journaled but interrupted before all files were written
+        for path, entries in self.journal.pending():
+            with ExitStack() as locks:
+                for file in sorted({e["file"] for e in entries}):
+                    locks.enter_context(self.lock(file))
+                if not os.path.exists(path):
+                    continue  # its writer was still running and has finished since
+                for entry in entries:
+                    file = entry["file"]
+                    if self.version(file) >= entry["version"]:
+                        continue  # this file made it to disk before the crash
+                    if entry["full"]:
+                        data = entry["records"]
+                    else:
+                        current = {r["id"]: r for r in (utils.read_json(file) or [])}
+                        for record in entry["records"]:
+                            current[record["id"]] = record
+                        for record_id in entry.get("removed", ()):
+                            current.pop(record_id, None)
+                        data = list(current.values())
+                    self._apply(file, data, entry["version"])
+                self.journal.discard(path)
+                utils.log_action("recover", path, "interrupted commit replayed from journal")
+
+    def stamp(self, file):
+        try:
+            st = os.stat(file)
+            return (self.version(file), st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+class EventStorage(JsonStorage):
+    # Event-sourced variant of the JSON layout. A commit appends one line to the event
+    # log (see events.py) with the typed events of the operation and the records it
+    # changed, so a write costs the size of the change instead of the collection. The
+    # JSON files become periodic snapshots: every config.EVENT_SNAPSHOT_EVERY events they
+    # are rewritten and the log is rotated. A collection is its snapshot plus the log tail.
+    VERSION_SUFFIX = ".seq"  # seq of the last event the snapshot contains
+
+    def __init__(self, log=None, snapshot_every=None, journal=None):
+        self.log = log or EventLog()
+        self.snapshot_every = config.EVENT_SNAPSHOT_EVERY if snapshot_every is None else snapshot_every
+        self._tail = []           # log entries after the checkpoint, oldest first
+        self._versions = {}       # file -> seq of the last tail entry that changed it
+        self._seq = 0
+        self._checkpoint = None   # seq the current log starts after, None while unknown
+        super().__init__(journal, snapshots=False)  # the JSON files lag behind, no .snap for them
+
+    def recover(self):
+        # nothing to finish: a commit is a single appended line
+        pass
+
+    def _catch_up(self):
+        reset, entries = self.log.read_new()
+        if reset:
+            self._tail, self._versions = [], {}
+            self._checkpoint = 0 if os.path.exists(self.log.path) else None
+        for entry in entries:
+            if "checkpoint" in entry:
+                self._checkpoint = entry["checkpoint"]
+                self._seq = max(self._seq, entry["checkpoint"])
+            else:
+                self._add_to_tail(entry)
+
+    def _add_to_tail(self, entry):
+        self._tail.append(entry)
+        self._seq = max(self._seq, entry["seq"])
+        for file in entry["changes"]:
+            self._versions[file] = entry["seq"]
+
+    def _version(self, file):
+        return max(self._versions.get(file, 0), super().version(file))
+
+    def version(self, file):
+        self._catch_up()
+        return self._version(file)
+
+    def stamp(self, file):
+        # a collection changes exactly when its version does
+        return self.version(file)
+
+    def snapshot(self, file):
+        return None
+
+    def load(self, file):
+        self._catch_up()
+        after = super().version(file)  # read before the snapshot itself, see checkpoint()
+        records = {r["id"]: r for r in (utils.read_json(file) or [])}
+        for entry in self._tail:
+            if entry["seq"] > after and file in entry["changes"]:
+                self._replay(records, file, entry)
+        return list(records.values())
+
+    def iter_records(self, file):
+        yield from self.load(file)
+
+    def _replay(self, records, file, entry):
+        if file in entry.get("full", ()):
+            records.clear()
+        for record_id, record in entry["changes"][file].items():
+            if record is None:
+                records.pop(record_id, None)
+            else:
+                records[record_id] = copy.deepcopy(record)  # the tail entry stays pristine
+
+    def changes_since(self, file, version):
+        # (version, {id: record or None}) for what changed after `version`, or None when
+        # the log no longer reaches back that far and the collection has to be reloaded
+        self._catch_up()
+        if self._checkpoint is None or not self._checkpoint <= version <= self._version(file):
+            return None
+        records = {}
+        for entry in self._tail:
+            if entry["seq"] > version and file in entry["changes"]:
+                if file in entry.get("full", ()):
+                    return None
+                for record_id, record in entry["changes"][file].items():
+                    records[record_id] = copy.deepcopy(record)
+        return self._version(file), records
+
+    def commit(self, changes, events=None):
+        # changes: [(file, records, changed_ids, expected_version)], appended as one line.
+        # Returns the new version of each file.
+        with self.lock(self.log.path):
+            self._catch_up()
+            entry_changes, full = {}, []
+            for file, records, changed_ids, expected_version in changes:
+                if expected_version is not None and self._version(file) != expected_version:
+                    raise VersionConflict(file)
+                if changed_ids is None:
+                    full.append(file)
+                    changed_ids = records
+                entry_changes[file] = {i: records.get(i) for i in changed_ids}
+
+            # never below a snapshot's seq, even if the log was deleted
+            seq = max([self._seq] + [self._version(file) for file in entry_changes]) + 1
+            entry = {"seq": seq, "at": datetime.now().isoformat(timespec='seconds'),
+                     "events": list(events or ()), "changes": entry_changes}
+            if full:
+                entry["full"] = full
+            line = codec.dumps_line(entry)
+            self.log.append(line.encode("utf-8") + b"\n", fsync=config.WRITE_FSYNC)
+            # a decoded copy: the records in `changes` are the caller's live objects
+            self._add_to_tail(codec.loads(line))
+            utils.log_action("write", self.log.path,
+                             f"event {seq}: {', '.join(e['type'] for e in entry['events']) or 'records changed'}")
+
+            if len(self._tail) >= self.snapshot_every:
+                self.checkpoint()
+        return [seq] * len(changes)
+
+    def checkpoint(self):
+        # Rewrites the snapshot of every collection the tail changed, then rotates the log.
+        # A crash in between is harmless: replaying lines a snapshot already has is a no-op.
+        with self.lock(self.log.path):
+            self._catch_up()
+            if not self._tail:
+                return
+            for file in sorted({file for entry in self._tail for file in entry["changes"]}):
+                self._apply(file, self.load(file), self._versions[file])
+            self.log.rotate(self._tail[0]["seq"], self._seq)
+            utils.log_action("checkpoint", self.log.path, f"{len(self._tail)} events up to {self._seq} in snapshots")
+            self._tail, self._versions = [], {}
+            self._checkpoint = self._seq
+
+    def history(self, after=0):
+        # every logged commit after seq `after`, oldest first, including the rotated segments
+        return self.log.entries(after)
+
+    def last_seq(self):
+        self._catch_up()
+        return self._seq
+
+    def export(self, files):
+        # (seq, {file: records}): a consistent copy of the collections as of one seq
+        with self.lock(self.log.path):
+            self._catch_up()
+            return self._seq, {file: self.load(file) for file in files}
+
+    def install(self, seq, collections):
+        # Replaces everything here with a copy exported at `seq` on another node
+        with self.lock(self.log.path):
+            for file, records in collections.items():
+                self._apply(file, records, seq)
+            self.log.restart(seq)
+            self._tail, self._versions = [], {}
+            self._seq = self._checkpoint = seq
+
+    def apply_replicated(self, entry):
+        # Appends a commit made on another node, keeping its seq. Returns False for one
+        # that is already here, raises ReplicationGap for one that skips a seq.
+        with self.lock(self.log.path):
+            self._catch_up()
+            if entry["seq"] <= self._seq:
+                return False
+            if entry["seq"] != self._seq + 1:
+                raise ReplicationGap(f"got seq {entry['seq']} after {self._seq}")
+            line = codec.dumps_line(entry)
+            self.log.append(line.encode("utf-8") + b"\n", fsync=config.WRITE_FSYNC)
+            self._add_to_tail(codec.loads(line))
+            if len(self._tail) >= self.snapshot_every:
+                self.checkpoint()
+            return True
+
+# Column layout per table, in the same key order the JSON records use.
+# Keys that are not listed here are kept in the `extra` JSON column.
+TABLE_COLUMNS = {
+    "patients": ("name", "age", "gender", "isDeleted", "priority", "doctorId", "bedId"),
+    "doctors": ("name", "age", "gender", "isDeleted", "specialization"),
+    "beds": ("ward", "bed_type", "patientId", "priority", "status", "isDeleted", "doctorId"),
+}
+PATIENT_LISTS = ("present_medication", "past_medication", "billing")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id TEXT PRIMARY KEY, name TEXT, age INTEGER, gender TEXT, isDeleted INTEGER NOT NULL DEFAULT 0,
+    priority TEXT, doctorId TEXT, bedId TEXT, extra TEXT
+);
+CREATE TABLE IF NOT EXISTS doctors (
+    id TEXT PRIMARY KEY, name TEXT, age INTEGER, gender TEXT, isDeleted INTEGER NOT NULL DEFAULT 0,
+    specialization TEXT, extra TEXT
+);
+CREATE TABLE IF NOT EXISTS beds (
+    id TEXT PRIMARY KEY, ward TEXT, bed_type TEXT, patientId TEXT, priority TEXT, status TEXT,
+    isDeleted INTEGER NOT NULL DEFAULT 0, doctorId TEXT, extra TEXT
+);
+CREATE TABLE IF NOT EXISTS billing_items (
+    patient_id TEXT NOT NULL, position INTEGER NOT NULL, item TEXT NOT NULL,
+    PRIMARY KEY (patient_id, position)
+);
+CREATE TABLE IF NOT EXISTS medications (
+    patient_id TEXT NOT NULL, kind TEXT NOT NULL, position INTEGER NOT NULL, name TEXT NOT NULL,
+    PRIMARY KEY (patient_id, kind, position)
+);
+CREATE TABLE IF NOT EXISTS collection_versions (
+    name TEXT PRIMARY KEY, version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_patients_doctor ON patients (doctorId);
+CREATE INDEX IF NOT EXISTS idx_patients_bed ON patients (bedId);
+CREATE INDEX IF NOT EXISTS idx_beds_patient ON beds (patientId);
+CREATE INDEX IF NOT EXISTS idx_beds_doctor ON beds (doctorId);
+CREATE INDEX IF NOT EXISTS idx_beds_status ON beds (status);
+CREATE INDEX IF NOT EXISTS idx_beds_ward ON beds (ward);
+"""
+
+class SqliteStorage:
+    # Same interface as JsonStorage, backed by one SQLite database. Saves only touch
+    # the rows that changed, so assigning a bed no longer rewrites every patient.
+    def __init__(self, path=None):
+        self.path = path or config.SQLITE_FILE
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def snapshot(self, file):
+        # rows are already read one by one through the primary key, nothing to map
+        return None
+
+    def _table(self, file):
+        table = collection_name(file)
+        if table not in TABLE_COLUMNS:
+            raise ValueError(f"No SQLite table for {file}")
+        return table
+
+    def load(self, file):
+        records = list(self.iter_records(file))
+        utils.log_action("read", f"{self.path}:{self._table(file)}", "read operation")
+        return records
+
+    def iter_records(self, file):
+        table = self._table(file)
+        columns = TABLE_COLUMNS[table]
+        # a separate cursor, rows are fetched as they are consumed
+        rows = self.conn.cursor().execute(
+            f"SELECT id, {', '.join(columns)}, extra FROM {table} ORDER BY rowid")
+
+        lists = {}
+        if table == "patients":
+            lists = self._load_patient_lists()
+
+        for row in rows:
+            record = {"id": row[0]}
+            for column, value in zip(columns, row[1:]):
+                record[column] = bool(value) if column == "isDeleted" else value
+            if table == "patients":
+                patient_lists = lists.get(row[0], {})
+                # keep the JSON key order: ..., priority, present/past medication, doctorId, bedId, billing
+                record = {k: record[k] for k in ("id", "name", "age", "gender", "isDeleted", "priority")} | {
+                    "present_medication": patient_lists.get("present_medication", []),
+                    "past_medication": patient_lists.get("past_medication", []),
+                    "doctorId": record["doctorId"],
+                    "bedId": record["bedId"],
+                }
+                if "billing" in patient_lists:
+                    record["billing"] = patient_lists["billing"]
+            if row[-1]:
+                record.update(codec.loads(row[-1]))
+            yield record
+
+    def _load_patient_lists(self):
+        lists = {}
+        for patient_id, kind, name in self.conn.execute(
+                "SELECT patient_id, kind, name FROM medications ORDER BY patient_id, kind, position"):
+            lists.setdefault(patient_id, {}).setdefault(kind, []).append(name)
+        for patient_id, item in self.conn.execute(
+                "SELECT patient_id, item FROM billing_items ORDER BY patient_id, position"):
+            lists.setdefault(patient_id, {}).setdefault("billing", []).append(item)
+        return lists
+
+    def version(self, file):
+        row = self.conn.execute(
+            "SELECT version FROM collection_versions WHERE name = ?", (self._table(file),)).fetchone()
+        return row[0] if row else 0
+
+    def commit(self, changes, events=None):
+        # changes: [(file, records, changed_ids, expected_version)], written in one
+        # SQLite transaction. Returns the new version of each collection.
+        versions, saved = [], []
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")  # take the write lock before checking versions
+            for file, records, changed_ids, expected_version in changes:
+                table = self._table(file)
+                current = self.version(file)
+                if expected_version is not None and current != expected_version:
+                    raise VersionConflict(file)
+                if changed_ids is None:
+                    self._delete(table, None)
+                    ids = list(records)
+                else:
+                    ids = [i for i in changed_ids if i in records]
+                    for record_id in changed_ids:
+                        if record_id not in records:
+                            self._delete(table, record_id)  # removed (archived) since the last save
+                for record_id in ids:
+                    self._upsert(table, records[record_id])
+                self._bump_version(table)
+                versions.append(current + 1)
+                saved.append((table, len(ids)))
+        for table, count in saved:
+            utils.log_action("write", f"{self.path}:{table}", f"{count} rows saved")
+        return versions
+
+    def save(self, file, records, changed_ids=None, expected_version=None):
+        return self.commit([(file, records, changed_ids, expected_version)])[0]
+
+    def _delete(self, table, record_id):
+        if record_id is None:
+            self.conn.execute(f"DELETE FROM {table}")
+            if table == "patients":
+                self.conn.execute("DELETE FROM medications")
+                self.conn.execute("DELETE FROM billing_items")
+            return
+        self.conn.execute(f"DELETE FROM {table} WHERE id = ?", (record_id,))
+        if table == "patients":
+            self.conn.execute("DELETE FROM medications WHERE patient_id = ?", (record_id,))
+            self.conn.execute("DELETE FROM billing_items WHERE patient_id = ?", (record_id,))
+
+    def _upsert(self, table, record):
+        columns = TABLE_COLUMNS[table]
+        known = set(columns) | {"id"} | (set(PATIENT_LISTS) if table == "patients" else set())
+        extra = {k: v for k, v in record.items() if k not in known}
+        values = [record["id"]] + [record.get(c) for c in columns] + [codec.dumps_line(extra) if extra else None]
+        placeholders = ", ".join("?" * len(values))
+        assignments = ", ".join(f"{c} = excluded.{c}" for c in columns + ("extra",))
+        self.conn.execute(
+            f"INSERT INTO {table} (id, {', '.join(columns)}, extra) VALUES ({placeholders}) "
+            f"ON CONFLICT(id) DO UPDATE SET {assignments}", values)
+
+        if table == "patients":
+            record_id = record["id"]
+            self.conn.execute("DELETE FROM medications WHERE patient_id = ?", (record_id,))
+            self.conn.execute("DELETE FROM billing_items WHERE patient_id = ?", (record_id,))
+            for kind in ("present_medication", "past_medication"):
+                self.conn.executemany(
+                    "INSERT INTO medications (patient_id, kind, position, name) VALUES (?, ?, ?, ?)",
+                    [(record_id, kind, pos, name) for pos, name in enumerate(record.get(kind) or [])])
+            self.conn.executemany(
+                "INSERT INTO billing_items (patient_id, position, item) VALUES (?, ?, ?)",
+                [(record_id, pos, item) for pos, item in enumerate(record.get("billing") or [])])
+
+    def _bump_version(self, table):
+        self.conn.execute(
+            "INSERT INTO collection_versions (name, version) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1", (table,))
+
+    def stamp(self, file):
+        return self.version(file)
+
+def open_storage(backend=None):
+    backend = (backend or config.STORAGE_BACKEND).lower()
+    if backend == "sqlite":
+        return SqliteStorage()
+    if backend == "json":
+        # ward shards only pay off for whole-file rewrites; SQLite and the event log
+        # already write just the records that changed
+        return ShardedStorage(JsonStorage()) if config.SHARD_BY_WARD else JsonStorage()
+    if backend == "events":
+        return EventStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+def migrate_json_to_sqlite(files=("patients.json", "doctors.json", "beds.json"), db_path=None):
+    # Imports the JSON collections into the SQLite database, replacing what is there
+    target = SqliteStorage(db_path)
+    counts = {}
+    for file in files:
+        records = utils.read_json(file) or []
+        target.save(file, {r["id"]: r for r in records})
+        counts[collection_name(file)] = len(records)
+    return counts
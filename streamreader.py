@@ -0,0 +1,93 @@
+import json
+import os
+
+import codec
+
+# Reads records one at a time from a JSON array-of-objects file or a JSON Lines file,
+# holding one chunk of text plus the record being decoded instead of the whole file.
+
+CHUNK_SIZE = 64 * 1024
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+def iter_records(path, chunk_size=CHUNK_SIZE):
+    # .jsonl is read line by line; anything else is sniffed by its first character
+    if os.path.splitext(path)[1].lower() == ".jsonl":
+        yield from iter_jsonl(path)
+        return
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        first = ""
+        while True:
+            ch = f.read(1)
+            if not ch or ch not in _WHITESPACE:
+                first = ch
+                break
+    if first == "[":
+        yield from iter_json_array(path, chunk_size)
+    elif first == "{":
+        yield from iter_jsonl(path)
+    elif first:
+        raise ValueError(f"{path}: expected a JSON array or JSON Lines")
+
+def iter_jsonl(path):
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield codec.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash, skip it
+
+def iter_json_array(path, chunk_size=CHUNK_SIZE):
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def more():
+            # drop what has been consumed and append the next chunk; a record bigger
+            # than the buffer doubles it, so huge records are not re-parsed chunk by chunk
+            nonlocal buffer, pos, eof
+            chunk = f.read(max(chunk_size, len(buffer) - pos))
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return not eof
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer) or not more():
+                    return
+
+        skip_whitespace()
+        if buffer[pos:pos + 1] != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+        skip_whitespace()
+        if buffer[pos:pos + 1] == "]":
+            return
+
+        while True:
+            try:
+                record, end = _decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # the record runs past the end of the buffer: read on and retry
+                if more():
+                    continue
+                raise ValueError(f"{path}: truncated or invalid JSON array")
+            pos = end
+            yield record
+
+            skip_whitespace()
+            separator = buffer[pos:pos + 1]
+            pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"{path}: expected ',' or ']' after a record")
+            skip_whitespace()
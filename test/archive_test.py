@@ -0,0 +1,43 @@
+import os
+from helpers import TempDirTestCase
+from archive import PatientArchive
+
+def discharged(pid, when):
+    return {"id": pid, "name": "Ann", "isDeleted": True, "dischargedAt": when,
+            "present_medication": [], "past_medication": ["aspirin"], "billing": ["X-Ray"]}
+
+class TestPatientArchive(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.archive = PatientArchive(os.path.join(self.tmp.name, "archive"))
+
+    def test_partitioned_by_discharge_month(self):
+        self.archive.add([discharged("P1", "2024-05-02T10:00:00"), discharged("P2", "2024-06-30T09:00:00"),
+                          discharged("P3", "2024-05-20T08:00:00")])
+        self.assertEqual(self.archive.partitions(), ["patients-2024-05.jsonl", "patients-2024-06.jsonl"])
+        self.assertEqual(len(self.archive), 3)
+
+    def test_lookup_reads_the_archived_record(self):
+        self.archive.add([discharged("P1", "2024-05-02T10:00:00")])
+        self.archive.add([discharged("P2", "2024-05-03T10:00:00")])
+        entry = PatientArchive(self.archive.directory).get("P2")  # fresh instance, index read from disk
+        self.assertEqual(entry["patient"], discharged("P2", "2024-05-03T10:00:00"))
+        self.assertIn("archivedAt", entry)
+        self.assertIsNone(self.archive.get("P9"))
+        self.assertIn("P1", self.archive)
+
+    def test_archiving_again_skips_indexed_patients(self):
+        self.assertEqual(self.archive.add([discharged("P1", "2024-05-02T10:00:00")]), 1)
+        self.assertEqual(self.archive.add([discharged("P1", "2024-05-02T10:00:00"),
+                                           discharged("P2", "2024-05-03T10:00:00")]), 1)
+        with open(os.path.join(self.archive.directory, "patients-2024-05.jsonl")) as f:
+            self.assertEqual(len(f.readlines()), 2)
+        self.assertEqual(sorted(self.archive.ids()), ["P1", "P2"])
+
+    def test_damaged_index_is_rebuilt(self):
+        self.archive.add([discharged("P1", "2024-05-02T10:00:00"), discharged("P2", "2024-06-03T10:00:00")])
+        with open(self.archive.index_file, "w") as f:
+            f.write("{not json")
+        archive = PatientArchive(self.archive.directory)
+        self.assertEqual(archive.get("P2")["patient"]["id"], "P2")
+        self.assertEqual(sorted(archive.ids()), ["P1", "P2"])
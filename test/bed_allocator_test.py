@@ -0,0 +1,44 @@
+import os
+import unittest
+from helpers import TempDirTestCase
+from bed_allocator import BedAllocator
+from journal import Journal
+from repository import Repository
+from storage import JsonStorage
+
+def bed(bed_id, ward, bed_type, status="vacant", patient_id=None):
+    return {"id": bed_id, "ward": ward, "bed_type": bed_type, "patientId": patient_id, "priority": None,
+            "status": status, "isDeleted": False, "doctorId": None}
+
+class TestBedAllocator(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.files = self.data_files(beds=[bed("B1", "A", "General", "Occupied", "P9"), bed("B2", "A", "general"),
+                                           bed("B3", "B", "ICU"), bed("B4", "B", "Special", "Vacant")])
+        self.repo = Repository(*self.files, storage=JsonStorage(Journal(os.path.join(self.tmp.name, "journal"))))
+        self.allocator = BedAllocator(self.repo.beds)
+
+    def test_red_patients_get_icu_first(self):
+        self.assertEqual(self.allocator.pick("Red")["id"], "B3")
+
+    def test_green_patients_never_get_icu(self):
+        self.assertEqual(self.allocator.pick("green")["id"], "B2")
+        with self.repo.batch():
+            self.repo.beds.update("B2", status="occupied")
+            self.repo.beds.update("B4", status="occupied")
+        self.assertIsNone(self.allocator.pick("green"))
+
+    def test_filters_by_type_and_ward(self):
+        self.assertEqual(self.allocator.pick(bed_type="special")["id"], "B4")
+        self.assertIsNone(self.allocator.pick(bed_type="icu", ward="a"))
+
+    def test_free_lists_follow_status_changes(self):
+        self.assertEqual(self.allocator.free_count(), 3)
+        with self.repo.batch():
+            self.repo.beds.update("B3", status="occupied", patientId="P1")
+            self.repo.beds.update("B1", status="Vacant", patientId=None)
+        self.assertEqual(self.allocator.free_count("ICU"), 0)
+        self.assertEqual(self.allocator.free_count(ward="A"), 2)
+
+if __name__ == "__main__":
+    unittest.main()
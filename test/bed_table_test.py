@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import patch
+from bed_table import BedTable
+
+def bed(bed_id, ward, bed_type, status="Vacant", patient_id=None, priority=None):
+    return {"id": bed_id, "ward": ward, "bed_type": bed_type, "patientId": patient_id, "priority": priority,
+            "status": status, "isDeleted": False, "doctorId": None}
+
+BEDS = [bed("B1", "A", "GENERAL", "Occupied", "P1", "Red"), bed("B2", "a", "general"),
+        bed("B3", "B", "ICU"), bed("B4", "B", "ICU", "occupied", "P2", "yellow"), bed("B5", "C", "SPECIAL")]
+
+class TestBedTable(unittest.TestCase):
+    def setUp(self):
+        self.table = BedTable.from_beds(BEDS)
+
+    def test_counts_by_ward_and_type(self):
+        summary = self.table.occupancy_by_ward()
+        self.assertEqual(sorted(summary), ["A", "B", "C"])  # "a" is ward A
+        self.assertEqual(summary["A"]["GENERAL"], {"total": 2, "occupied": 1, "vacant": 1})
+        self.assertEqual(summary["B"]["ICU"], {"total": 2, "occupied": 1, "vacant": 1})
+        self.assertEqual(self.table.available("icu"), 1)
+        self.assertEqual(self.table.priority_mix(), {"Red": 1, "Yellow": 1, "Green": 0})
+
+    def test_ward_filter_ignores_case(self):
+        self.assertEqual(self.table.available("general", ward="a"), 1)
+        self.assertEqual(sorted(self.table.select(ward="A")), ["B1", "B2"])
+        self.assertEqual(self.table.select(ward="z"), [])
+
+    def test_updates_after_assign_and_discharge(self):
+        self.table.update(bed("B3", "B", "ICU", "Occupied", "P3", "Green"))
+        self.assertEqual(self.table.available("icu", ward="B"), 0)
+        self.assertEqual(sorted(self.table.select(occupied=True)), ["B1", "B3", "B4"])
+        self.table.update(bed("B1", "A", "GENERAL"))
+        self.assertEqual(self.table.occupancy_by_ward()["A"]["GENERAL"]["vacant"], 2)
+        self.assertEqual(self.table.priority_mix(), {"Red": 0, "Yellow": 1, "Green": 1})
+        self.table.remove("B5")
+        self.assertNotIn("C", self.table.occupancy_by_ward())
+
+    def test_same_answers_without_numpy(self):
+        with patch("bed_table.np", None):
+            plain = BedTable.from_beds(BEDS)
+            self.assertEqual(plain.occupancy_by_ward(), self.table.occupancy_by_ward())
+            self.assertEqual(plain.priority_mix(), self.table.priority_mix())
+            self.assertEqual(sorted(plain.select(bed_type="icu", occupied=False)), ["B3"])
+            self.assertEqual(plain.available("general", ward="a"), 1)
+
+if __name__ == "__main__":
+    unittest.main()
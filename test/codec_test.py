@@ -0,0 +1,37 @@
+import unittest
+from unittest.mock import patch
+import codec
+
+RECORDS = [{"id": "P1", "name": "Zoë", "age": 30, "isDeleted": False, "bedId": None,
+            "present_medication": ["paracetamol"], "billing": []}]
+
+class TestCodec(unittest.TestCase):
+    def codecs(self):
+        return [codec.get_codec("json"), codec.get_codec("auto")]
+
+    def test_round_trip(self):
+        for c in self.codecs():
+            for compact in (False, True):
+                self.assertEqual(c.loads(c.dumps(RECORDS, compact)), RECORDS, c.name)
+
+    def test_compact_is_one_line_and_smaller(self):
+        for c in self.codecs():
+            compact, pretty = c.dumps(RECORDS, True), c.dumps(RECORDS, False)
+            self.assertNotIn(b"\n", compact)
+            self.assertLess(len(compact), len(pretty))
+
+    def test_codecs_read_each_other(self):
+        stdlib, fast = self.codecs()
+        self.assertEqual(stdlib.loads(fast.dumps(RECORDS)), RECORDS)
+        self.assertEqual(fast.loads(stdlib.dumps(RECORDS)), RECORDS)
+
+    def test_missing_library_falls_back_to_stdlib(self):
+        with patch.dict("sys.modules", {"orjson": None, "ujson": None}):
+            self.assertEqual(codec.get_codec("orjson").name, "json")
+            self.assertEqual(codec.get_codec("auto").name, "json")
+
+    def test_dumps_line_is_compact_text(self):
+        self.assertEqual(codec.dumps_line({"a": 1, "b": "x"}), '{"a":1,"b":"x"}')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from entities import Bed, Doctor, Patient
+
+class TestEntities(unittest.TestCase):
+    def test_patient_round_trip(self):
+        patient = Patient("P1", "Ann", "30", "female", "red")
+        record = patient.to_dict()
+        self.assertEqual(record["age"], 30)
+        self.assertEqual((record["gender"], record["priority"], record["isDeleted"]), ("Female", "Red", False))
+        self.assertEqual(Patient.from_dict(record).to_dict(), record)
+
+    def test_doctor_and_bed_round_trip(self):
+        doctor = Doctor("D1", "Rao", 45, "male", "ortho").to_dict()
+        self.assertEqual(Doctor.from_dict(doctor).to_dict(), doctor)
+        bed = Bed("B1", bed_type="ICU", ward="C")
+        bed.assign("P1", "Red")
+        record = bed.to_dict()
+        self.assertEqual((record["patientId"], record["status"]), ("P1", "Occupied"))
+        self.assertEqual(Bed.from_dict(record).to_dict(), record)
+
+    def test_unknown_keys_are_kept(self):
+        record = Patient("P1", "Ann", 30, "female").to_dict()
+        record.update(billing=["X-Ray"], dischargedAt="2024-05-02T10:00:00")
+        patient = Patient.from_dict(record)
+        self.assertEqual(patient.extra, {"billing": ["X-Ray"], "dischargedAt": "2024-05-02T10:00:00"})
+        self.assertEqual(patient.to_dict(), record)
+        self.assertIsNone(Patient.from_dict(Patient("P2", "Bob", 41, "male").to_dict()).extra)
+
+    def test_missing_keys_load_as_defaults(self):
+        patient = Patient.from_dict({"id": "P1", "name": "Ann", "age": 30, "gender": "Female"})
+        self.assertFalse(patient.is_deleted)
+        self.assertEqual((patient.present_medication, patient.past_medication), ([], []))
+        self.assertIsNone(patient.bed_id)
+
+    def test_slots_only(self):
+        with self.assertRaises(AttributeError):
+            Patient("P1", "Ann", 30, "female").nickname = "A"
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+from helpers import TempDirTestCase
+from events import EventLog, make_event
+from repository import Repository
+from storage import EventStorage, VersionConflict
+
+class TestEvents(unittest.TestCase):
+    def test_make_event_checks_fields(self):
+        self.assertEqual(make_event("priority_changed", patientId="P1", priority="Red"),
+                         {"type": "priority_changed", "patientId": "P1", "priority": "Red"})
+        with self.assertRaises(ValueError):
+            make_event("priority_changed", patientId="P1")
+        with self.assertRaises(ValueError):
+            make_event("patient_teleported", patientId="P1")
+
+class TestEventStorage(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.files = self.data_files(patients=[{"id": "P1", "name": "Ann", "priority": "Green", "isDeleted": False}])
+        self.log_path = os.path.join(self.tmp.name, "events.jsonl")
+        self.repo = self.open_repo()
+
+    def open_repo(self, snapshot_every=100):
+        storage = EventStorage(EventLog(self.log_path), snapshot_every=snapshot_every)
+        return Repository(*self.files, storage=storage)
+
+    def change_priority(self, repo, pid, priority):
+        with repo.batch():
+            repo.record("priority_changed", patientId=pid, priority=priority)
+            repo.patients.update(pid, priority=priority)
+
+    def test_commit_appends_one_event_line(self):
+        with open(self.files[0], "rb") as fh:
+            snapshot = fh.read()
+        self.change_priority(self.repo, "P1", "Red")
+        with open(self.files[0], "rb") as fh:
+            self.assertEqual(fh.read(), snapshot)  # the snapshot is not rewritten
+        with open(self.log_path) as fh:
+            lines = [json.loads(line) for line in fh]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]["events"], [{"type": "priority_changed", "patientId": "P1", "priority": "Red"}])
+        self.assertEqual(list(lines[0]["changes"]), [self.files[0]])
+
+    def test_state_is_snapshot_plus_tail(self):
+        self.change_priority(self.repo, "P1", "Red")
+        with self.repo.batch():
+            self.repo.patients.add({"id": "P2", "name": "Bob", "isDeleted": False})
+        other = self.open_repo()
+        self.assertEqual([p["id"] for p in other.patients.all()], ["P1", "P2"])
+        self.assertEqual(other.patients.get("P1")["priority"], "Red")
+
+    def test_other_process_changes_are_applied_incrementally(self):
+        other = self.open_repo()
+        self.assertEqual(other.patients.get("P1")["priority"], "Green")
+        self.change_priority(self.repo, "P1", "Yellow")
+        with patch.object(other.storage, "load", wraps=other.storage.load) as load:
+            self.assertEqual(other.patients.get("P1")["priority"], "Yellow")
+        load.assert_not_called()
+
+    def test_stale_writer_conflicts(self):
+        other = self.open_repo()
+        stale = dict(other.patients.get("P1"), name="Ann B")
+        version = other.patients.version
+        self.change_priority(self.repo, "P1", "Red")
+        with self.assertRaises(VersionConflict):
+            other.storage.commit([(self.files[0], {"P1": stale}, ["P1"], version)])
+
+    def test_checkpoint_rewrites_snapshots_and_rotates_log(self):
+        repo = self.open_repo(snapshot_every=3)
+        for priority in ("Red", "Yellow", "Green", "Red"):
+            self.change_priority(repo, "P1", priority)
+        with open(self.files[0]) as fh:
+            self.assertEqual(json.load(fh)[0]["priority"], "Green")  # state as of the third event
+        self.assertEqual(len(repo.storage.log.segments()), 1)
+        self.assertEqual([e["seq"] for e in repo.storage.history()], [1, 2, 3, 4])
+        self.assertEqual(self.open_repo().patients.get("P1")["priority"], "Red")
+
+    def test_torn_last_line_is_ignored_and_cut_off(self):
+        self.change_priority(self.repo, "P1", "Red")
+        with open(self.log_path, "ab") as fh:
+            fh.write(b'{"seq": 2, "changes": {"pat')
+        other = self.open_repo()
+        self.assertEqual(other.patients.get("P1")["priority"], "Red")
+        self.change_priority(other, "P1", "Yellow")
+        self.assertEqual([e["seq"] for e in other.storage.history()], [1, 2])
@@ -0,0 +1,57 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+import config
+import utils
+from helpers import TempDirTestCase
+from fileio import atomic_write_json, rotated_backup_filename, take_backup, write_with_backup
+
+class TestAtomicWrites(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.file = os.path.join(self.tmp.name, "patients.json")
+        atomic_write_json(self.file, [{"id": "P1"}])
+
+    def read(self, file):
+        with open(file) as fh:
+            return json.load(fh)
+
+    def test_interrupted_write_keeps_the_old_file(self):
+        with patch("fileio.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                atomic_write_json(self.file, [{"id": "P1"}, {"id": "P2"}])
+        self.assertEqual(self.read(self.file), [{"id": "P1"}])
+        self.assertEqual(os.listdir(self.tmp.name), ["patients.json"])  # temp file removed
+
+    def test_write_json_raises_after_logging(self):
+        with patch("fileio.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                utils.write_json(self.file, [{"id": "P2"}])
+        self.log.flush()
+        with open(self.log.path) as fh:
+            entry = json.loads(fh.readline())
+        self.assertEqual((entry["action"], entry["status"]), ("write", "error: disk full"))
+        self.assertEqual(self.read(self.file), [{"id": "P1"}])
+
+    def test_backups_rotate(self):
+        with patch.object(config, "BACKUP_KEEP", 2), patch.object(config, "BACKUP_EVERY_N_WRITES", 1):
+            for n in range(1, 4):
+                self.assertIsNotNone(write_with_backup(self.file, [{"id": f"P{n}"}]))
+        self.assertEqual(self.read(rotated_backup_filename(self.file, 0)), [{"id": "P3"}])
+        self.assertEqual(self.read(rotated_backup_filename(self.file, 1)), [{"id": "P2"}])
+        self.assertFalse(os.path.exists(rotated_backup_filename(self.file, 2)))
+
+    def test_read_falls_back_to_the_rotated_backup(self):
+        with patch.object(config, "BACKUP_KEEP", 2):
+            take_backup(self.file)                         # becomes patients_backup.1.json
+            atomic_write_json(self.file, [{"id": "P1"}, {"id": "P2"}])
+            take_backup(self.file)
+        for broken in (self.file, rotated_backup_filename(self.file, 0)):
+            with open(broken, "w") as fh:
+                fh.write('[{"id": "P1"')                    # torn
+        with patch.object(config, "BACKUP_KEEP", 2):
+            self.assertEqual(utils.read_json(self.file), [{"id": "P1"}])
+
+if __name__ == "__main__":
+    unittest.main()
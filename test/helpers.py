@@ -0,0 +1,43 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import utils
+from logstore import AuditLog
+
+NAMES = ("patients.json", "doctors.json", "beds.json")
+
+class _TempDir:
+    # Every test gets its own directory (self.tmp) with the audit log written inside
+    # it instead of the real logs.jsonl. With chdir = True the test runs in that
+    # directory, for code that uses the default file names (HospitalManager).
+    chdir = False
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        if self.chdir:
+            self.addCleanup(os.chdir, os.getcwd())
+            os.chdir(self.tmp.name)
+        self.log = AuditLog(os.path.join(self.tmp.name, "logs.jsonl"))
+        # cleanups run last-in first-out: stop patching, flush while the directory exists
+        self.addCleanup(self.log.flush)
+        log = patch.object(utils, "audit_log", self.log)
+        log.start()
+        self.addCleanup(log.stop)
+
+    def data_files(self, patients=(), doctors=(), beds=(), directory=None):
+        # writes patients.json, doctors.json and beds.json and returns their paths
+        files = [os.path.join(directory or self.tmp.name, name) for name in NAMES]
+        for file, records in zip(files, (patients, doctors, beds)):
+            with open(file, "w") as fh:
+                json.dump(list(records), fh)
+        return files
+
+class TempDirTestCase(_TempDir, unittest.TestCase):
+    pass
+
+class AsyncTempDirTestCase(_TempDir, unittest.IsolatedAsyncioTestCase):
+    pass
@@ -0,0 +1,52 @@
+import json
+import os
+import unittest
+from helpers import TempDirTestCase
+from importer import read_rows, missing_fields, RowError
+
+class TestImporter(TempDirTestCase):
+    def path(self, name, text):
+        p = os.path.join(self.tmp.name, name)
+        with open(p, "w") as f:
+            f.write(text)
+        return p
+
+    def test_csv_rows(self):
+        p = self.path("patients.csv", "name,age,gender\nAnn, 30 ,female\nBob,41,male\n")
+        rows = list(read_rows(p))
+        self.assertEqual(rows[0], {"name": "Ann", "age": "30", "gender": "female"})
+        self.assertEqual(len(rows), 2)
+
+    def test_jsonl_rows(self):
+        p = self.path("beds.jsonl", json.dumps({"ward": "A"}) + "\n\n" + json.dumps({"ward": "B"}) + "\n")
+        self.assertEqual([r["ward"] for r in read_rows(p)], ["A", "B"])
+
+    def test_bad_jsonl_line_becomes_a_row_error(self):
+        p = self.path("beds.jsonl", '{"ward": "A"}\n{bad\n[1, 2]\n{"ward": "B"}\n')
+        rows = list(read_rows(p))
+        self.assertEqual(len(rows), 4)
+        self.assertIsInstance(rows[1], RowError)
+        self.assertIsInstance(rows[2], RowError)
+        self.assertEqual(rows[3], {"ward": "B"})
+
+    def test_iterable_passes_through(self):
+        self.assertEqual(list(read_rows([{"ward": "A"}])), [{"ward": "A"}])
+
+    def test_non_object_rows_become_row_errors(self):
+        p = self.path("beds.json", '[{"ward": "A"}, "B", null, {"ward": "C"}]')
+        for rows in (list(read_rows(p)), list(read_rows([{"ward": "A"}, "B", None, {"ward": "C"}]))):
+            self.assertEqual([r["ward"] for r in rows if not isinstance(r, RowError)], ["A", "C"])
+            self.assertEqual(sum(isinstance(r, RowError) for r in rows), 2)
+        with self.assertRaises(ValueError):
+            list(read_rows(self.path("beds2.json", '{"ward": "A"}')))
+
+    def test_unsupported_extension(self):
+        p = self.path("beds.txt", "")
+        with self.assertRaises(ValueError):
+            list(read_rows(p))
+
+    def test_missing_fields(self):
+        self.assertEqual(missing_fields({"name": "", "age": 3}, ("name", "age", "gender")), ["name", "gender"])
+
+if __name__ == "__main__":
+    unittest.main()
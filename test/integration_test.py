@@ -1,19 +1,17 @@
-import sys
-import os
 import unittest
-import json
-from unittest.mock import patch  # Import mock explicitly
+from helpers import TempDirTestCase
 from utils import read_json
+from bed_allocator import normalize_status, OCCUPIED
 from hospital_management import HospitalManager
 
-class TestIntegration(unittest.TestCase):
+class TestIntegration(TempDirTestCase):
+    chdir = True
 
     def setUp(self):
+        # Clean test environment: empty data files in a directory of its own
+        super().setUp()
+        self.data_files()
         self.manager = HospitalManager()
-        # Clean the test environment
-        for f in ["patients.json", "doctors.json", "beds.json"]:
-            with open(f, "w") as file:
-                json.dump([], file)
 
     def test_add_patient_and_assign_bed(self):
         self.manager.add_patient("John", 35, "male", "yellow")
@@ -29,7 +27,7 @@ class TestIntegration(unittest.TestCase):
         # Re-read the data
         updated_beds = read_json("beds.json")
         self.assertEqual(updated_beds[0]["patientId"], pid)
-        self.assertEqual(updated_beds[0]["status"], "occupied")
+        self.assertEqual(normalize_status(updated_beds[0]["status"]), OCCUPIED)
 
     def test_add_doctor_and_assign_to_patient(self):
         self.manager.add_patient("Jane", 28, "female", "red")
@@ -82,10 +80,5 @@ class TestIntegration(unittest.TestCase):
         self.assertEqual(updated_patients[0]["priority"].lower(), "red")
         self.assertEqual(updated_beds[0]["priority"].lower(), "red")
 
-    def tearDown(self):
-        for f in ["patients.json", "doctors.json", "beds.json", "patients_backup.json", "beds_backup.json", "doctors_backup.json"]:
-            if os.path.exists(f):
-                os.remove(f)
-
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,178 @@
+import gzip
+import json
+import os
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from helpers import TempDirTestCase
+from logstore import AuditLog, AsyncAuditLog, LogPolicy, parse_sampling, read_logs, migrate_json_logs, rotate, segments, apply_retention, query_logs
+
+class TestAuditLog(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.log_file = os.path.join(self.tmp.name, "logs.jsonl")
+
+    def test_entries_are_buffered_until_batch_is_full(self):
+        log = AuditLog(self.log_file, batch_size=3)
+        log.append({"action": "read"})
+        log.append({"action": "read"})
+        self.assertFalse(os.path.exists(self.log_file))
+        log.append({"action": "write"})
+        self.assertEqual(len(list(read_logs(self.log_file))), 3)
+
+    def test_flush_appends_without_rewriting(self):
+        log = AuditLog(self.log_file, batch_size=10)
+        log.append({"action": "read"})
+        log.flush()
+        log.append({"action": "write"})
+        log.flush()
+        actions = [e["action"] for e in read_logs(self.log_file)]
+        self.assertEqual(actions, ["read", "write"])
+
+    def test_read_logs_skips_torn_line(self):
+        with open(self.log_file, "w") as f:
+            f.write('{"action": "read"}\n{"action": "wri')
+        self.assertEqual(list(read_logs(self.log_file)), [{"action": "read"}])
+
+    def test_migrate_json_logs(self):
+        legacy = os.path.join(self.tmp.name, "logs.json")
+        with open(legacy, "w") as f:
+            json.dump([{"action": "read"}, {"action": "write"}], f, indent=2)
+
+        self.assertEqual(migrate_json_logs(legacy, self.log_file), 2)
+        self.assertFalse(os.path.exists(legacy))
+        self.assertEqual(len(list(read_logs(self.log_file))), 2)
+        # second run finds nothing to migrate
+        self.assertEqual(migrate_json_logs(legacy, self.log_file), 0)
+
+class TestLogPolicy(unittest.TestCase):
+    def test_levels(self):
+        policy = LogPolicy("INFO", "")
+        self.assertEqual(policy.level_of("read", "read operation"), "DEBUG")
+        self.assertEqual(policy.level_of("write", "atomic write"), "INFO")
+        self.assertEqual(policy.level_of("read", "error: boom"), "ERROR")
+        self.assertEqual(policy.level_of("recover", "ok"), "WARNING")
+
+    def test_reads_are_sampled_writes_and_errors_kept(self):
+        draws = iter([0.5, 0.005] * 50)
+        policy = LogPolicy("INFO", "read=0.01", rng=lambda: next(draws))
+        kept = [policy.admit("read", "patients.json", "DEBUG") for _ in range(100)]
+        self.assertEqual(kept.count(True), 50)
+        self.assertTrue(policy.admit("write", "patients.json", "INFO"))
+        self.assertTrue(policy.admit("read", "beds.json", "ERROR"))
+
+    def test_level_threshold_and_summary(self):
+        policy = LogPolicy("WARNING", "")
+        for _ in range(3):
+            policy.admit("write", "beds.json", "INFO")
+        policy.admit("read", "beds.json", "DEBUG")
+        self.assertTrue(policy.admit("write", "beds.json", "ERROR"))
+        summary = policy.summary()
+        self.assertEqual(summary["counts"], {"write": {"beds.json": 3}, "read": {"beds.json": 1}})
+        self.assertIsNone(policy.summary())
+
+    def test_parse_sampling(self):
+        self.assertEqual(parse_sampling("read=0.01, write=2,bad,x=y"), {"read": 0.01, "write": 1.0})
+
+class TestAsyncAuditLog(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.log_file = os.path.join(self.tmp.name, "logs.jsonl")
+
+    def test_flush_waits_for_the_writer(self):
+        log = AsyncAuditLog(self.log_file, batch_size=50, linger=0.05)
+        for i in range(120):
+            log.append({"action": "read", "n": i})
+        log.flush()
+        self.assertEqual([e["n"] for e in read_logs(self.log_file)], list(range(120)))
+
+    def stall_writer(self, log):
+        # hold the writer inside its first write so the queue fills up behind it
+        release = threading.Event()
+        original = log._write_lines
+        log._write_lines = lambda lines: (release.wait(), original(lines))
+        return release
+
+    def test_drop_policy_counts_and_reports_dropped_entries(self):
+        log = AsyncAuditLog(self.log_file, batch_size=1, queue_size=2, policy="drop", linger=0)
+        release = self.stall_writer(log)
+        for i in range(10):
+            log.append({"action": "read", "n": i})
+        self.assertGreaterEqual(log.dropped, 7)
+        release.set()
+        log.append({"action": "write"})
+        log.flush()
+        actions = [e["action"] for e in read_logs(self.log_file)]
+        self.assertIn("log_dropped", actions)
+
+    def test_block_policy_keeps_everything(self):
+        log = AsyncAuditLog(self.log_file, batch_size=1, queue_size=2, policy="block", linger=0)
+        release = self.stall_writer(log)
+        threading.Timer(0.1, release.set).start()
+        for i in range(10):
+            log.append({"action": "read", "n": i})
+        log.flush()
+        self.assertEqual(log.dropped, 0)
+        self.assertEqual(len(list(read_logs(self.log_file))), 10)
+
+class TestLogRotation(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.log_file = os.path.join(self.tmp.name, "logs.jsonl")
+        self.archive = os.path.join(self.tmp.name, "log_archive")
+
+    def entry(self, when, action="read", file="patients.json"):
+        return {"timestamp": when.isoformat(timespec="seconds"), "action": action, "file": file, "status": "ok"}
+
+    def write_log(self, entries):
+        with open(self.log_file, "a") as f:
+            for e in entries:
+                f.write(json.dumps(e) + "\n")
+
+    def test_size_limit_rotates_into_gzip_segment(self):
+        log = AuditLog(self.log_file, batch_size=1)
+        with patch("config.LOG_MAX_BYTES", 200):
+            for _ in range(5):
+                log.append(self.entry(datetime.now()))
+        found = segments(self.archive, "logs")
+        self.assertEqual(len(found), 1)
+        with gzip.open(found[0][2], "rt") as f:
+            rotated = [json.loads(line) for line in f]
+        self.assertEqual(len(rotated) + len(list(read_logs(self.log_file))), 5)
+
+    def test_age_limit_rotates(self):
+        self.write_log([self.entry(datetime.now() - timedelta(hours=30))])
+        log = AuditLog(self.log_file, batch_size=1)
+        log.append(self.entry(datetime.now()))
+        self.assertEqual(len(segments(self.archive, "logs")), 1)
+        self.assertFalse(os.path.exists(self.log_file))
+
+    def test_retention_drops_old_and_excess_segments(self):
+        now = datetime.now()
+        for days in (200, 3, 2, 1):
+            self.write_log([self.entry(now - timedelta(days=days))])
+            with patch("logstore.datetime") as fake:
+                fake.now.return_value = now - timedelta(days=days) + timedelta(hours=1)
+                fake.fromisoformat = datetime.fromisoformat
+                fake.strptime = datetime.strptime
+                rotate(self.log_file)
+        self.assertEqual(len(segments(self.archive, "logs")), 3)  # the 200 day old one is gone
+        with patch("config.LOG_KEEP_SEGMENTS", 2):
+            apply_retention(self.archive, "logs")
+        self.assertEqual(len(segments(self.archive, "logs")), 2)
+
+    def test_query_across_segments(self):
+        day = datetime(2024, 5, 1, 8, 0, 0)
+        self.write_log([self.entry(day, "write"), self.entry(day + timedelta(hours=1), "read")])
+        rotate(self.log_file)
+        self.write_log([self.entry(day + timedelta(days=1), "write", "beds.json")])
+
+        writes = list(query_logs(action="write", path=self.log_file))
+        self.assertEqual([e["file"] for e in writes], ["patients.json", "beds.json"])
+        morning = list(query_logs(since="2024-05-01T08:30", until="2024-05-02", path=self.log_file))
+        self.assertEqual([e["action"] for e in morning], ["read"])
+        self.assertEqual(len(list(query_logs(file="beds", path=self.log_file))), 1)
+
+if __name__ == "__main__":
+    unittest.main()
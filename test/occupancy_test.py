@@ -0,0 +1,38 @@
+import unittest
+from occupancy import OccupancyCounter
+
+def bed(bed_id, ward, bed_type, status="Vacant", deleted=False):
+    return {"id": bed_id, "ward": ward, "bed_type": bed_type, "status": status, "isDeleted": deleted}
+
+class TestOccupancyCounter(unittest.TestCase):
+    def setUp(self):
+        self.counter = OccupancyCounter()
+        self.counter.reset({b["id"]: b for b in (
+            bed("B1", "A", "General", "occupied"), bed("B2", "A", "general", "Occupied"),
+            bed("B3", "B", "ICU"), bed("B4", "B", "Special", "vacant", deleted=True),
+        )})
+
+    def test_status_case_is_normalised(self):
+        self.assertEqual(self.counter.summary("A")["A"]["GENERAL"], {"total": 2, "occupied": 2, "vacant": 0})
+        self.assertEqual(self.counter.summary("B")["B"]["SPECIAL"]["total"], 0)
+
+    def test_counts_follow_updates(self):
+        self.counter.update(bed("B1", "A", "General", "Vacant"))
+        self.counter.update(bed("B3", "B", "ICU", "Occupied"))
+        summary = self.counter.summary()
+        self.assertEqual(summary["A"]["GENERAL"]["occupied"], 1)
+        self.assertEqual(summary["B"]["ICU"]["occupied"], 1)
+
+    def test_ward_case_is_normalised(self):
+        self.counter.update(bed("B5", " a", "General"))
+        self.counter.update(bed("B6", "b", "ICU", "Occupied"))
+        self.assertEqual(list(self.counter.summary()), ["A", "B"])
+        self.assertEqual(self.counter.summary("a")["A"]["GENERAL"]["total"], 3)
+        self.assertEqual(self.counter.summary(" b ")["B"]["ICU"], {"total": 2, "occupied": 1, "vacant": 1})
+
+    def test_ward_disappears_with_its_last_bed(self):
+        self.counter.update(bed("B3", "B", "ICU", deleted=True))
+        self.assertEqual(list(self.counter.summary()), ["A"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import time
+from unittest.mock import patch
+from helpers import NAMES, TempDirTestCase
+import replication
+from archive import PatientArchive
+from events import EventLog
+from replication import Follower, ReplicationServer
+from repository import Repository
+from sequence import SequenceAllocator
+from storage import EventStorage, ReadOnlyStore, ReplicationGap
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+class TestReplication(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.primary_dir = os.path.join(self.tmp.name, "primary")
+        self.standby_dir = os.path.join(self.tmp.name, "standby")
+        os.makedirs(self.primary_dir)
+        os.makedirs(self.standby_dir)
+        self.files = self.data_files(patients=[{"id": "P1", "name": "Ann", "priority": "Green", "isDeleted": False}],
+                                     directory=self.primary_dir)
+        poll = patch("config.REPLICATION_POLL_SECONDS", 0.01)
+        poll.start()
+        self.addCleanup(poll.stop)
+
+        self.primary = Repository(*self.files, storage=self.storage(self.primary_dir, 4))
+        self.primary_archive = PatientArchive(os.path.join(self.primary_dir, "archive"))
+        self.primary_sequences = SequenceAllocator(os.path.join(self.primary_dir, "sequences.json"))
+        self.server = ReplicationServer(self.storage(self.primary_dir), "127.0.0.1:0", files=self.files,
+                                        archive=self.primary_archive, sequences=self.primary_sequences)
+        self.server.start()
+        self.followers = []
+
+    def tearDown(self):
+        for follower in self.followers:
+            follower.stop()
+        self.server.stop()
+
+    def storage(self, directory, snapshot_every=100):
+        return EventStorage(EventLog(os.path.join(directory, "events.jsonl")), snapshot_every=snapshot_every)
+
+    def follow(self):
+        follower = Follower(self.storage(self.standby_dir), f"127.0.0.1:{self.server.server_address[1]}",
+                            files={n: os.path.join(self.standby_dir, n) for n in NAMES},
+                            archive=PatientArchive(os.path.join(self.standby_dir, "archive")),
+                            sequences=SequenceAllocator(os.path.join(self.standby_dir, "sequences.json")))
+        follower.start()
+        self.followers.append(follower)
+        return follower
+
+    def standby(self):
+        return Repository(*[os.path.join(self.standby_dir, n) for n in NAMES],
+                          storage=self.storage(self.standby_dir), read_only=True)
+
+    def admit(self, pid):
+        with self.primary.batch():
+            self.primary.record("patient_added", patientId=pid)
+            self.primary.patients.add({"id": pid, "name": pid, "priority": "Red", "isDeleted": False})
+
+    def archive(self, *pids):
+        # as HospitalManager.archive_discharged: into the archive first, then out of patients.json
+        self.primary_archive.add([dict(self.primary.patients.get(pid), isDeleted=True) for pid in pids])
+        with self.primary.batch():
+            self.primary.record("patients_archived", patientIds=list(pids))
+            for pid in pids:
+                self.primary.patients.remove(pid)
+
+    def test_standby_follows_commits(self):
+        follower = self.follow()
+        wait_until(lambda: follower.last_contact is not None)
+        standby = self.standby()
+        self.assertEqual([p["id"] for p in standby.patients.all()], ["P1"])  # the initial copy
+        for n in range(2, 8):  # crosses a checkpoint on the primary
+            self.admit(f"P{n}")
+        wait_until(lambda: follower.storage.last_seq() == self.primary.storage.last_seq())
+        self.assertEqual(standby.patients.all(), self.primary.patients.all())
+
+    def test_reconnect_resumes_without_a_new_copy(self):
+        follower = self.follow()
+        self.admit("P2")
+        wait_until(lambda: follower.storage.last_seq() == self.primary.storage.last_seq())
+        follower.stop()
+        self.admit("P3")
+        self.admit("P4")
+        with patch.object(EventStorage, "install") as install:
+            follower = self.follow()
+            wait_until(lambda: follower.storage.last_seq() == self.primary.storage.last_seq())
+        install.assert_not_called()
+        self.assertEqual(follower.applied, 2)
+        self.assertEqual(len(self.standby().patients.all()), 4)
+
+    def test_archive_and_id_counters_reach_the_standby(self):
+        self.admit("P2")
+        self.archive("P1")  # before the follower connects: part of the full copy
+        self.primary_sequences.reserve("P", 4, seed=lambda: 1)  # P2..P5
+        follower = self.follow()
+        self.admit("P5")
+        self.archive("P2")  # after: travels with its commit
+        wait_until(lambda: follower.storage.last_seq() == self.primary.storage.last_seq())
+        self.assertEqual([p["id"] for p in self.standby().patients.all()], ["P5"])
+        for pid in ("P1", "P2"):
+            self.assertEqual(follower.archive.get(pid), self.primary_archive.get(pid))
+        self.assertEqual(follower.sequences.state(), {"P": 5})  # a promoted standby goes on from P6
+
+    def test_commit_after_a_gap_is_refused(self):
+        follower = Follower(self.storage(self.standby_dir), "127.0.0.1:1",
+                            files={n: os.path.join(self.standby_dir, n) for n in NAMES},
+                            archive=PatientArchive(os.path.join(self.standby_dir, "archive")),
+                            sequences=SequenceAllocator(os.path.join(self.standby_dir, "sequences.json")))
+        with self.assertRaises(ReplicationGap):
+            follower.apply({"seq": 3, "events": [], "changes": {}})
+        self.assertEqual(follower.storage.last_seq(), 0)
+
+    def test_lost_commit_brings_a_full_copy(self):
+        follower = self.follow()
+        self.admit("P2")
+        wait_until(lambda: follower.storage.last_seq() == self.primary.storage.last_seq())
+        lost = self.primary.storage.last_seq() + 1
+        send, dropped = replication._send, []
+
+        def lossy(sock, message):
+            if message.get("seq") == lost and not dropped:
+                dropped.append(message)
+                return
+            send(sock, message)
+
+        with patch.object(replication, "_send", lossy), \
+                patch.object(EventStorage, "install", autospec=True, side_effect=EventStorage.install) as install:
+            for n in range(3, 6):
+                self.admit(f"P{n}")
+            wait_until(lambda: follower.storage.last_seq() == self.primary.storage.last_seq())
+        self.assertEqual(len(dropped), 1)
+        install.assert_called_once()
+        self.assertEqual(self.standby().patients.all(), self.primary.patients.all())
+
+    def test_standby_refuses_changes(self):
+        standby = self.standby()
+        with self.assertRaises(ReadOnlyStore):
+            with standby.batch():
+                standby.patients.add({"id": "P9"})
@@ -0,0 +1,88 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+from helpers import TempDirTestCase
+from repository import Repository
+from storage import JsonStorage, VersionConflict
+from journal import Journal
+
+class TestRepository(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.files = self.data_files(patients=[{"id": "P1", "name": "Ann", "isDeleted": False}])
+        self.journal = Journal(os.path.join(self.tmp.name, "journal"))
+        self.repo = Repository(*self.files, storage=JsonStorage(self.journal))
+
+    def test_collection_is_parsed_once(self):
+        with patch.object(self.repo.storage, "load", wraps=self.repo.storage.load) as mock_read:
+            self.repo.patients.get("P1")
+            self.repo.patients.get("P1")
+            self.repo.patients.all()
+        self.assertEqual(mock_read.call_count, 1)
+
+    def test_external_change_is_picked_up(self):
+        self.assertIsNotNone(self.repo.patients.get("P1"))
+        with open(self.files[0], "w") as fh:
+            json.dump([{"id": "P1"}, {"id": "P2", "name": "Bob"}], fh, indent=4)
+        self.assertEqual(self.repo.patients.get("P2")["name"], "Bob")
+
+    def test_batch_writes_once(self):
+        with patch.object(self.repo.storage, "commit", return_value=[1]) as mock_write:
+            with self.repo.batch():
+                self.repo.patients.add({"id": "P2"})
+                self.repo.commit()
+                self.repo.patients.add({"id": "P3"})
+                self.repo.commit()
+                mock_write.assert_not_called()
+        mock_write.assert_called_once()
+
+    def test_failed_batch_discards_changes(self):
+        with self.assertRaises(RuntimeError):
+            with self.repo.batch():
+                self.repo.patients.add({"id": "P2"})
+                raise RuntimeError("boom")
+        self.assertIsNone(self.repo.patients.get("P2"))
+
+    def test_secondary_index_follows_updates(self):
+        beds = self.repo.beds
+        beds.add({"id": "B1", "ward": "A", "status": "Vacant", "patientId": None})
+        beds.add({"id": "B2", "ward": "A", "status": "occupied", "patientId": "P1"})
+        self.assertEqual([b["id"] for b in beds.find("ward", "A")], ["B1", "B2"])
+        self.assertEqual([b["id"] for b in beds.find("patientId", "P1")], ["B2"])
+
+        beds.update("B2", patientId=None, status="Vacant")
+        self.assertEqual(beds.find("patientId", "P1"), [])
+        self.assertEqual([b["id"] for b in beds.find("status", "vacant")], ["B1", "B2"])
+
+    def test_removed_record_leaves_file_and_indexes(self):
+        self.repo.patients.update("P1", doctorId="D1")
+        with self.repo.batch():
+            self.repo.patients.add({"id": "P2", "doctorId": "D1"})
+            self.assertEqual(self.repo.patients.remove("P1")["id"], "P1")
+        self.assertEqual([p["id"] for p in self.repo.patients.find("doctorId", "D1")], ["P2"])
+        with open(self.files[0]) as fh:
+            self.assertEqual([p["id"] for p in json.load(fh)], ["P2"])
+
+    def test_indexes_rebuilt_on_reload(self):
+        with open(self.files[0], "w") as fh:
+            json.dump([{"id": "P1", "doctorId": "D1"}, {"id": "P2", "doctorId": "D1"}], fh)
+        self.assertEqual([p["id"] for p in self.repo.patients.find("doctorId", "D1")], ["P1", "P2"])
+
+    def test_conflicting_writer_is_rejected(self):
+        other = Repository(*self.files, storage=JsonStorage(self.journal))
+        with self.assertRaises(VersionConflict):
+            with self.repo.batch():
+                self.repo.patients.get("P1")
+                # another process saves between our read and our write
+                other.patients.update("P1", name="Other")
+                other.commit()
+                self.repo.patients.update("P1", name="Mine")
+        # our change was dropped and the fresh state reloaded
+        self.assertEqual(self.repo.patients.get("P1")["name"], "Other")
+        with self.repo.batch():
+            self.repo.patients.update("P1", name="Mine")
+        self.assertEqual(other.patients.get("P1")["name"], "Mine")
+
+if __name__ == "__main__":
+    unittest.main()
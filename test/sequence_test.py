@@ -0,0 +1,45 @@
+import os
+import unittest
+from multiprocessing import Pool
+from helpers import TempDirTestCase
+from sequence import SequenceAllocator
+
+def allocate_many(path):
+    allocator = SequenceAllocator(path)
+    return [allocator.next_id("P") for _ in range(25)]
+
+class TestSequenceAllocator(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp.name, "sequences.json")
+        self.ids = SequenceAllocator(self.path)
+
+    def test_ids_are_sequential_per_prefix(self):
+        self.assertEqual(self.ids.next_id("P"), "P1")
+        self.assertEqual(self.ids.next_id("P"), "P2")
+        self.assertEqual(self.ids.next_id("D"), "D1")
+
+    def test_seed_only_used_for_new_prefix(self):
+        self.assertEqual(self.ids.next_id("B", seed=lambda: 7), "B8")
+        self.assertEqual(self.ids.next_id("B", seed=lambda: 100), "B9")
+
+    def test_reserve_block(self):
+        self.ids.next_id("P")
+        self.assertEqual(self.ids.reserve("P", 3), ["P2", "P3", "P4"])
+        self.assertEqual(self.ids.next_id("P"), "P5")
+
+    def test_advance_never_lowers_a_counter(self):
+        self.ids.reserve("P", 5)
+        self.ids.advance({"P": 3, "D": 2})
+        self.assertEqual(self.ids.state(), {"P": 5, "D": 2})
+        self.assertEqual(self.ids.next_id("D"), "D3")
+
+    def test_concurrent_processes_get_unique_ids(self):
+        with Pool(4) as pool:
+            results = pool.map(allocate_many, [self.path] * 4)
+        ids = [i for chunk in results for i in chunk]
+        self.assertEqual(len(ids), 100)
+        self.assertEqual(len(set(ids)), 100)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import threading
+import unittest
+from unittest.mock import patch
+from helpers import AsyncTempDirTestCase
+from hospital_management import HospitalManager
+from service import HospitalService
+from storage import VersionConflict
+
+class TestHospitalService(AsyncTempDirTestCase):
+    chdir = True  # the service's manager works on patients.json etc. in the working directory
+
+    def setUp(self):
+        super().setUp()
+        self.data_files()
+
+    async def asyncSetUp(self):
+        self.service = HospitalService(HospitalManager(), queue_size=2)
+        await self.service.start("127.0.0.1:0")
+
+    async def asyncTearDown(self):
+        await self.service.stop()
+
+    async def send(self, raw):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.service.port)
+        try:
+            writer.write(raw)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            return status, json.loads(await reader.readexactly(length))
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        return await self.send(f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+                               f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+
+    def admit(self, name):
+        return self.service.dispatch("POST", "/patients", json.dumps(
+            {"name": name, "age": 30, "gender": "female", "priority": "red"}).encode())
+
+    async def test_admit_assign_and_discharge(self):
+        status, bed = await self.request("POST", "/beds", {"bed_type": "icu", "ward": "a"})
+        self.assertEqual(status, 201)
+        status, patient = await self.request("POST", "/patients", {"name": "Ann", "age": 30, "priority": "red"})
+        self.assertEqual((status, patient["message"]), (201, f"Patient added: {patient['id']}"))
+        pid = patient["id"]
+        status, assigned = await self.request("POST", f"/patients/{pid}/bed", {})
+        self.assertEqual((status, assigned["bedId"]), (200, bed["id"]))
+        self.assertIn(f"Assigned Bed {bed['id']}", assigned["message"])
+        status, occupancy = await self.request("GET", "/beds/occupancy")
+        self.assertEqual(occupancy["A"]["ICU"]["occupied"], 1)
+        status, discharged = await self.request("POST", f"/patients/{pid}/discharge")
+        self.assertEqual((status, discharged["total"]), (200, 0))
+        self.assertIn("discharged and bed freed", discharged["message"])
+        status, patient = await self.request("GET", f"/patients/{pid}")
+        self.assertTrue(patient["isDeleted"])
+        status, _ = await self.request("POST", f"/patients/{pid}/discharge")
+        self.assertEqual(status, 404)
+
+    async def test_group_that_cannot_be_saved_runs_again_one_by_one(self):
+        storage = self.service.h.repo.storage
+        commit, calls = storage.commit, []
+
+        def conflict_once(changes, events=None):
+            calls.append(changes)
+            if len(calls) == 1:
+                raise VersionConflict("patients.json")
+            return commit(changes, events=events)
+
+        with patch.object(storage, "commit", side_effect=conflict_once):
+            results = await asyncio.gather(self.admit("Ann"), self.admit("Bob"))
+        self.assertEqual([status for status, _ in results], [201, 201])
+        self.assertEqual((self.service.groups, self.service.split_groups), (1, 1))
+        self.assertEqual(len(calls), 3)  # the group, then each admission alone
+        names = sorted(p["name"] for p in self.service.h.repo.patients.all())
+        self.assertEqual(names, ["Ann", "Bob"])
+
+    async def test_full_queue_answers_503(self):
+        gate = threading.Event()
+        self.service._executor.submit(gate.wait)  # holds the writer thread
+        try:
+            first = asyncio.ensure_future(self.admit("Ann"))
+            while self.service.idle.is_set():  # until the writer has taken it
+                await asyncio.sleep(0.01)
+            waiting = [asyncio.ensure_future(self.admit(n)) for n in ("Bob", "Cy")]
+            while not self.service.queue.full():
+                await asyncio.sleep(0.01)
+            status, payload = await self.admit("Dee")
+            self.assertEqual(status, 503)
+            self.assertIn("too many writes", payload["error"])
+        finally:
+            gate.set()
+        self.assertEqual([r[0] for r in await asyncio.gather(first, *waiting)], [201, 201, 201])
+
+    async def test_read_only_standby_refuses_writes(self):
+        self.service.h.repo.read_only = True
+        status, payload = await self.request("POST", "/patients", {"name": "Ann", "age": 30})
+        self.assertEqual(status, 403)
+        self.assertIn("read-only standby", payload["error"])
+        status, payload = await self.request("GET", "/patients")
+        self.assertEqual((status, payload), (200, []))
+
+    async def test_malformed_requests_answer_400(self):
+        status, payload = await self.send(b"NONSENSE\r\n\r\n")
+        self.assertEqual((status, payload["error"]), (400, "malformed request line"))
+        status, payload = await self.send(b"POST /patients HTTP/1.1\r\nContent-Length: 5\r\n\r\n{bad}")
+        self.assertEqual(status, 400)
+        self.assertTrue(payload["error"].startswith("invalid JSON"))
+        status, payload = await self.request("POST", "/patients", {"name": "Ann"})
+        self.assertEqual((status, payload["error"]), (400, "missing field: age"))
+        status, payload = await self.request("POST", "/patients", [1, 2])
+        self.assertEqual((status, payload["error"]), (400, "the body must be a JSON object"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import os
+from unittest.mock import patch
+from helpers import TempDirTestCase
+from repository import Repository
+from sharding import ShardedStorage, ward_key
+from journal import Journal
+from storage import JsonStorage, VersionConflict
+
+BEDS = [{"id": "B1", "ward": "A", "bed_type": "ICU", "status": "Vacant", "patientId": None, "isDeleted": False},
+        {"id": "B2", "ward": "B", "bed_type": "GENERAL", "status": "Vacant", "patientId": None, "isDeleted": False}]
+
+class TestShardedStorage(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.files = self.data_files(patients=[{"id": "P1", "name": "Ann", "bedId": None, "isDeleted": False}], beds=BEDS)
+        self.repo = self.open_repo()
+        with self.repo.batch():  # move the records into their ward files
+            for bed in self.repo.beds.all():
+                self.repo.beds.mark_dirty(bed["id"])
+
+    def open_repo(self):
+        storage = ShardedStorage(JsonStorage(Journal(os.path.join(self.tmp.name, "journal"))), bed_file=self.files[2], patient_file=self.files[0])
+        return Repository(*self.files, storage=storage)
+
+    def read(self, name):
+        with open(os.path.join(self.tmp.name, name)) as fh:
+            return [r["id"] for r in json.load(fh)]
+
+    def assign(self, repo, patient_id, bed_id):
+        with repo.batch():
+            repo.patients.update(patient_id, bedId=bed_id)
+            repo.beds.update(bed_id, patientId=patient_id, status="Occupied")
+
+    def test_ward_key(self):
+        self.assertEqual(ward_key(" a "), "A")
+        self.assertEqual(ward_key("north/2"), "NORTH-2")
+
+    def test_records_live_in_their_ward_file(self):
+        self.assertEqual(self.read("beds.A.json"), ["B1"])
+        self.assertEqual(self.read("beds.B.json"), ["B2"])
+        self.assertEqual(self.read("beds.json"), [])
+        self.assertEqual(self.read("patients.json"), ["P1"])  # no bed yet
+        self.assign(self.repo, "P1", "B2")
+        self.assertEqual(self.read("patients.B.json"), ["P1"])
+        self.assertEqual(self.read("patients.json"), [])
+
+    def test_patient_follows_bed_to_another_ward(self):
+        self.assign(self.repo, "P1", "B2")
+        with self.repo.batch():
+            self.repo.beds.update("B2", patientId=None, status="Vacant")
+        self.assign(self.repo, "P1", "B1")
+        self.assertEqual(self.read("patients.A.json"), ["P1"])
+        self.assertEqual(self.read("patients.B.json"), [])
+        self.assertEqual([p["id"] for p in self.open_repo().patients.all()], ["P1"])
+
+    def test_writers_in_different_wards_do_not_conflict(self):
+        storage = self.repo.storage
+        beds = {b["id"]: dict(b) for b in self.repo.beds.all()}
+        loaded = storage.version(self.files[2])
+        storage.save(self.files[2], dict(beds, B1=dict(beds["B1"], status="Cleaning")), ["B1"], loaded)
+        storage.save(self.files[2], dict(beds, B2=dict(beds["B2"], status="Cleaning")), ["B2"], loaded)
+        with self.assertRaises(VersionConflict):  # same ward, stale version
+            storage.save(self.files[2], beds, ["B1"], loaded)
+
+    def test_only_changed_shards_are_reread(self):
+        other = self.open_repo()
+        other.beds.all()
+        with open(os.path.join(self.tmp.name, "beds.B.json"), "rb") as fh:
+            ward_b = fh.read()
+        with self.repo.batch():
+            self.repo.beds.update("B1", status="Cleaning")
+        with patch.object(other.storage.inner, "load", wraps=other.storage.inner.load) as load:
+            with other.batch():  # loaded before the change above, but that was in another ward
+                other.beds.update("B2", status="Cleaning")
+        self.assertEqual([c.args[0] for c in load.call_args_list], [self.files[2][:-5] + ".A.json"])
+        self.assertEqual(other.beds.get("B1")["status"], "Cleaning")
+        self.assertEqual(self.repo.beds.get("B2")["status"], "Cleaning")
+        with open(os.path.join(self.tmp.name, "beds.B.json"), "rb") as fh:
+            self.assertNotEqual(fh.read(), ward_b)
@@ -0,0 +1,126 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+import utils
+from helpers import TempDirTestCase
+from journal import Journal
+from repository import Repository
+from snapshot import SnapshotReader, snapshot_filename, update_snapshot, write_snapshot
+from storage import JsonStorage
+
+BEDS = [{"id": f"B{i}", "ward": "A", "bed_type": "ICU", "status": "Vacant", "isDeleted": False} for i in range(1, 6)]
+
+class TestSnapshot(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp.name, "beds.json.snap")
+
+    def test_lookup_by_id(self):
+        write_snapshot(self.path, BEDS, (3, 123, 456))
+        reader = SnapshotReader(self.path)
+        self.assertEqual(reader.stamp, (3, 123, 456))
+        self.assertEqual(reader.get("B4"), BEDS[3])
+        self.assertIsNone(reader.get("B9"))
+        self.assertEqual(list(reader.records()), BEDS)
+        reader.close()
+
+    def test_only_requested_records_are_decoded(self):
+        write_snapshot(self.path, BEDS, (1, 0, 0))
+        with patch("snapshot.codec.loads", wraps=json.loads) as loads:
+            reader = SnapshotReader(self.path)
+            reader.get("B2")
+        self.assertEqual(loads.call_count, 2)  # the id list, then B2
+        reader.close()
+
+    def test_update_appends_and_drops_records(self):
+        write_snapshot(self.path, BEDS, (1, 0, 0))
+        before = SnapshotReader(self.path)  # as another process that mapped it earlier
+        changed = [dict(BEDS[1], status="Occupied"), {"id": "B6", "ward": "B"}]
+        self.assertTrue(update_snapshot(self.path, changed, ["B4"], (2, 5, 6), (1, 0, 0)))
+        reader = SnapshotReader(self.path)
+        self.assertEqual(reader.stamp, (2, 5, 6))
+        self.assertEqual(reader.ids(), ["B1", "B2", "B3", "B5", "B6"])
+        self.assertEqual(reader.get("B2")["status"], "Occupied")
+        self.assertEqual(reader.get("B6"), {"id": "B6", "ward": "B"})
+        self.assertIsNone(reader.get("B4"))
+        self.assertEqual(before.get("B2"), BEDS[1])  # the bytes it indexed are untouched
+        before.close()
+        reader.close()
+
+    def test_update_needs_the_snapshot_it_follows(self):
+        write_snapshot(self.path, BEDS, (1, 0, 0))
+        self.assertFalse(update_snapshot(self.path, BEDS[:1], [], (3, 0, 0), (2, 0, 0)))
+        self.assertFalse(update_snapshot(self.path + ".missing", BEDS[:1], [], (2, 0, 0), (1, 0, 0)))
+        self.assertEqual(SnapshotReader(self.path).stamp, (1, 0, 0))
+
+    def test_not_a_snapshot(self):
+        with open(self.path, "wb") as f:
+            f.write(b"x" * 64)
+        with self.assertRaises(ValueError):
+            SnapshotReader(self.path)
+
+class TestStorageSnapshots(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.files = self.data_files(beds=BEDS)
+        self.storage = JsonStorage(Journal(os.path.join(self.tmp.name, "journal")), snapshots=True)
+
+    def test_full_read_builds_the_snapshot(self):
+        beds = self.files[2]
+        self.assertIsNone(self.storage.snapshot(beds))
+        self.storage.load(beds)
+        self.assertEqual(self.storage.snapshot(beds).get("B1"), BEDS[0])
+
+    def test_commit_appends_to_the_snapshot(self):
+        beds = self.files[2]
+        self.storage.load(beds)
+        reader = self.storage.snapshot(beds)
+        records = {b["id"]: dict(b) for b in BEDS}
+        records["B1"]["status"] = "Occupied"
+        with patch("storage.write_snapshot") as write:
+            self.storage.save(beds, records, changed_ids=["B1"])
+        write.assert_not_called()
+        self.assertTrue(reader._mm.closed)  # closed before its file changed
+        cold = JsonStorage(Journal(os.path.join(self.tmp.name, "journal")), snapshots=True)
+        with patch.object(utils, "read_json") as read:
+            self.assertEqual(cold.snapshot(beds).get("B1")["status"], "Occupied")
+        read.assert_not_called()
+        cold.close_snapshot(beds)
+
+    def test_snapshot_is_rewritten_once_mostly_superseded(self):
+        beds = self.files[2]
+        self.storage.load(beds)
+        records = {b["id"]: dict(b) for b in BEDS}
+        with patch("storage.write_snapshot", wraps=write_snapshot) as write:
+            for n in range(12):
+                records["B1"]["priority"] = f"P{n}"
+                self.storage.save(beds, records, changed_ids=["B1"])
+        self.assertGreater(write.call_count, 0)
+        self.assertLess(write.call_count, 6)
+        self.assertEqual(self.storage.snapshot(beds).get("B1")["priority"], "P11")
+        self.assertEqual(list(self.storage.snapshot(beds).records()), list(records.values()))
+
+    def test_full_save_rewrites_the_snapshot(self):
+        beds = self.files[2]
+        self.storage.save(beds, {b["id"]: b for b in BEDS[:2]})
+        self.assertEqual(self.storage.snapshot(beds).ids(), ["B1", "B2"])
+
+    def test_stale_snapshot_is_ignored(self):
+        beds = self.files[2]
+        self.storage.load(beds)
+        with open(beds, "w") as fh:
+            json.dump(BEDS[:1], fh)
+        self.assertIsNone(self.storage.snapshot(beds))
+
+    def test_repository_lookup_without_full_load(self):
+        self.storage.load(self.files[2])
+        repo = Repository(*self.files, storage=self.storage)
+        with patch.object(self.storage, "load") as load:
+            self.assertEqual(repo.beds.get("B3")["id"], "B3")
+            self.assertIsNone(repo.beds.get_active("B9"))
+        load.assert_not_called()
+        self.assertTrue(os.path.exists(snapshot_filename(self.files[2])))
+
+if __name__ == "__main__":
+    unittest.main()
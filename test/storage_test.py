@@ -0,0 +1,127 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+from helpers import TempDirTestCase
+from fileio import write_with_backup
+from journal import Journal
+from repository import Repository
+from storage import JsonStorage, SqliteStorage, migrate_json_to_sqlite
+
+PATIENT = {"id": "P1", "name": "Ann", "age": 30, "gender": "Female", "isDeleted": False, "priority": "Red",
+           "present_medication": ["paracetamol"], "past_medication": [], "doctorId": "D1", "bedId": "B1",
+           "billing": ["X-Ray", "MRI"]}
+BED = {"id": "B1", "ward": "A", "bed_type": "ICU", "patientId": "P1", "priority": "Red",
+       "status": "occupied", "isDeleted": False, "doctorId": None}
+
+class TestSqliteStorage(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db = os.path.join(self.tmp.name, "hospital.db")
+        self.storage = SqliteStorage(self.db)
+
+    def tearDown(self):
+        self.storage.conn.close()
+
+    def test_round_trip_keeps_records_intact(self):
+        self.storage.save("patients.json", {"P1": PATIENT})
+        self.storage.save("beds.json", {"B1": BED})
+        self.assertEqual(self.storage.load("patients.json"), [PATIENT])
+        self.assertEqual(self.storage.load("beds.json"), [BED])
+
+    def test_unknown_fields_survive(self):
+        bed = dict(BED, note="window seat")
+        self.storage.save("beds.json", {"B1": bed})
+        self.assertEqual(self.storage.load("beds.json")[0]["note"], "window seat")
+
+    def test_incremental_save_only_touches_changed_rows(self):
+        p2 = dict(PATIENT, id="P2", name="Bob")
+        self.storage.save("patients.json", {"P1": PATIENT, "P2": p2})
+        # P1 is stale in memory but not marked changed, so it must not be written back
+        records = {"P1": dict(PATIENT, name="stale"), "P2": dict(p2, priority="Green")}
+        self.storage.save("patients.json", records, changed_ids={"P2"})
+        loaded = {r["id"]: r for r in self.storage.load("patients.json")}
+        self.assertEqual(loaded["P1"]["name"], "Ann")
+        self.assertEqual(loaded["P2"]["priority"], "Green")
+
+    def test_record_missing_from_changed_ids_is_deleted(self):
+        self.storage.save("patients.json", {"P1": PATIENT, "P2": dict(PATIENT, id="P2")})
+        self.storage.save("patients.json", {"P2": dict(PATIENT, id="P2")}, changed_ids={"P1"})
+        self.assertEqual([r["id"] for r in self.storage.load("patients.json")], ["P2"])
+
+    def test_stamp_changes_on_save(self):
+        before = self.storage.stamp("beds.json")
+        self.storage.save("beds.json", {"B1": BED})
+        self.assertNotEqual(self.storage.stamp("beds.json"), before)
+
+    def test_repository_sees_writes_from_other_connection(self):
+        repo = Repository("patients.json", "doctors.json", "beds.json", storage=self.storage)
+        self.assertIsNone(repo.patients.get("P1"))
+        other = SqliteStorage(self.db)
+        other.save("patients.json", {"P1": PATIENT})
+        other.conn.close()
+        self.assertEqual(repo.patients.get("P1")["name"], "Ann")
+
+    def test_migrate_json_to_sqlite(self):
+        files = []
+        for name, records in (("patients.json", [PATIENT]), ("doctors.json", []), ("beds.json", [BED])):
+            path = os.path.join(self.tmp.name, name)
+            with open(path, "w") as f:
+                json.dump(records, f)
+            files.append(path)
+        counts = migrate_json_to_sqlite(files, self.db)
+        self.assertEqual(counts, {"patients": 1, "doctors": 0, "beds": 1})
+        self.assertEqual(self.storage.load("beds.json"), [BED])
+
+class TestJsonTransactions(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.journal = Journal(os.path.join(self.tmp.name, "journal"))
+        self.patients = os.path.join(self.tmp.name, "patients.json")
+        self.beds = os.path.join(self.tmp.name, "beds.json")
+        for f in (self.patients, self.beds):
+            with open(f, "w") as fh:
+                json.dump([], fh)
+
+    def read(self, path):
+        with open(path) as f:
+            return json.load(f)
+
+    def test_crash_between_files_is_recovered_on_startup(self):
+        storage = JsonStorage(self.journal)
+        changes = [(self.patients, {"P1": PATIENT}, {"P1"}, 0), (self.beds, {"B1": BED}, {"B1"}, 0)]
+        calls = []
+
+        def crash_on_second_file(file, data):
+            calls.append(file)
+            if len(calls) == 2:
+                raise OSError("power cut")
+            return write_with_backup(file, data)
+
+        with patch("storage.write_with_backup", side_effect=crash_on_second_file):
+            with self.assertRaises(OSError):
+                storage.commit(changes)
+        self.assertEqual(self.read(self.beds), [])
+        self.assertEqual(len(self.journal.pending()), 1)
+
+        recovered = JsonStorage(self.journal)
+        self.assertEqual(self.read(self.patients), [PATIENT])
+        self.assertEqual(self.read(self.beds), [BED])
+        self.assertEqual(recovered.version(self.beds), 1)
+        self.assertEqual(self.journal.pending(), [])
+
+    def test_commit_is_written_to_the_audit_log(self):
+        JsonStorage(self.journal).commit([(self.patients, {"P1": PATIENT}, {"P1"}, 0)])
+        self.log.flush()
+        with open(self.log.path) as fh:
+            entries = [json.loads(line) for line in fh]
+        self.assertIn(("write", self.patients), [(e["action"], e["file"]) for e in entries])
+
+    def test_successful_commit_leaves_no_journal(self):
+        storage = JsonStorage(self.journal)
+        storage.commit([(self.patients, {"P1": PATIENT}, None, None), (self.beds, {"B1": BED}, None, None)])
+        self.assertEqual(self.journal.pending(), [])
+        self.assertEqual(self.read(self.beds), [BED])
+
+if __name__ == "__main__":
+    unittest.main()
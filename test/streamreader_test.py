@@ -0,0 +1,50 @@
+import json
+import os
+import tracemalloc
+import unittest
+from helpers import TempDirTestCase
+from streamreader import iter_json_array, iter_records
+
+RECORDS = [{"id": f"P{i}", "name": "a, [tricky] {name}", "nested": {"list": [1, 2, {"x": "]"}]}, "n": i * 1.5}
+           for i in range(50)]
+
+class TestStreamReader(TempDirTestCase):
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_array_across_chunk_boundaries(self):
+        path = self.write("patients.json", json.dumps(RECORDS, indent=2))
+        for chunk_size in (1, 7, 64, 1 << 16):
+            self.assertEqual(list(iter_json_array(path, chunk_size)), RECORDS, chunk_size)
+
+    def test_empty_array_and_whitespace(self):
+        self.assertEqual(list(iter_records(self.write("a.json", "  \n[ \n ]\n"))), [])
+        self.assertEqual(list(iter_records(self.write("b.json", ""))), [])
+
+    def test_jsonl_by_extension_and_by_content(self):
+        text = "\n".join(json.dumps(r) for r in RECORDS[:3]) + "\n{\"torn\": "
+        self.assertEqual(list(iter_records(self.write("logs.jsonl", text))), RECORDS[:3])
+        self.assertEqual(list(iter_records(self.write("logs.json", text))), RECORDS[:3])
+
+    def test_truncated_array_raises_after_good_records(self):
+        text = json.dumps(RECORDS[:2])[:-20]
+        seen = []
+        with self.assertRaises(ValueError):
+            for record in iter_json_array(self.write("beds.json", text), 8):
+                seen.append(record)
+        self.assertEqual(seen, RECORDS[:1])
+
+    def test_memory_does_not_grow_with_file(self):
+        path = self.write("big.json", json.dumps([{"id": i, "pad": "x" * 200} for i in range(20000)]))
+        tracemalloc.start()
+        count = sum(1 for _ in iter_json_array(path))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.assertEqual(count, 20000)
+        self.assertLess(peak, os.path.getsize(path) / 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import patch
+from triage import TriageQueue
+
+def patient(pid, priority, doctor="D1", admitted="", deleted=False):
+    return {"id": pid, "priority": priority, "doctorId": doctor, "admittedAt": admitted, "isDeleted": deleted}
+
+class TestTriageQueue(unittest.TestCase):
+    def setUp(self):
+        self.queue = TriageQueue()
+        self.queue.reset({p["id"]: p for p in (
+            patient("P1", "Green", admitted="2024-01-01T08:00:00"),
+            patient("P2", "Yellow", admitted="2024-01-01T09:00:00"),
+            patient("P3", "Yellow", admitted="2024-01-01T07:00:00"),
+            patient("P4", "Red", doctor="D2"),
+        )})
+
+    def test_priority_then_admission_time(self):
+        self.assertEqual(self.queue.ordered("D1"), ["P3", "P2", "P1"])
+        self.assertEqual(self.queue.peek("D1"), "P3")
+
+    def test_priority_change_reorders(self):
+        self.queue.update(patient("P1", "red", admitted="2024-01-01T08:00:00"))
+        self.assertEqual(self.queue.peek("D1"), "P1")
+        self.assertEqual(self.queue.count("D1"), 3)
+
+    def test_doctor_change_and_discharge(self):
+        self.queue.update(patient("P3", "Yellow", doctor="D2", admitted="2024-01-01T07:00:00"))
+        self.assertEqual(self.queue.ordered("D2"), ["P4", "P3"])
+        self.queue.update(patient("P2", "Yellow", admitted="2024-01-01T09:00:00", deleted=True))
+        self.assertEqual(self.queue.ordered("D1"), ["P1"])
+        self.assertEqual(self.queue.peek("D1"), "P1")
+
+    def test_records_without_admission_time_sort_by_id(self):
+        queue = TriageQueue()
+        queue.reset({"P10": patient("P10", "Red", admitted=None), "P9": patient("P9", "Red", admitted=None)})
+        self.assertEqual(queue.ordered("D1"), ["P9", "P10"])
+
+    def test_heap_stays_bounded_under_churn(self):
+        for i in range(200):
+            self.queue.update(patient("P1", ("Red", "Green")[i % 2], admitted="2024-01-01T08:00:00"))
+        self.assertLess(len(self.queue._heaps["D1"]), 30)
+        self.assertEqual(self.queue.ordered("D1"), ["P3", "P2", "P1"])
+
+    def test_listing_is_kept_in_order_without_sorting_again(self):
+        self.assertEqual(self.queue.ordered("D1"), ["P3", "P2", "P1"])
+        self.queue.update(patient("P1", "Red", admitted="2024-01-01T08:00:00"))
+        self.queue.update(patient("P5", "Yellow", admitted="2024-01-01T08:30:00"))
+        self.queue.update(patient("P2", "Yellow", admitted="2024-01-01T09:00:00", deleted=True))
+        with patch("triage.sorted", create=True, side_effect=AssertionError("re-sorted")):
+            self.assertEqual(self.queue.ordered("D1"), ["P1", "P3", "P5"])
+        self.assertEqual(self.queue.ordered("D1", limit=2), ["P1", "P3"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,97 +1,201 @@
+import io
+import json
+import os
 import unittest
-from unittest.mock import patch, MagicMock
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import config
+from helpers import TempDirTestCase
+from locks import FileLock
+from logstore import rotate
 from hospital_management import HospitalManager
+from locks import LockTimeout
+from storage import VersionConflict
+
+class TestHospitalManager(TempDirTestCase):
+    chdir = True  # the manager works on patients.json etc. in the working directory
 
-class TestHospitalManager(unittest.TestCase):
     def setUp(self):
+        super().setUp()
+        self.data_files()
         self.hm = HospitalManager()
 
-    @patch("hospital_management.write_json")
-    @patch("hospital_management.read_json", return_value=[])
-    @patch("hospital_management.Patient")
-    def test_add_patient(self, mock_patient, mock_read_json, mock_write_json):
-        mock_patient.return_value.to_dict.return_value = {"id": "P1"}
+    def saved(self, file):
+        with open(file) as fh:
+            return {r["id"]: r for r in json.load(fh)}
+
+    def admit_to_bed(self):
+        pid = self.hm.add_patient("Alice", 28, "female", "red")
+        bid = self.hm.add_bed("ICU", "B")
+        self.hm.assign_bed_to_patient(pid, bid)
+        return pid, bid
+
+    def test_add_patient(self):
+        pid = self.hm.add_patient("Alice", 28, "female", "red")
+        patient = self.saved("patients.json")[pid]
+        self.assertEqual(patient["name"], "Alice")
+        self.assertEqual(patient["priority"], "Red")
+        self.assertFalse(patient["isDeleted"])
+
+    def test_add_doctor(self):
+        did = self.hm.add_doctor("Bob", 40, "male", "Cardiology")
+        self.assertEqual(self.saved("doctors.json")[did]["specialization"], "Cardiology")
+
+    def test_add_bed(self):
+        bid = self.hm.add_bed("ICU", "B")
+        bed = self.saved("beds.json")[bid]
+        self.assertEqual((bed["bed_type"], bed["ward"], bed["status"]), ("ICU", "B", "Vacant"))
+
+    def test_assign_bed_to_patient(self):
+        pid, bid = self.admit_to_bed()
+        self.assertEqual(self.saved("patients.json")[pid]["bedId"], bid)
+        bed = self.saved("beds.json")[bid]
+        self.assertEqual((bed["patientId"], bed["status"]), (pid, "Occupied"))
+
+    def test_occupied_bed_is_not_reassigned(self):
+        pid, bid = self.admit_to_bed()
+        other = self.hm.add_patient("Carol", 50, "female", "green")
+        self.hm.assign_bed_to_patient(other, bid)
+        self.assertEqual(self.saved("beds.json")[bid]["patientId"], pid)
+        self.assertIsNone(self.saved("patients.json")[other].get("bedId"))
+
+    def test_assign_doctor_to_patient(self):
+        pid = self.hm.add_patient("Alice", 28, "female", "red")
+        did = self.hm.add_doctor("Bob", 40, "male", "Cardiology")
+        self.hm.assign_doctor_to_patient(pid, did)
+        self.assertEqual(self.saved("patients.json")[pid]["doctorId"], did)
+
+    def test_discharge_patient(self):
+        pid, bid = self.admit_to_bed()
+        self.hm.discharge_patient(pid)
+        patient = self.saved("patients.json")[pid]
+        self.assertTrue(patient["isDeleted"])
+        self.assertIn("dischargedAt", patient)
+        bed = self.saved("beds.json")[bid]
+        self.assertEqual((bed["patientId"], bed["status"]), (None, "Vacant"))
+
+    def test_update_patient_priority(self):
+        pid, bid = self.admit_to_bed()
+        self.hm.update_patient_priority(pid, "green")
+        self.assertEqual(self.saved("patients.json")[pid]["priority"], "Green")
+        self.assertEqual(self.saved("beds.json")[bid]["priority"], "Green")
+
+    def test_change_bed_for_patient(self):
+        pid, old = self.admit_to_bed()
+        new = self.hm.add_bed("General", "A")
+        self.hm.change_bed_for_patient(pid, new)
+        beds = self.saved("beds.json")
+        self.assertEqual((beds[old]["patientId"], beds[old]["status"]), (None, "Vacant"))
+        self.assertEqual((beds[new]["patientId"], beds[new]["status"]), (pid, "Occupied"))
+        self.assertEqual(self.saved("patients.json")[pid]["bedId"], new)
+
+    def test_change_doctor_for_patient(self):
+        pid = self.hm.add_patient("Alice", 28, "female", "red")
+        first = self.hm.add_doctor("Bob", 40, "male", "Cardiology")
+        second = self.hm.add_doctor("Dan", 52, "male", "Surgery")
+        self.hm.assign_doctor_to_patient(pid, first)
+        self.hm.change_doctor_for_patient(pid, second)
+        self.assertEqual(self.saved("patients.json")[pid]["doctorId"], second)
+
+    def test_operations_return_their_message_without_echo(self):
+        self.hm.echo = False
+        out = io.StringIO()
+        with redirect_stdout(out):
+            pid, bid = self.admit_to_bed()
+            message = self.hm.discharge_patient(pid)
+        self.assertEqual(out.getvalue(), "")
+        self.assertIn(f"Patient {pid} discharged and bed freed.", message)
+        self.assertEqual(self.hm.last_message, message)
+        self.assertEqual(self.hm.assign_bed_to_patient(pid, "B99"), "Bed with ID B99 not found.")
+
+    def test_fetch_patients_by_doctor_follows_the_patients_doctor(self):
+        # listed through the patient's doctorId in triage order; the bed's own doctorId
+        # (which the menus never set) no longer matters
+        did = self.hm.add_doctor("Bob", 40, "male", "Cardiology")
+        other = self.hm.add_doctor("Dan", 52, "male", "Surgery")
+        green, red, waiting = (self.hm.add_patient(n, 30, "female", p) for n, p in
+                               (("Gil", "green"), ("Rae", "red"), ("Wes", "yellow")))
+        for pid in (green, red, waiting):
+            self.hm.assign_doctor_to_patient(pid, did)
+        for pid in (green, red):
+            self.hm.assign_bed_to_patient(pid, self.hm.add_bed("General", "A"))
+        elsewhere = self.hm.add_patient("Eli", 60, "male", "red")
+        self.hm.assign_doctor_to_patient(elsewhere, other)
+        bed = self.hm.add_bed("General", "A")
+        self.hm.assign_bed_to_patient(elsewhere, bed)
+        self.hm.repo.beds.update(bed, doctorId=did)
+        self.hm.repo.commit()
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.hm.fetch_patients_by_doctor(did)
+        listed = [line.split("Patient ID: ")[1].split(",")[0] for line in out.getvalue().splitlines()
+                  if "Patient ID: " in line]
+        self.assertEqual(listed, [red, green])  # in a bed; not the waiting one, not Eli
+
+    def test_bulk_add_patients_skips_rows_that_are_not_objects(self):
+        with open("import.json", "w") as fh:
+            json.dump([{"name": "Ann", "age": 30, "gender": "female"}, ["Bob", 41], "Cy"], fh)
+        result = self.hm.bulk_add_patients("import.json")
+        self.assertEqual((result["imported"], result["skipped"]), (1, 2))
+        self.assertEqual(result["errors"], ["row 2: not a JSON object", "row 3: not a JSON object"])
+
+    def test_failed_save_is_reported_and_rolled_back(self):
+        pid, bid = self.admit_to_bed()
+        storage = self.hm.repo.storage
+        for error in (LockTimeout("timed out waiting for patients.json.lock"), OSError(28, "No space left")):
+            with patch.object(storage, "commit", side_effect=error):
+                message = self.hm.update_patient_priority(pid, "green")
+            self.assertTrue(message.startswith(" Could not save:"), message)
+            self.assertEqual(self.hm.repo.patients.get(pid)["priority"], "Red")
+        self.log.flush()
+        with open(self.log.path) as fh:
+            self.assertIn("No space left", fh.read())
+
+    def test_show_logs_includes_rotated_segments(self):
         self.hm.add_patient("Alice", 28, "female", "red")
-        mock_write_json.assert_called()
-
-    @patch("hospital_management.write_json")
-    @patch("hospital_management.read_json", return_value=[])
-    @patch("hospital_management.Doctor")
-    def test_add_doctor(self, mock_doctor, mock_read_json, mock_write_json):
-        mock_doctor.return_value.to_dict.return_value = {"id": "D1"}
-        self.hm.add_doctor("Bob", 40, "male", "Cardiology")
-        mock_write_json.assert_called()
-
-    @patch("hospital_management.write_json")
-    @patch("hospital_management.read_json", return_value=[])
-    @patch("hospital_management.Bed")
-    def test_add_bed(self, mock_bed, mock_read_json, mock_write_json):
-        mock_bed.return_value.to_dict.return_value = {"id": "B1"}
+        self.log.flush()
+        with FileLock(self.log.path):
+            self.assertIsNotNone(rotate(self.log.path))
         self.hm.add_bed("ICU", "B")
-        mock_write_json.assert_called()
-
-    @patch("hospital_management.write_json")
-    @patch("hospital_management.read_json")
-    def test_assign_bed_to_patient(self, mock_read_json, mock_write_json):
-        mock_read_json.side_effect = [
-            [{"id": "P1"}],  # patients
-            [{"id": "B1"}]   # beds
-        ]
-        self.hm.assign_bed_to_patient("P1", "B1")
-        mock_write_json.assert_called()
-
-    @patch("hospital_management.write_json")
-    @patch("hospital_management.read_json")
-    def test_assign_doctor_to_patient(self, mock_read_json, mock_write_json):
-        mock_read_json.side_effect = [
-            [{"id": "P1"}],  # patients
-            [{"id": "D1"}]   # doctors
-        ]
-        self.hm.assign_doctor_to_patient("P1", "D1")
-        mock_write_json.assert_called()
-
-    @patch("hospital_management.write_json")
-    @patch("hospital_management.read_json")
-    def test_discharge_patient(self, mock_read_json, mock_write_json):
-        mock_read_json.side_effect = [
-            [{"id": "P1", "isDeleted": False}],  # patients
-            [{"id": "B1", "patientId": "P1"}]    # beds
-        ]
-        self.hm.discharge_patient("P1")
-        mock_write_json.assert_called()
-
-    @patch("hospital_management.write_json")
-    @patch("hospital_management.read_json")
-    def test_update_patient_priority(self, mock_read_json, mock_write_json):
-        mock_read_json.side_effect = [
-            [{"id": "P1", "isDeleted": False}],  # patients
-            [{"id": "B1", "patientId": "P1", "isDeleted": False}]  # beds
-        ]
-        self.hm.update_patient_priority("P1", "red")
-        mock_write_json.assert_called()
-
-    @patch("hospital_management.write_json")
-    @patch("hospital_management.read_json")
-    def test_change_bed_for_patient(self, mock_read_json, mock_write_json):
-        mock_read_json.side_effect = [
-            [{"id": "P1", "bedId": "B1", "priority": "red", "isDeleted": False}],  # patients
-            [
-                {"id": "B1", "patientId": "P1", "priority": "red", "status": "occupied", "isDeleted": False},
-                {"id": "B2", "patientId": None, "priority": None, "status": "vacant", "isDeleted": False}
-            ]  # beds
-        ]
-        self.hm.change_bed_for_patient("P1", "B2")
-        mock_write_json.assert_called()
-
-    @patch("hospital_management.write_json")
-    @patch("hospital_management.read_json")
-    def test_change_doctor_for_patient(self, mock_read_json, mock_write_json):
-        mock_read_json.side_effect = [
-            [{"id": "P1", "doctorId": "D1", "isDeleted": False}],  # patients
-            [{"id": "D2", "isDeleted": False}]  # doctors
-        ]
-        self.hm.change_doctor_for_patient("P1", "D2")
-        mock_write_json.assert_called()
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.hm.show_logs(action="write")
+        self.assertIn("patients.json", out.getvalue())  # from the gzip segment
+        self.assertIn("beds.json", out.getvalue())
+
+    def test_archive_retry_stores_each_patient_once(self):
+        pid, _ = self.admit_to_bed()
+        self.hm.discharge_patient(pid)
+        storage = self.hm.repo.storage
+        commit, calls = storage.commit, []
+
+        def conflict_once(changes, events=None):
+            calls.append(changes)
+            if len(calls) == 1:
+                raise VersionConflict("patients.json")
+            return commit(changes, events=events)
+
+        with patch.object(storage, "commit", side_effect=conflict_once), \
+                patch.object(config, "CONFLICT_BACKOFF_SECONDS", 0):
+            self.hm.archive_discharged(older_than_days=0)
+        self.assertEqual(len(calls), 2)
+        self.assertNotIn(pid, self.saved("patients.json"))
+        partitions = self.hm.archive.partitions()
+        with open(os.path.join(self.hm.archive.directory, partitions[0])) as fh:
+            self.assertEqual(len(fh.readlines()), 1)
+
+    def test_bulk_add_patients_skips_a_malformed_line(self):
+        with open("import.jsonl", "w") as fh:
+            fh.write('{"name": "Ann", "age": 30, "gender": "female"}\n{bad\n'
+                     '{"name": "Bob", "age": 41, "gender": "male", "priority": "red"}\n'
+                     '{"name": "Cy", "gender": "male"}\n')
+        result = self.hm.bulk_add_patients("import.jsonl")
+        self.assertEqual((result["imported"], result["skipped"]), (2, 2))
+        self.assertTrue(result["errors"][0].startswith("row 2: invalid JSON"))
+        self.assertEqual(result["errors"][1], "row 4: missing age")
+        patients = self.saved("patients.json").values()
+        self.assertEqual(sorted(p["name"] for p in patients), ["Ann", "Bob"])
 
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
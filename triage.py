@@ -0,0 +1,88 @@
+import bisect
+import heapq
+import itertools
+
+# Triage order: red before yellow before green, then earliest admission first.
+PRIORITY_RANK = {"red": 0, "yellow": 1, "green": 2}
+
+def triage_key(patient):
+    # Patients saved before admittedAt existed sort ahead of newer ones, by id number.
+    number = patient["id"][1:]
+    return (PRIORITY_RANK.get((patient.get("priority") or "").lower(), len(PRIORITY_RANK)),
+            patient.get("admittedAt") or "",
+            int(number) if number.isdigit() else 0)
+
+class TriageQueue:
+    # One min-heap per doctor, kept up to date by the patients collection the same way
+    # as an Index (reset/update/remove). Changed or discharged patients are not dug out
+    # of the heap; their old entry is just skipped when it reaches the top.
+    # Once a doctor's full list has been asked for, it is kept sorted as well, so
+    # listing it again does not sort.
+    def __init__(self):
+        self._heaps = {}
+        self._entries = {}  # patient id -> live entry
+        self._live = {}     # doctor id -> number of live entries
+        self._sorted = {}   # doctor id -> [(key, seq, patient id)] in triage order
+        self._counter = itertools.count()
+
+    def reset(self, records):
+        self._heaps = {}
+        self._entries = {}
+        self._live = {}
+        self._sorted = {}
+        for record in records.values():
+            self.update(record)
+
+    def update(self, record):
+        record_id = record["id"]
+        doctor_id = record.get("doctorId")
+        if not doctor_id or record.get("isDeleted", False):
+            self.remove(record_id)
+            return
+        key = triage_key(record)
+        current = self._entries.get(record_id)
+        if current and current[0] == key and current[3] == doctor_id:
+            return
+        self.remove(record_id)
+        entry = [key, next(self._counter), record_id, doctor_id, True]
+        self._entries[record_id] = entry
+        self._live[doctor_id] = self._live.get(doctor_id, 0) + 1
+        listing = self._sorted.get(doctor_id)
+        if listing is not None:
+            bisect.insort(listing, (key, entry[1], record_id))
+        heap = self._heaps.setdefault(doctor_id, [])
+        heapq.heappush(heap, entry)
+        if len(heap) > 2 * self.count(doctor_id) + 16:
+            self._compact(doctor_id)
+
+    def remove(self, record_id):
+        entry = self._entries.pop(record_id, None)
+        if entry:
+            entry[4] = False
+            self._live[entry[3]] -= 1
+            listing = self._sorted.get(entry[3])
+            if listing is not None:
+                del listing[bisect.bisect_left(listing, (entry[0], entry[1]))]
+
+    def peek(self, doctor_id):
+        # id of the next patient to see, O(log n) amortised
+        heap = self._heaps.get(doctor_id)
+        while heap and not heap[0][4]:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def ordered(self, doctor_id, limit=None):
+        # ids in triage order, the first `limit` of them if given
+        listing = self._sorted.get(doctor_id)
+        if listing is None:
+            listing = sorted((e[0], e[1], e[2]) for e in self._heaps.get(doctor_id, ()) if e[4])
+            self._sorted[doctor_id] = listing
+        return [item[2] for item in itertools.islice(listing, limit)]
+
+    def count(self, doctor_id):
+        return self._live.get(doctor_id, 0)
+
+    def _compact(self, doctor_id):
+        heap = [e for e in self._heaps[doctor_id] if e[4]]
+        heapq.heapify(heap)
+        self._heaps[doctor_id] = heap
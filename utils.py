@@ -1,63 +1,73 @@
 
-import json
 from datetime import datetime
 
-def backup_filename(file):
-    # E.g., patients.json → patients_backup.json
-    if file.endswith('.json'):
-        return file.replace('.json', '_backup.json')
-    else:
-        return file + '_backup'
+import codec
+import config
+from fileio import backup_filename, rotated_backup_filename, write_with_backup
+from logstore import AuditLog, AsyncAuditLog, LogPolicy
+
+audit_log = AsyncAuditLog() if config.LOG_ASYNC else AuditLog()
+log_policy = LogPolicy()
 
 def log_action(action, filetitle, status):
+    level = log_policy.level_of(action, status)
+    if not log_policy.admit(action, filetitle, level):
+        # counted instead, written out with the next summary
+        if log_policy.summary_due():
+            flush_summary()
+        return
     log_entry = {
         "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "level": level,
         "action": action,
         "file": filetitle,
         "status": status
     }
     try:
-        # Append to logs.json
-        logs = []
+        audit_log.append(log_entry)  # one line appended to logs.jsonl, flushed in batches
+    except Exception as e:
+        print(f"Logging error: {e}")
+
+def flush_summary():
+    entry = log_policy.summary()
+    if entry:
         try:
-            with open("logs.json", 'r') as lfile:
-                logs = json.load(lfile)
-        except Exception:
-            pass
-        logs.append(log_entry)
-        with open("logs.json", 'w') as lfile:
-            json.dump(logs, lfile, indent=2)
+            audit_log.append(entry)
+        except Exception as e:
+            print(f"Logging error: {e}")
+
+def flush_logs():
+    flush_summary()
+    try:
+        audit_log.flush()
     except Exception as e:
         print(f"Logging error: {e}")
 
 def write_json(file, data):
+    # raises on failure (after logging it); the file then still holds its previous content
     try:
-        with open(file, 'w') as main_f:
-            json.dump(data, main_f, indent=2)
-        log_action("write", file, "opened with write mode")
-
-        backup_file = backup_filename(file)
-        with open(backup_file, 'w') as backup_f:
-            json.dump(data, backup_f, indent=2)
-        log_action("write_backup", backup_file, "backup added ")
+        backup_file = write_with_backup(file, data)
     except Exception as e:
         log_action("write", file, f"error: {str(e)}")
+        raise
+    log_action("write", file, "atomic write")
+    if backup_file:
+        log_action("write_backup", backup_file, "backup snapshot rotated")
 
 def read_json(file):
     try:
-        with open(file, 'r') as f:
-            data = json.load(f)
+        data = codec.load_file(file)
         log_action("read", file, "read operation")
         return data
     except Exception as e:
         log_action("read", file, f"error: {str(e)}")
-        # Try reading backup
-        try:
-            backup_file = backup_filename(file)
-            with open(backup_file, 'r') as bf:
-                data = json.load(bf)
-            log_action("read_backup", backup_file, "ok")
-            return data
-        except Exception as be:
-            log_action("read_backup", backup_file, f"error: {str(be)}")
-            return []
+        # Try the backup snapshots, newest first
+        for n in range(max(1, config.BACKUP_KEEP)):
+            backup_file = rotated_backup_filename(file, n)
+            try:
+                data = codec.load_file(backup_file)
+                log_action("read_backup", backup_file, "ok")
+                return data
+            except Exception as be:
+                log_action("read_backup", backup_file, f"error: {str(be)}")
+        return []